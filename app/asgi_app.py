@@ -0,0 +1,359 @@
+"""
+ASGI 어댑터
+
+자주 불리는 경로는 이벤트 루프에서 바로 처리하고, 나머지는 기존 Flask 앱(WSGI)으로 넘긴다.
+  - GET /api/products, /api/product/<id> : 응답 캐시/스냅샷을 먼저 보고, 없을 때만 DB 스레드 풀 사용
+  - GET /static/<path>                    : static_files 캐시로 응답하고 큰 파일은 조각 단위로 보낸다
+  - 그 밖의 모든 요청                     : 전용 스레드 풀에서 Flask 앱 실행
+
+느린 클라이언트에게 본문을 보내는 동안에는 스레드를 잡지 않는다. 조각 하나를 읽을 때만
+스레드 풀을 잠깐 쓰고, 전송 대기는 이벤트 루프가 맡는다.
+"""
+import asyncio
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from tempfile import SpooledTemporaryFile
+from time import perf_counter
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import http_date, parse_date, parse_etags
+from werkzeug.security import safe_join
+
+import async_database
+import compression
+import fast_json
+import metrics
+import profiler
+import static_files
+from catalog_cache import catalog_cache, catalog_version
+from catalog_snapshot import current_snapshot, refresh_snapshot
+from routes import (PRODUCT_LIST_CACHE_CONTROL, PRODUCT_DETAIL_CACHE_CONTROL,
+                    encode_cursor, listing_cache_key, parse_listing_args)
+
+# Flask 앱(WSGI)을 실행하는 스레드 수와 정적 파일을 읽는 스레드 수
+WSGI_WORKERS = int(os.environ.get('MUSEME_ASGI_WSGI_WORKERS', 16))
+FILE_WORKERS = int(os.environ.get('MUSEME_ASGI_FILE_WORKERS', 4))
+MAX_BUFFERED_REQUEST_BODY = 1024 * 1024  # 이보다 큰 요청 본문은 임시 파일로
+
+PRODUCT_PATH = re.compile(r'^/api/product/(\d+)$')
+
+
+def _header_map(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope['headers']}
+
+
+def _query_args(scope):
+    query = scope['query_string'].decode('utf-8', 'replace')
+    return MultiDict(parse_qsl(query, keep_blank_values=True))
+
+
+async def _send_response(send, status, headers, body=b'', head=False):
+    raw_headers = [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': b'' if head else body})
+
+
+def _timed_send(send, endpoint, method):
+    """응답 시작(http.response.start)까지의 시간을 Flask 경로와 같은 라벨로 기록하는 send"""
+    if not metrics.METRICS_ENABLED:
+        return send
+    start = perf_counter()
+
+    async def timed_send(message):
+        if message['type'] == 'http.response.start':
+            metrics.observe_request(endpoint, method, message['status'], perf_counter() - start)
+        await send(message)
+    return timed_send
+
+
+class MusemeASGI:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.static_prefix = flask_app.static_url_path.rstrip('/') + '/'
+        self.static_endpoint = self.static_prefix + '<path:filename>'
+        self._wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_WORKERS, thread_name_prefix='wsgi')
+        self._file_executor = ThreadPoolExecutor(max_workers=FILE_WORKERS, thread_name_prefix='static')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        path = scope['path']
+        method = scope['method']
+        # 프로파일링 중에는 모든 요청을 Flask 로 넘겨 같은 훅으로 측정한다
+        if method in ('GET', 'HEAD') and profiler.profiler is None:
+            if path == '/api/products':
+                return await self._api_products(scope, _timed_send(send, '/api/products', method))
+            match = PRODUCT_PATH.match(path)
+            if match:
+                return await self._api_product(scope, _timed_send(send, '/api/product/<int:product_id>', method),
+                                               int(match.group(1)))
+            if path.startswith(self.static_prefix):
+                timed_send = _timed_send(send, self.static_endpoint, method)
+                if await self._static(scope, timed_send, path[len(self.static_prefix):]):
+                    return
+        # Flask 로 넘긴 요청은 metrics.register_metrics 의 훅이 기록한다
+        await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.get_running_loop().run_in_executor(self._file_executor, self._warm)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._wsgi_executor.shutdown(wait=False)
+                self._file_executor.shutdown(wait=False)
+                async_database.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _warm(self):
+        try:
+            refresh_snapshot()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # JSON API
+    # ------------------------------------------------------------------
+
+    def _json_body(self, data):
+        # routes._encode_json 과 같은 형식
+        return fast_json.encode(data)
+
+    async def _send_json_error(self, send, status, message, head):
+        await _send_response(send, status, {'Content-Type': 'application/json'},
+                             self._json_body({'error': message}), head)
+
+    async def _send_cached(self, scope, send, entry, cache_control):
+        # Flask 의 make_conditional 과 같은 순서: ETag 가 있으면 If-None-Match 만 본다
+        request_headers = _header_map(scope)
+        encoding = compression.negotiate(request_headers.get('accept-encoding'), len(entry.body))
+        etag = compression.variant_etag(entry.etag, encoding)
+        headers = {
+            'Content-Type': 'application/json',
+            'ETag': f'"{etag}"',
+            'Last-Modified': http_date(entry.last_modified),
+            'Cache-Control': cache_control,
+        }
+        if compression.varies(len(entry.body)):
+            headers['Vary'] = 'Accept-Encoding'
+        if_none_match = request_headers.get('if-none-match')
+        if_modified_since = parse_date(request_headers.get('if-modified-since'))
+        if if_none_match:
+            not_modified = parse_etags(if_none_match).contains_weak(etag)
+        else:
+            not_modified = (if_modified_since is not None
+                            and entry.last_modified <= if_modified_since.timestamp())
+        if not_modified:
+            await _send_response(send, 304, headers)
+            return
+        body = entry.body
+        if encoding:
+            # 처음 한 번만 압축하고 항목에 붙여 둔다 (큰 목록도 수 ms 라 이벤트 루프에서 한다)
+            body = compression.encoded_body(body, encoding, entry.variants)
+            headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = len(body)
+        await _send_response(send, 200, headers, body, scope['method'] == 'HEAD')
+
+    async def _api_products(self, scope, send):
+        head = scope['method'] == 'HEAD'
+        args = _query_args(scope)
+        theme = args.get('theme')
+        category = args.get('category')
+        if category == 'all':
+            category = None
+        try:
+            listing = parse_listing_args(args)
+        except ValueError as e:
+            return await self._send_json_error(send, 400, str(e), head)
+
+        key = listing_cache_key(theme, category, listing)
+        entry = catalog_cache.get(key)
+        if entry is None:
+            version = catalog_version()
+            try:
+                body = await self._load_listing(theme, category, listing)
+            except ValueError as e:
+                return await self._send_json_error(send, 400, str(e), head)
+            entry = catalog_cache.set(key, body, version)
+        await self._send_cached(scope, send, entry, PRODUCT_LIST_CACHE_CONTROL)
+
+    async def _load_listing(self, theme, category, listing):
+        snapshot = current_snapshot(build=False)
+        if snapshot is not None:
+            body = snapshot.listing_json(theme, category, cursor_encoder=encode_cursor, **listing)
+            if body is not None:
+                return body
+        products, next_after = await async_database.get_products_page(theme, category, **listing)
+        return self._json_body({'products': products, 'next_cursor': encode_cursor(next_after)})
+
+    async def _api_product(self, scope, send, product_id):
+        head = scope['method'] == 'HEAD'
+        key = ('product', product_id)
+        entry = catalog_cache.get(key)
+        if entry is None:
+            version = catalog_version()
+            snapshot = current_snapshot(build=False)
+            if snapshot is not None:
+                body = snapshot.detail_json(product_id)
+            else:
+                product = await async_database.get_product_by_id(product_id)
+                body = self._json_body(product) if product else None
+            if body is None:
+                return await self._send_json_error(send, 404, 'Product not found', head)
+            entry = catalog_cache.set(key, body, version)
+        await self._send_cached(scope, send, entry, PRODUCT_DETAIL_CACHE_CONTROL)
+
+    # ------------------------------------------------------------------
+    # 정적 파일
+    # ------------------------------------------------------------------
+
+    def _max_age(self):
+        value = self.flask_app.config['SEND_FILE_MAX_AGE_DEFAULT']
+        if isinstance(value, timedelta):
+            return int(value.total_seconds())
+        return value
+
+    async def _static(self, scope, send, filename):
+        """직접 처리했으면 True. Range 요청, 빌드된 자산 등은 False 를 돌려 Flask 로 넘긴다."""
+        request_headers = _header_map(scope)
+        manifest = self.flask_app.extensions.get('museme_assets')
+        if (not static_files.STATIC_FAST_ENABLED or 'range' in request_headers
+                or (manifest and filename in manifest['dist_paths'])):
+            return False
+        path = safe_join(self.flask_app.static_folder, filename)
+        if path is None:
+            return False
+
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(self._file_executor, static_files.static_cache.get, path)
+        if entry is None:
+            return False
+
+        headers = static_files.entry_headers(entry, self._max_age())
+        if static_files.is_not_modified(entry, request_headers.get('if-none-match'),
+                                        request_headers.get('if-modified-since')):
+            await _send_response(send, 304, headers)
+            return True
+
+        headers['Content-Type'] = entry.mimetype
+        headers['Content-Length'] = entry.size
+        head = scope['method'] == 'HEAD'
+        if entry.body is not None or head:
+            await _send_response(send, 200, headers, entry.body or b'', head)
+            return True
+
+        stream = await loop.run_in_executor(
+            self._file_executor, static_files.static_cache.open_stream, entry, 0, entry.size)
+        try:
+            await self._send_stream(send, 200, headers, iter(stream), self._file_executor)
+        finally:
+            stream.close()
+        return True
+
+    # ------------------------------------------------------------------
+    # Flask 로 넘기기
+    # ------------------------------------------------------------------
+
+    async def _send_stream(self, send, status, headers, iterator, executor, first=None):
+        """iterator 의 조각을 하나씩 스레드 풀에서 꺼내 보낸다."""
+        loop = asyncio.get_running_loop()
+        raw_headers = headers if isinstance(headers, list) else [
+            (k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+        if first:
+            await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+        while True:
+            chunk = await loop.run_in_executor(executor, next, iterator, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def _read_body(self, receive):
+        body = SpooledTemporaryFile(max_size=MAX_BUFFERED_REQUEST_BODY)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def _environ(self, scope, body):
+        script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+        path_info = scope['path'].encode('utf-8').decode('latin-1')
+        if script_name and path_info.startswith(script_name):
+            path_info = path_info[len(script_name):]
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': script_name,
+            'PATH_INFO': path_info,
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'] = scope['client'][0]
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def _wsgi(self, scope, receive, send):
+        body = await self._read_body(receive)
+        environ = self._environ(scope, body)
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                                   for k, v in headers]
+
+        def call():
+            # 첫 조각까지 같은 스레드에서 만들어 작은 응답은 스레드 왕복 한 번으로 끝낸다
+            iterable = self.flask_app(environ, start_response)
+            iterator = iter(iterable)
+            return iterable, iterator, next(iterator, None)
+
+        loop = asyncio.get_running_loop()
+        iterable, iterator, first = await loop.run_in_executor(self._wsgi_executor, call)
+        try:
+            await self._send_stream(send, response['status'], response['headers'],
+                                    iterator, self._wsgi_executor, first)
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(self._wsgi_executor, close)
+            body.close()
+
+
+def create_asgi_app(flask_app):
+    return MusemeASGI(flask_app)
@@ -0,0 +1,235 @@
+"""
+정적 자산(CSS/JS/폰트) 빌드와 서빙
+
+빌드: python app/assets.py
+  - BUNDLES 에 정의한 CSS/JS 를 합치고 최소화
+  - 파일명에 내용 해시를 붙여 static/dist/ 에 저장
+  - gzip (brotli 모듈이 있으면 br 도) 압축본을 미리 생성
+  - static/dist/manifest.json 에 원래 이름 -> 해시 이름 기록
+
+서빙: create_app() 에서 register_assets(app) 호출
+  - url_for('static', filename=...) 가 manifest 의 해시 이름으로 바뀐다
+  - Accept-Encoding 에 맞는 미리 압축된 파일을 내려주고, 해시 이름은 immutable 로 캐시
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+from compression import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_NAME = 'dist'
+DIST_DIR = os.path.join(STATIC_DIR, DIST_NAME)
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# 템플릿에서 한 번에 불러오는 묶음 (순서대로 합친다)
+BUNDLES = {
+    'base.css': ['css/fonts.css', 'css/reset.css', 'css/variables.css',
+                 'css/neumorphism.css', 'css/layout.css', 'css/responsive.css'],
+    'components.css': ['css/components/header.css', 'css/components/footer.css',
+                       'css/components/login-modal.css'],
+    'base.js': ['js/utils.js', 'js/api.js'],
+    'components.js': ['js/auth.js', 'js/components/header.js', 'js/components/footer.js'],
+}
+
+# 묶음에 들어가지 않고 개별로 해시 이름을 붙이는 파일
+FINGERPRINT_DIRS = ('css/pages', 'js/pages', 'fonts')
+COMPRESS_EXTENSIONS = ('.css', '.js', '.ttf', '.svg')
+HASH_LENGTH = 10
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ---------------------------------------------------------------------------
+# 빌드
+# ---------------------------------------------------------------------------
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{}:;,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # 정규식으로 JS 를 줄이면 문자열/템플릿 리터럴이 깨질 수 있어 rjsmin 이 있을 때만 줄인다
+    return rjsmin.jsmin(text) if rjsmin else text
+
+
+def _fingerprint(logical_name, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    root, ext = posixpath.splitext(logical_name)
+    return f'{DIST_NAME}/{root}.{digest}{ext}'
+
+
+def _write(dist_path, data):
+    target = os.path.join(STATIC_DIR, dist_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+
+    encodings = []
+    if dist_path.endswith(COMPRESS_EXTENSIONS):
+        if brotli is not None:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+            encodings.append('br')
+        with open(target + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        encodings.append('gzip')
+    return encodings
+
+
+def _rewrite_css_urls(text, source_name, files):
+    # 합친 CSS 는 위치가 바뀌므로 상대 경로 url() 을 절대 경로(가능하면 해시 이름)로 바꾼다
+    base = posixpath.dirname(source_name)
+
+    def replace(match):
+        quote, ref = match.group(1), match.group(2)
+        if re.match(r'^(data:|https?:|/)', ref):
+            return match.group(0)
+        path, _, suffix = ref.partition('?')
+        logical = posixpath.normpath(posixpath.join(base, path))
+        resolved = files.get(logical, logical)
+        return f'url({quote}/static/{resolved}{quote})'
+
+    return re.sub(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)', replace, text)
+
+
+def _read(logical_name):
+    with open(os.path.join(STATIC_DIR, logical_name), 'rb') as f:
+        return f.read()
+
+
+def build():
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    files = {}
+    encodings = {}
+
+    # 1. 개별 파일 (폰트를 먼저 처리해야 CSS 의 url() 을 해시 이름으로 바꿀 수 있다)
+    for directory in sorted(FINGERPRINT_DIRS, key=lambda d: d != 'fonts'):
+        for root, _, names in os.walk(os.path.join(STATIC_DIR, directory)):
+            for name in sorted(names):
+                logical = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+                data = _read(logical)
+                if logical.endswith('.css'):
+                    text = _rewrite_css_urls(data.decode('utf-8'), logical, files)
+                    data = minify_css(text).encode('utf-8')
+                elif logical.endswith('.js'):
+                    data = minify_js(data.decode('utf-8')).encode('utf-8')
+                dist_path = _fingerprint(logical, data)
+                files[logical] = dist_path
+                encodings[dist_path] = _write(dist_path, data)
+
+    # 2. 묶음
+    bundles = {}
+    for bundle, members in BUNDLES.items():
+        parts = []
+        for member in members:
+            text = _read(member).decode('utf-8')
+            if bundle.endswith('.css'):
+                parts.append(minify_css(_rewrite_css_urls(text, member, files)))
+            else:
+                parts.append(minify_js(text).rstrip() + ';')
+        data = '\n'.join(parts).encode('utf-8')
+        dist_path = _fingerprint(f'bundles/{bundle}', data)
+        bundles[bundle] = dist_path
+        encodings[dist_path] = _write(dist_path, data)
+
+    manifest = {'files': files, 'bundles': bundles, 'encodings': encodings}
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# 서빙
+# ---------------------------------------------------------------------------
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    # 해시 이름 자체로 요청해도 바로 찾을 수 있게 역방향도 등록
+    manifest['dist_paths'] = set(manifest['encodings'])
+    return manifest
+
+
+def _accepted_encodings():
+    return accepted_encodings(request.headers.get('Accept-Encoding'))
+
+
+def register_assets(app):
+    manifest = load_manifest()
+    app.extensions['museme_assets'] = manifest
+    static_view = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        # 시작할 때 읽어 둔 manifest 로 dict 조회 한 번만 한다
+        if manifest and endpoint == 'static':
+            dist_path = manifest['files'].get(values.get('filename'))
+            if dist_path:
+                values['filename'] = dist_path
+
+    def serve_static(filename):
+        if not manifest or filename not in manifest['dist_paths']:
+            return static_view(filename=filename)
+
+        accepted = _accepted_encodings()
+        available = manifest['encodings'][filename]
+        for encoding, suffix in ENCODING_SUFFIXES:
+            if encoding in available and encoding in accepted:
+                response = send_from_directory(STATIC_DIR, filename + suffix,
+                                               mimetype=_mimetype(filename))
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(STATIC_DIR, filename)
+        if available:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    app.view_functions['static'] = serve_static
+
+    @app.template_global()
+    def asset_urls(bundle):
+        """묶음 이름 -> <link>/<script> 에 넣을 URL 목록 (빌드 전에는 원본 파일들)"""
+        if manifest and bundle in manifest['bundles']:
+            return [url_for('static', filename=manifest['bundles'][bundle])]
+        return [url_for('static', filename=member) for member in BUNDLES[bundle]]
+
+
+def _mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+if __name__ == '__main__':
+    result = build()
+    total = len(result['files']) + len(result['bundles'])
+    print(f'{total}개 자산을 {DIST_DIR} 에 생성했습니다.'
+          f'{"" if brotli else " (brotli 모듈이 없어 gzip 만 생성)"}')
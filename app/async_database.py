@@ -0,0 +1,75 @@
+"""
+database.py 함수의 async 버전 (ASGI 모드용)
+
+SQLite 호출은 크기가 정해진 전용 스레드 풀에서 실행하므로 이벤트 루프는 막히지 않고,
+동시 연결 수가 늘어도 스레드 수(=커넥션 풀의 커넥션 수)는 DB_WORKERS 로 고정된다.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import database
+
+DB_WORKERS = int(os.environ.get('MUSEME_DB_WORKERS', 8))
+
+_lock = threading.Lock()
+_executor = None
+_pid = None
+
+
+def _get_executor():
+    # fork 된 워커 프로세스마다 자기 풀을 만든다
+    global _executor, _pid
+    with _lock:
+        if _executor is None or _pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+            _pid = os.getpid()
+        return _executor
+
+
+async def run_in_db(func, *args, **kwargs):
+    """func 를 DB 스레드 풀에서 실행하고 결과를 기다린다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+async def get_products(theme=None, category=None, sort='id', fields=None, limit=None, after=None):
+    return await run_in_db(database.get_products, theme, category, sort, fields, limit, after)
+
+
+async def get_products_page(theme=None, category=None, sort='id', fields=None, limit=None, after=None):
+    return await run_in_db(database.get_products_page, theme, category, sort, fields, limit, after)
+
+
+async def get_product_by_id(product_id):
+    return await run_in_db(database.get_product_by_id, product_id)
+
+
+async def get_products_by_ids(ids):
+    return await run_in_db(database.get_products_by_ids, ids)
+
+
+async def search_products(query, theme=None, category=None, min_price=None, max_price=None, limit=20):
+    return await run_in_db(database.search_products, query, theme, category, min_price, max_price, limit)
+
+
+async def get_user_by_email(email):
+    return await run_in_db(database.get_user_by_email, email)
+
+
+async def create_user(email, password_hash):
+    return await run_in_db(database.create_user, email, password_hash)
+
+
+async def update_user_password_hash(user_id, password_hash):
+    return await run_in_db(database.update_user_password_hash, user_id, password_hash)
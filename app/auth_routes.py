@@ -1,23 +1,18 @@
-from flask import Blueprint, request, jsonify
-import jwt
-import hashlib
-from datetime import datetime, timedelta
-from database import get_user_by_email, create_user
+from flask import Blueprint, request, jsonify, g
+from database import get_user_by_email, create_user, update_user_password_hash
+from passwords import hash_password, verify_password, verify_missing_user, needs_rehash, PasswordServiceBusy
+from auth_tokens import issue_token, current_user, login_required, verifier
 
 auth_bp = Blueprint('auth', __name__)
 
-SECRET_KEY = 'your-secret-key-change-in-production'
-
-def verify_password(stored_hash, password):
-    return stored_hash == password
-
 def generate_token(user_id, email):
-    payload = {
-        'user_id': user_id,
-        'email': email,
-        'exp': datetime.utcnow() + timedelta(days=7)
-    }
-    return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+    return issue_token(user_id, email)
+
+@auth_bp.errorhandler(PasswordServiceBusy)
+def password_service_busy(e):
+    response = jsonify({'error': '요청이 많아 잠시 후 다시 시도해주세요.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 @auth_bp.route('/api/auth/login', methods=['POST'])
 def login():
@@ -30,8 +25,16 @@ def login():
 
     user = get_user_by_email(email)
 
-    if not user or not verify_password(user['password_hash'], password):
+    # 없는 계정도 해시 계산을 해서 응답 시간으로 가입 여부를 알 수 없게 한다
+    if not user:
+        verify_missing_user(password)
         return jsonify({'error': '이메일 또는 비밀번호가 올바르지 않습니다.'}), 401
+    if not verify_password(user['password_hash'], password):
+        return jsonify({'error': '이메일 또는 비밀번호가 올바르지 않습니다.'}), 401
+
+    # 평문이거나 예전 비용 설정으로 저장된 해시는 로그인 성공 시 다시 해시
+    if needs_rehash(user['password_hash']):
+        update_user_password_hash(user['id'], hash_password(password))
 
     token = generate_token(user['id'], user['email'])
 
@@ -45,8 +48,19 @@ def login():
 
 @auth_bp.route('/api/auth/logout', methods=['POST'])
 def logout():
+    # 토큰이 있으면 만료 시각까지 폐기 목록에 올린다
+    payload = current_user()
+    if payload:
+        verifier.revoke(payload)
+        verifier.forget(g._auth_token)
     return jsonify({'message': '로그아웃 되었습니다.'})
 
+@auth_bp.route('/api/auth/me')
+@login_required
+def me():
+    user = current_user()
+    return jsonify({'user': {'id': user['user_id'], 'email': user['email']}})
+
 @auth_bp.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -60,7 +74,7 @@ def register():
     if existing_user:
         return jsonify({'error': '이미 등록된 이메일입니다.'}), 400
 
-    user_id = create_user(email, password)
+    user_id = create_user(email, hash_password(password))
     token = generate_token(user_id, email)
 
     return jsonify({
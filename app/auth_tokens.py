@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+import jwt
+from flask import g, jsonify, request
+
+import database
+from metrics import timed, register_cache, AUTH_SECONDS
+
+ALGORITHM = 'HS256'
+TOKEN_LIFETIME = timedelta(days=7)
+VERIFIED_CACHE_SIZE = 4096
+# 캐시에 있는 토큰도 이 간격마다 DB 폐기 목록을 다시 확인한다. 다른 워커에서 로그아웃한 토큰은
+# 이 프로세스에서 최대 이만큼 더 통과할 수 있다 (같은 프로세스에서 로그아웃하면 바로 막힌다)
+REVOCATION_CHECK_INTERVAL = float(os.environ.get('MUSEME_REVOCATION_CHECK_INTERVAL', 30))  # 초
+LEGACY_KID = 'default'
+
+
+def _load_key_ring():
+    """
+    MUSEME_JWT_KEYS="kid1:secret1,kid2:secret2" 형식. 새 토큰은 MUSEME_JWT_CURRENT_KID 로 서명하고,
+    나머지 키는 교체 기간 동안 기존 토큰 검증에만 쓴다.
+    """
+    keys = {LEGACY_KID: os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'}
+    for item in filter(None, os.environ.get('MUSEME_JWT_KEYS', '').split(',')):
+        kid, _, secret = item.partition(':')
+        keys[kid.strip()] = secret.strip()
+    current = os.environ.get('MUSEME_JWT_CURRENT_KID', LEGACY_KID)
+    if current not in keys:
+        raise RuntimeError(f'Unknown MUSEME_JWT_CURRENT_KID: {current}')
+    return keys, current
+
+
+KEY_RING, CURRENT_KID = _load_key_ring()
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiringSet:
+    """만료 시각이 지나면 스스로 사라지는 집합 (이 프로세스가 확인한 로그아웃 토큰 jti)"""
+
+    def __init__(self, purge_interval=60):
+        self._items = {}
+        self._lock = threading.Lock()
+        self._purge_interval = purge_interval
+        self._next_purge = time.time() + purge_interval
+
+    def add(self, key, expires_at):
+        with self._lock:
+            self._items[key] = expires_at
+            self._maybe_purge()
+
+    def __contains__(self, key):
+        expires_at = self._items.get(key)
+        return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._items = {k: exp for k, exp in self._items.items() if exp > now}
+        self._next_purge = now + self._purge_interval
+
+
+class TokenVerifier:
+    """
+    검증한 토큰을 LRU 에 보관해 같은 토큰의 HMAC/JSON 디코딩을 건너뛴다.
+    로그아웃 폐기 목록은 SQLite(revoked_tokens)에 두어 워커 프로세스끼리 공유한다.
+    캐시에 없던 토큰은 바로, 캐시에 있던 토큰은 REVOCATION_CHECK_INTERVAL 마다 DB 를 확인한다.
+    """
+
+    def __init__(self, max_entries=VERIFIED_CACHE_SIZE, revocation_check_interval=REVOCATION_CHECK_INTERVAL):
+        self.max_entries = max_entries
+        self.revocation_check_interval = revocation_check_interval
+        self._verified = OrderedDict()  # token -> [payload, 폐기 목록을 확인한 time.monotonic()]
+        self._lock = threading.Lock()
+        self.revoked = ExpiringSet()
+        self.hits = 0
+        self.misses = 0
+
+    @timed(AUTH_SECONDS, 'jwt_decode', 'auth')
+    def _decode(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid', LEGACY_KID)
+            key = KEY_RING.get(kid)
+            if key is None:
+                raise InvalidToken('unknown key id')
+            return jwt.decode(token, key, algorithms=[ALGORITHM])
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e))
+
+    def verify(self, token):
+        with self._lock:
+            entry = self._verified.get(token)
+            if entry is not None:
+                self._verified.move_to_end(token)
+                self.hits += 1
+        if entry is None:
+            entry = [self._decode(token), None]
+            with self._lock:
+                self.misses += 1
+                self._verified[token] = entry
+                while len(self._verified) > self.max_entries:
+                    self._verified.popitem(last=False)
+        payload, checked_at = entry
+
+        # 캐시에 있어도 만료/로그아웃 여부는 매번 확인
+        if payload['exp'] <= time.time():
+            self.forget(token)
+            raise InvalidToken('token expired')
+        jti = payload.get('jti')
+        if jti in self.revoked:
+            raise InvalidToken('token revoked')
+        now = time.monotonic()
+        if jti and (checked_at is None or now - checked_at >= self.revocation_check_interval):
+            if database.is_token_revoked(jti):
+                self.revoked.add(jti, payload['exp'])
+                raise InvalidToken('token revoked')
+            entry[1] = now
+        return payload
+
+    def revoke(self, payload):
+        if payload.get('jti'):
+            self.revoked.add(payload['jti'], payload['exp'])
+            database.revoke_token(payload['jti'], payload['exp'])
+
+    def forget(self, token):
+        with self._lock:
+            self._verified.pop(token, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._verified),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revoked': len(self.revoked),
+            }
+
+
+verifier = TokenVerifier()
+register_cache('jwt_verified', verifier.stats)
+
+
+@timed(AUTH_SECONDS, 'jwt_encode', 'auth')
+def issue_token(user_id, email):
+    payload = {
+        'user_id': user_id,
+        'email': email,
+        'jti': uuid.uuid4().hex,
+        'exp': datetime.utcnow() + TOKEN_LIFETIME
+    }
+    return jwt.encode(payload, KEY_RING[CURRENT_KID], algorithm=ALGORITHM,
+                      headers={'kid': CURRENT_KID})
+
+
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    return token.strip()
+
+
+def current_user():
+    """요청당 한 번만 검증하고 결과를 g 에 저장한다. 인증되지 않았으면 None."""
+    if '_auth_payload' not in g:
+        token = _bearer_token()
+        payload = None
+        if token:
+            try:
+                payload = verifier.verify(token)
+            except InvalidToken:
+                payload = None
+        g._auth_token = token
+        g._auth_payload = payload
+    return g._auth_payload
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user() is None:
+            return jsonify({'error': '로그인이 필요합니다.'}), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,477 @@
+"""
+장바구니 서비스
+
+장바구니 상태는 사용자별로 메모리에 두고, 변경은 SQLite 에 바로 쓰지 않고 모아서 기록한다 (write-behind).
+  - 변경할 때마다 저널 파일에 한 줄을 덧붙이고(append) 메모리 상태와 대기 목록만 고친다
+  - 백그라운드 스레드가 FLUSH_INTERVAL 마다(또는 대기 목록이 FLUSH_BATCH_SIZE 를 넘으면 바로)
+    대기 중인 변경을 한 트랜잭션으로 기록하고, 기록이 끝난 저널 조각을 지운다
+  - 같은 항목을 여러 번 바꾸면 마지막 상태만 기록한다
+  - 프로세스가 죽으면 다음 시작 때 남은 저널 조각을 다시 적용한다 (recover)
+
+저널은 운영체제에 바로 넘기므로 프로세스가 죽어도 남는다. 전원 장애까지 견디려면
+MUSEME_CART_JOURNAL_FSYNC=1 로 매 변경마다 fsync 한다.
+
+기록하다 무결성 오류가 나는 변경(그 사이 삭제된 제품 등)은 하나씩 다시 기록해 보고 실패한 것만 버린다.
+한 변경 때문에 묶음 전체가 계속 되돌아가 이후 기록이 모두 막히지 않게 하기 위해서다.
+
+메모리 상태는 한 프로세스 안에서만 맞다. 같은 DB 를 쓰는 다른 워커 프로세스가 있으면(저널 조각의 pid 로
+확인, MUSEME_CART_SHARED=1 이면 처음부터) 공유 모드로 바꿔 DB 를 기준으로 삼는다.
+공유 모드는 write-behind 가 아니라 write-through 다. 모아서 기록하는 이점은 없어진다.
+  - 읽을 때마다 DB 에서 다시 읽는다 (이 프로세스에 아직 기록하지 않은 변경이 있는 사용자는 제외)
+  - 바꿀 때마다 그 자리에서 쓰기 트랜잭션 하나로 기록한다 (클릭마다 한 번)
+  - DB 가 잠겨 있으면 변경은 저널과 대기 목록에 남고 flush 스레드가 다시 기록한다. 그동안 다른 워커는
+    이전 상태를 읽는다 (write_through_deferred 지표로 센다)
+MUSEME_CART_SHARED=0 이면 단일 프로세스로 보고 확인하지 않는다.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import database
+from metrics import register_collector
+
+FLUSH_INTERVAL = float(os.environ.get('MUSEME_CART_FLUSH_INTERVAL', 0.5))  # 초
+FLUSH_BATCH_SIZE = 500
+JOURNAL_FSYNC = os.environ.get('MUSEME_CART_JOURNAL_FSYNC') == '1'
+# '1': 항상 공유 모드, '0': 단일 프로세스, 그 밖: 다른 워커가 보이면 공유 모드
+CART_SHARED = os.environ.get('MUSEME_CART_SHARED', 'auto')
+
+MAX_ITEMS_PER_CART = 100
+MAX_QUANTITY = 99
+PURCHASE_TYPES = ('buy', 'rent')
+
+# 이 시간 동안 쓰지 않은 장바구니는 (기록이 끝났으면) 메모리에서 내린다
+CART_IDLE_SECONDS = 600
+
+
+class CartItemNotFound(KeyError):
+    pass
+
+
+class CartFull(Exception):
+    pass
+
+
+def _journal_base():
+    return database.DATABASE + '-cart-journal'
+
+
+class CartService:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._carts = OrderedDict()   # user_id -> OrderedDict(item_id -> item)
+        self._last_access = {}
+        self._pending = {}            # item_id -> ('upsert' | 'delete', item)
+        self._flushing = {}           # flush 가 지금 기록 중인 변경 (같은 형식)
+        self._journal = None          # (path, fd)
+        self._sealed = []             # flush 를 기다리는 닫힌 저널 조각 [(path, fd)]
+        self._seq = 0
+        self._pid = None
+        self._flusher = None
+        self._shared = CART_SHARED == '1'
+        self.flushes = 0
+        self.flushed_changes = 0
+        self.dropped_changes = 0
+        self.write_through_deferred = 0
+
+    # ------------------------------------------------------------------
+    # 시작 / 저널
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        # fork 된 워커 프로세스마다 자기 저널과 flush 스레드를 갖는다 (self._lock 안에서 호출)
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._carts.clear()
+        self._pending.clear()
+        self._sealed = []
+        self._journal = None
+        self._open_journal()
+        if CART_SHARED not in ('0', '1'):
+            self._shared = self._peers_alive()
+        self._flusher = threading.Thread(target=self._flush_loop, name='cart-flush', daemon=True)
+        self._flusher.start()
+
+    def _open_journal(self):
+        self._seq += 1
+        path = f'{_journal_base()}.{self._pid}.{self._seq:08d}'
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        # 살아 있는 프로세스의 저널은 잠가 두어 다른 프로세스의 recover 가 건드리지 않게 한다
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        self._journal = (path, fd)
+
+    def _append_journal(self, op, item):
+        line = json.dumps({'op': op, 'item': item}, separators=(',', ':')) + '\n'
+        fd = self._journal[1]
+        os.write(fd, line.encode('utf-8'))
+        if JOURNAL_FSYNC:
+            os.fsync(fd)
+
+    def _peers_alive(self):
+        """같은 DB 의 저널을 가진 다른 살아 있는 프로세스가 있으면 True"""
+        for path in glob.glob(_journal_base() + '.*.*'):
+            try:
+                pid = int(path.rsplit('.', 2)[1])
+            except ValueError:
+                continue
+            if pid == self._pid:
+                continue
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                continue  # 죽은 프로세스가 남긴 조각 (recover 가 처리한다)
+            except PermissionError:
+                pass
+            return True
+        return False
+
+    def _check_shared(self):
+        # 워커들은 거의 동시에 뜨므로 시작할 때뿐 아니라 flush 주기마다 확인한다
+        if self._shared or CART_SHARED in ('0', '1') or not self._peers_alive():
+            return
+        with self._lock:
+            self._shared = True
+            # 이후 읽기는 DB 에서 (기록하지 않은 변경은 다시 읽을 때 그 위에 적용된다)
+            self._carts.clear()
+            self._last_access.clear()
+
+    def recover(self):
+        """죽은 프로세스가 남긴 저널 조각을 DB 에 적용하고 지운다. 적용한 변경 수를 돌려준다."""
+        segments = []
+        for path in sorted(glob.glob(_journal_base() + '.*.*'),
+                           key=lambda p: tuple(int(x) for x in p.rsplit('.', 2)[1:])):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)  # 살아 있는 프로세스가 쓰는 중
+                continue
+            segments.append((path, fd))
+
+        changes = {}
+        try:
+            for path, fd in segments:
+                with os.fdopen(os.dup(fd), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            break  # 쓰다가 끊긴 마지막 줄
+                        changes[entry['item']['id']] = (entry['op'], entry['item'])
+            if changes:
+                _write_changes(changes)
+            for path, _ in segments:
+                os.unlink(path)
+        finally:
+            for _, fd in segments:
+                os.close(fd)
+        return len(changes)
+
+    # ------------------------------------------------------------------
+    # flush
+    # ------------------------------------------------------------------
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self._check_shared()
+                self.flush()
+                self._evict_idle()
+            except Exception:
+                # DB 가 잠겨 있거나 일시적인 오류면 다음 주기에 다시 시도 (변경은 대기 목록과 저널에 남아 있다)
+                time.sleep(FLUSH_INTERVAL)
+
+    def flush(self):
+        """대기 중인 변경을 한 트랜잭션으로 기록한다. 기록한 변경 수를 돌려준다."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending or self._pid != os.getpid():
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+                # 지금까지의 저널을 닫고 새 조각에 이어 쓴다 (닫힌 조각은 기록이 끝나면 지운다)
+                self._sealed.append(self._journal)
+                self._open_journal()
+                sealed = list(self._sealed)
+
+            try:
+                dropped = _write_changes(batch)
+            except Exception:
+                with self._lock:
+                    self._flushing = {}
+                    # 그 사이 더 새로운 변경이 있으면 그것을 남긴다
+                    for item_id, change in batch.items():
+                        self._pending.setdefault(item_id, change)
+                raise
+
+            with self._lock:
+                self._flushing = {}
+                self._sealed = [s for s in self._sealed if s not in sealed]
+                self.flushes += 1
+                self.flushed_changes += len(batch) - len(dropped)
+                self.dropped_changes += len(dropped)
+                for op, item in dropped:
+                    # 기록할 수 없는 항목은 메모리 장바구니에서도 뺀다 (그 뒤 새 변경이 있으면 그대로 둔다)
+                    cart = self._carts.get(item['user_id'])
+                    if cart is not None and item['id'] not in self._pending:
+                        cart.pop(item['id'], None)
+            for path, fd in sealed:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                os.close(fd)
+            return len(batch)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - CART_IDLE_SECONDS
+        with self._lock:
+            dirty = {item['user_id'] for _, item in self._pending.values()}
+            for user_id in list(self._carts):
+                if self._last_access.get(user_id, 0) < cutoff and user_id not in dirty:
+                    del self._carts[user_id]
+                    self._last_access.pop(user_id, None)
+
+    def close(self):
+        """남은 변경을 기록하고 저널을 닫는다 (프로세스 종료 시)."""
+        try:
+            self.flush()
+        except Exception:
+            return  # 저널이 남아 있으므로 다음 시작 때 recover 로 적용된다
+        with self._lock:
+            if self._journal is not None and self._pid == os.getpid():
+                path, fd = self._journal
+                if not self._pending:
+                    os.unlink(path)
+                os.close(fd)
+                self._journal = None
+                self._pid = None
+
+    # ------------------------------------------------------------------
+    # 장바구니 조작
+    # ------------------------------------------------------------------
+
+    def _cart(self, user_id):
+        """user_id 의 장바구니 (self._lock 안에서 호출). 메모리에 없으면 None."""
+        cart = self._carts.get(user_id)
+        if cart is not None:
+            self._carts.move_to_end(user_id)
+            self._last_access[user_id] = time.monotonic()
+        return cart
+
+    def _unwritten(self, user_id):
+        # DB 에 아직 없는 이 사용자의 변경 (기록 중인 것 먼저, 그 뒤 대기 중인 것)
+        for changes in (self._flushing, self._pending):
+            for op, item in changes.values():
+                if item['user_id'] == user_id:
+                    yield op, item
+
+    def _has_pending(self, user_id):
+        return any(True for _ in self._unwritten(user_id))
+
+    def _load(self, user_id):
+        """
+        user_id 의 장바구니를 메모리에 올린다 (처음 보는 사용자만 DB 에서 한 번, 공유 모드에서는 매번).
+        DB 는 잠그지 않고 읽으므로 호출한 쪽은 잠근 뒤 _loaded_cart 로 장바구니를 얻는다.
+        """
+        with self._lock:
+            self._ensure_started()
+            reload = self._shared and not self._has_pending(user_id)
+            if reload:
+                self._carts.pop(user_id, None)
+            if self._cart(user_id) is not None:
+                return
+        rows = database.get_cart_items(user_id)
+        with self._lock:
+            if user_id not in self._carts or (reload and not self._has_pending(user_id)):
+                self._install(user_id, rows)
+
+    def _loaded_cart(self, user_id):
+        """
+        _load 뒤에 self._lock 안에서 호출한다. 잠금을 놓은 사이 다른 _load, 공유 모드 전환, 유휴 정리가
+        장바구니를 내렸으면 잠근 채로 다시 읽는다 (드문 경우라 그동안 다른 사용자 요청은 기다린다).
+        """
+        cart = self._cart(user_id)
+        if cart is None:
+            cart = self._install(user_id, database.get_cart_items(user_id))
+        return cart
+
+    def _install(self, user_id, rows):
+        # self._lock 안에서 호출. 아직 기록하지 않은 이 사용자의 변경은 DB 에서 읽은 행 위에 다시 적용한다
+        cart = OrderedDict(
+            (row['id'], {
+                'id': row['id'],
+                'user_id': user_id,
+                'product_id': row['product_id'],
+                'option': row['item_option'],
+                'purchase_type': row['purchase_type'],
+                'quantity': row['quantity'],
+            }) for row in rows
+        )
+        for op, item in self._unwritten(user_id):
+            if op == 'delete':
+                cart.pop(item['id'], None)
+            else:
+                cart[item['id']] = dict(item)
+        self._carts[user_id] = cart
+        self._last_access[user_id] = time.monotonic()
+        return cart
+
+    def _record(self, op, item):
+        self._append_journal(op, item)
+        self._pending[item['id']] = (op, dict(item))
+        if len(self._pending) >= FLUSH_BATCH_SIZE:
+            self._wake.set()
+
+    def _items(self, cart):
+        return [dict(item) for item in cart.values()]
+
+    def _write_through(self):
+        # 공유 모드에서는 다른 워커가 바로 읽을 수 있게 변경마다 곧바로 기록한다 (모아서 기록하지 않는다)
+        if not self._shared:
+            return
+        try:
+            self.flush()
+        except sqlite3.OperationalError:
+            # DB 가 잠겨 있으면 요청은 실패시키지 않고 저널에 남은 변경을 flush 스레드가 다시 기록한다
+            with self._lock:
+                self.write_through_deferred += 1
+
+    def get_items(self, user_id):
+        self._load(user_id)
+        with self._lock:
+            return self._items(self._loaded_cart(user_id))
+
+    def add_item(self, user_id, product_id, quantity=1, option=None, purchase_type='buy'):
+        """같은 상품/옵션/구매 방식이 이미 있으면 수량을 더한다. 바뀐 장바구니 항목 목록을 돌려준다."""
+        self._load(user_id)
+        with self._lock:
+            cart = self._loaded_cart(user_id)
+            for item in cart.values():
+                if (item['product_id'], item['option'], item['purchase_type']) == (product_id, option, purchase_type):
+                    item['quantity'] = min(MAX_QUANTITY, item['quantity'] + quantity)
+                    break
+            else:
+                if len(cart) >= MAX_ITEMS_PER_CART:
+                    raise CartFull()
+                item = {
+                    'id': secrets.token_hex(8),
+                    'user_id': user_id,
+                    'product_id': product_id,
+                    'option': option,
+                    'purchase_type': purchase_type,
+                    'quantity': min(MAX_QUANTITY, quantity),
+                }
+                cart[item['id']] = item
+            self._record('upsert', item)
+            items = self._items(cart)
+        self._write_through()
+        return items
+
+    def update_item(self, user_id, item_id, quantity):
+        """수량을 바꾼다. 0 이하면 삭제한다."""
+        if quantity <= 0:
+            return self.remove_item(user_id, item_id)
+        self._load(user_id)
+        with self._lock:
+            cart = self._loaded_cart(user_id)
+            item = cart.get(item_id)
+            if item is None:
+                raise CartItemNotFound(item_id)
+            item['quantity'] = min(MAX_QUANTITY, quantity)
+            self._record('upsert', item)
+            items = self._items(cart)
+        self._write_through()
+        return items
+
+    def remove_item(self, user_id, item_id):
+        self._load(user_id)
+        with self._lock:
+            cart = self._loaded_cart(user_id)
+            item = cart.pop(item_id, None)
+            if item is None:
+                raise CartItemNotFound(item_id)
+            self._record('delete', item)
+            items = self._items(cart)
+        self._write_through()
+        return items
+
+    def stats(self):
+        with self._lock:
+            return {
+                'carts': len(self._carts),
+                'pending': len(self._pending),
+                'flushes': self.flushes,
+                'flushed_changes': self.flushed_changes,
+                'dropped_changes': self.dropped_changes,
+                'write_through_deferred': self.write_through_deferred,
+                'shared': self._shared,
+            }
+
+
+def _write_changes(changes):
+    """
+    changes 를 한 트랜잭션으로 기록한다. 무결성 오류가 나면 하나씩 다시 기록하고,
+    그래도 실패한 변경 (op, item) 목록을 돌려준다 (버려진다).
+    """
+    try:
+        _apply_changes(changes.values())
+        return []
+    except sqlite3.IntegrityError:
+        pass
+    dropped = []
+    for change in changes.values():
+        try:
+            _apply_changes([change])
+        except sqlite3.IntegrityError:
+            dropped.append(change)
+    return dropped
+
+
+def _apply_changes(changes):
+    upserts = []
+    deletes = []
+    for op, item in changes:
+        if op == 'delete':
+            deletes.append(item['id'])
+        else:
+            upserts.append((item['id'], item['user_id'], item['product_id'], item['option'],
+                            item['purchase_type'], item['quantity']))
+    database.apply_cart_changes(upserts, deletes)
+
+
+cart_service = CartService()
+atexit.register(cart_service.close)
+
+
+@register_collector
+def _cart_metrics():
+    stats = cart_service.stats()
+    return [
+        ('museme_cart_loaded_carts', 'gauge', '메모리에 올라와 있는 장바구니 수', [({}, stats['carts'])]),
+        ('museme_cart_pending_changes', 'gauge', 'DB 에 아직 기록하지 않은 장바구니 변경 수', [({}, stats['pending'])]),
+        ('museme_cart_flushes_total', 'counter', '장바구니 일괄 기록 횟수', [({}, stats['flushes'])]),
+        ('museme_cart_flushed_changes_total', 'counter', '일괄 기록한 장바구니 변경 수',
+         [({}, stats['flushed_changes'])]),
+        ('museme_cart_dropped_changes_total', 'counter', '무결성 오류로 기록하지 못하고 버린 장바구니 변경 수',
+         [({}, stats['dropped_changes'])]),
+        ('museme_cart_write_through_deferred_total', 'counter',
+         '공유 모드에서 DB 가 잠겨 바로 기록하지 못하고 flush 스레드로 미룬 변경 수',
+         [({}, stats['write_through_deferred'])]),
+    ]
@@ -0,0 +1,105 @@
+from flask import Blueprint, request, jsonify
+from database import get_products_by_ids
+from auth_tokens import current_user, login_required
+from catalog_snapshot import current_snapshot
+from cart import cart_service, CartItemNotFound, CartFull, MAX_QUANTITY, PURCHASE_TYPES
+
+cart_bp = Blueprint('cart', __name__)
+
+def _products(ids):
+    """장바구니에 필요한 제품 정보 {id: dict}. 스냅샷이 있으면 SQL 없이 찾는다."""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        records = (snapshot.by_id.get(i) for i in ids)
+        return {r.id: r.as_dict(('id', 'name', 'thumbnail', 'buy_price', 'rent_price')) for r in records if r}
+    return {p['id']: p for p in get_products_by_ids(ids)}
+
+def _cart_response(items, status=200):
+    # DB 를 다시 읽지 않고 메모리의 장바구니로 응답한다
+    products = _products(list(dict.fromkeys(item['product_id'] for item in items)))
+    result = []
+    total_quantity = 0
+    total_price = 0
+    for item in items:
+        product = products.get(item['product_id'])
+        if product is None:
+            continue  # 카탈로그에서 내려간 제품
+        unit_price = (product['rent_price'] if item['purchase_type'] == 'rent' else product['buy_price']) or 0
+        subtotal = unit_price * item['quantity']
+        total_quantity += item['quantity']
+        total_price += subtotal
+        result.append({
+            'id': item['id'],
+            'product_id': item['product_id'],
+            'name': product['name'],
+            'thumbnail': product['thumbnail'],
+            'option': item['option'],
+            'purchase_type': item['purchase_type'],
+            'quantity': item['quantity'],
+            'unit_price': unit_price,
+            'subtotal': subtotal,
+        })
+    response = jsonify({'items': result, 'total_quantity': total_quantity, 'total_price': total_price})
+    response.headers['Cache-Control'] = 'no-store'
+    return response, status
+
+def _quantity(data, default=None):
+    quantity = data.get('quantity', default)
+    if isinstance(quantity, bool) or not isinstance(quantity, int):
+        raise ValueError('quantity must be an integer')
+    return quantity
+
+@cart_bp.errorhandler(CartItemNotFound)
+def cart_item_not_found(e):
+    return jsonify({'error': '장바구니 항목을 찾을 수 없습니다.'}), 404
+
+@cart_bp.errorhandler(CartFull)
+def cart_full(e):
+    return jsonify({'error': '장바구니에 더 담을 수 없습니다.'}), 400
+
+@cart_bp.route('/api/cart')
+@login_required
+def get_cart():
+    return _cart_response(cart_service.get_items(current_user()['user_id']))
+
+@cart_bp.route('/api/cart/items', methods=['POST'])
+@login_required
+def add_cart_item():
+    data = request.get_json(silent=True) or {}
+    try:
+        product_id = int(data.get('product_id'))
+        quantity = _quantity(data, 1)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'product_id 와 quantity 를 확인해주세요.'}), 400
+    if not 1 <= quantity <= MAX_QUANTITY:
+        return jsonify({'error': f'quantity must be between 1 and {MAX_QUANTITY}'}), 400
+    purchase_type = data.get('purchase_type') or 'buy'
+    if purchase_type not in PURCHASE_TYPES:
+        return jsonify({'error': 'purchase_type must be buy or rent'}), 400
+    option = data.get('option') or None
+    if option is not None and not isinstance(option, str):
+        return jsonify({'error': 'option must be a string'}), 400
+
+    if product_id not in _products([product_id]):
+        return jsonify({'error': 'Product not found'}), 404
+
+    items = cart_service.add_item(current_user()['user_id'], product_id, quantity, option, purchase_type)
+    return _cart_response(items, 201)
+
+@cart_bp.route('/api/cart/items/<item_id>', methods=['PUT'])
+@login_required
+def update_cart_item(item_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        quantity = _quantity(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if quantity > MAX_QUANTITY:
+        return jsonify({'error': f'quantity must be at most {MAX_QUANTITY}'}), 400
+    # 0 이하로 바꾸면 삭제
+    return _cart_response(cart_service.update_item(current_user()['user_id'], item_id, quantity))
+
+@cart_bp.route('/api/cart/items/<item_id>', methods=['DELETE'])
+@login_required
+def remove_cart_item(item_id):
+    return _cart_response(cart_service.remove_item(current_user()['user_id'], item_id))
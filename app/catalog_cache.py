@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from metrics import register_cache
+
+# 카탈로그 응답 캐시 설정
+MAX_ENTRIES = 512
+TTL_SECONDS = 300
+FRAGMENT_MAX_ENTRIES = 256  # SSR HTML 조각
+
+# variants: 인코딩 -> 압축한 본문 (compression.py 가 처음 요청될 때 채운다)
+CacheEntry = namedtuple('CacheEntry', ['body', 'etag', 'last_modified', 'version', 'expires_at', 'variants'])
+
+_version_lock = threading.Lock()
+_catalog_version = 0
+_catalog_changed_at = time.time()
+
+
+def catalog_version():
+    return _catalog_version
+
+
+def catalog_changed_at():
+    return _catalog_changed_at
+
+
+def bump_catalog_version():
+    """제품/이미지를 바꾸는 쓰기 경로에서 호출한다. 기존 캐시 항목은 모두 무효가 된다."""
+    global _catalog_version, _catalog_changed_at
+    with _version_lock:
+        _catalog_version += 1
+        _catalog_changed_at = time.time()
+        return _catalog_version
+
+
+class CatalogCache:
+    """직렬화된 JSON 바이트를 담는 LRU + TTL 캐시"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != _catalog_version or entry.expires_at < time.monotonic():
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, body, version=None):
+        # version 은 데이터를 읽기 전에 받아 둔 값을 넘겨야 경쟁 상태에서 오래된 값이 남지 않는다
+        if version is None:
+            version = _catalog_version
+        # 강한 ETag 는 본문 해시, Last-Modified 는 마지막 카탈로그 변경 시각
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = CacheEntry(body, etag, int(_catalog_changed_at), version,
+                           time.monotonic() + self.ttl, {})
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def get_or_set(self, key, loader):
+        """캐시에 없으면 loader() 로 바이트를 만들어 저장한다. loader 가 None 을 주면 저장하지 않는다."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        version = _catalog_version
+        body = loader()
+        if body is None:
+            return None
+        return self.set(key, body, version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'catalog_version': _catalog_version,
+            }
+
+
+catalog_cache = CatalogCache()
+fragment_cache = CatalogCache(max_entries=FRAGMENT_MAX_ENTRIES)
+register_cache('catalog', catalog_cache.stats)
+register_cache('fragments', fragment_cache.stats)
@@ -0,0 +1,254 @@
+"""
+카탈로그 스냅샷: 제품 전체를 메모리에 올린 읽기 전용 색인
+
+카탈로그는 요청 수에 비해 아주 작으므로 시작할 때(그리고 카탈로그가 바뀔 때) 한 번 읽어
+  - id / 테마 / (테마, 카테고리) 별 색인
+  - 정렬별 키셋 페이지네이션용 정렬 목록
+  - 제품별로 인코딩한 JSON (처음 쓰일 때 만들어 보관)
+을 만들어 두고, /api/products 와 /api/product/<id> 는 SQL 없이 여기서 응답을 만든다.
+
+스냅샷은 만든 뒤 바꾸지 않고 모듈 전역 참조만 통째로 교체하므로 읽는 쪽은 잠그지 않는다.
+카탈로그 버전이 바뀌었는데 아직 새 스냅샷이 없으면 None 을 돌려주고 호출한 쪽은 DB 로 처리한다.
+"""
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from catalog_cache import catalog_version, TTL_SECONDS
+from database import get_db, PRODUCT_FIELDS, PRODUCT_SORTS
+import fast_json
+
+SNAPSHOT_ENABLED = os.environ.get('MUSEME_CATALOG_SNAPSHOT', '1') != '0'
+# 다른 프로세스의 쓰기는 버전으로 알 수 없으므로 이 시간이 지나면 백그라운드에서 다시 만든다
+SNAPSHOT_MAX_AGE = TTL_SECONDS
+# 미리 인코딩해 두는 fields 조합 수 (그 밖의 조합은 요청 때 인코딩)
+MAX_ENCODED_FIELD_SETS = 8
+
+IMAGE_FIELDS = ('detail_images', 'wearing_shots')
+
+
+def _dumps(value):
+    # routes._encode_json 과 같은 인코더 (orjson 이 있으면 orjson)
+    return fast_json.dumps(value)
+
+
+class ProductRecord:
+    __slots__ = PRODUCT_FIELDS + IMAGE_FIELDS
+
+    def as_dict(self, fields=PRODUCT_FIELDS):
+        return {f: getattr(self, f) for f in fields}
+
+
+class _SortedView:
+    """한 (테마, 카테고리) 묶음을 한 정렬 기준으로 오름차순 정렬한 목록"""
+    __slots__ = ('records', 'keys', 'column')
+
+    def __init__(self, records, column):
+        self.column = column
+        if column == 'id':
+            self.records = records  # 색인은 이미 id 순서
+        else:
+            self.records = sorted(records, key=lambda r: (getattr(r, column), r.id))
+        self.keys = [(getattr(r, column), r.id) for r in self.records]
+
+    def page(self, descending, limit, after):
+        """(제품 목록, 다음 커서). after 는 (정렬값, id)"""
+        records = self.records
+        if descending:
+            end = len(records) if after is None else bisect_left(self.keys, tuple(after))
+            start = 0 if limit is None else max(0, end - limit - 1)
+            rows = records[start:end][::-1]
+        else:
+            start = 0 if after is None else bisect_right(self.keys, tuple(after))
+            end = len(records) if limit is None else start + limit + 1
+            rows = records[start:end]
+
+        next_after = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_after = (getattr(last, self.column), last.id)
+        return rows, next_after
+
+
+class CatalogSnapshot:
+    def __init__(self, records, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.by_id = {r.id: r for r in records}
+        self.by_theme = {}
+        self.by_category = {}
+        self.by_theme_category = {}
+        for r in records:
+            self.by_theme.setdefault(r.theme, []).append(r)
+            self.by_category.setdefault(r.category, []).append(r)
+            self.by_theme_category.setdefault((r.theme, r.category), []).append(r)
+        self.all = records
+        # 정렬 목록과 fields 별 JSON 은 처음 쓰일 때 만든다 (dict 대입은 원자적이라 경쟁해도 안전)
+        self._views = {}
+        self._encoded = {}
+        self._details = {}
+
+    def detail_json(self, product_id):
+        """/api/product/<id> 응답 본문 바이트. 없는 제품이면 None."""
+        body = self._details.get(product_id)
+        if body is None:
+            record = self.by_id.get(product_id)
+            if record is None:
+                return None
+            body = self._details[product_id] = (_dumps(record.as_dict(record.__slots__)) + '\n').encode('utf-8')
+        return body
+
+    def _group(self, theme, category):
+        if category == 'all':
+            category = None
+        if theme and category:
+            return self.by_theme_category.get((theme, category), ())
+        if theme:
+            return self.by_theme.get(theme, ())
+        if category:
+            return self.by_category.get(category, ())
+        return self.all
+
+    def _view(self, theme, category, column):
+        key = (theme, category, column)
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = _SortedView(self._group(theme, category), column)
+        return view
+
+    def _fragments(self, fields):
+        encoded = self._encoded.get(fields)
+        if encoded is not None:
+            return encoded
+        columns = PRODUCT_FIELDS if fields is None else fields
+        encoded = {r.id: _dumps(r.as_dict(columns)) for r in self.all}
+        if len(self._encoded) < MAX_ENCODED_FIELD_SETS:
+            self._encoded[fields] = encoded
+        return encoded
+
+    def products_page(self, theme=None, category=None, sort='id', fields=None, limit=None, after=None):
+        """
+        database.get_products_page 와 같은 결과를 메모리에서 만든다.
+        정렬값에 NULL 이 있거나 커서 값의 타입이 맞지 않으면 None (DB 로 처리).
+        """
+        if sort not in PRODUCT_SORTS:
+            raise ValueError(f'Unknown sort: {sort}')
+        if fields:
+            unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            fields = tuple(dict.fromkeys(fields))
+        else:
+            fields = None
+        column, descending = PRODUCT_SORTS[sort]
+        try:
+            rows, next_after = self._view(theme, category, column).page(descending, limit, after)
+        except TypeError:
+            return None
+        return rows, next_after, fields
+
+    def listing_json(self, theme=None, category=None, sort='id', fields=None, limit=None,
+                     after=None, cursor_encoder=None):
+        """/api/products 응답 본문 바이트. 처리할 수 없으면 None."""
+        result = self.products_page(theme, category, sort, fields, limit, after)
+        if result is None:
+            return None
+        rows, next_after, fields = result
+        fragments = self._fragments(fields)
+        cursor = cursor_encoder(next_after) if cursor_encoder else next_after
+        # fast_json.encode({'next_cursor': ..., 'products': [...]}) 와 같은 바이트 (키 정렬, 같은 구분자)
+        item, key = fast_json.ITEM_SEPARATOR, fast_json.KEY_SEPARATOR
+        body = ''.join((
+            '{"next_cursor"', key, _dumps(cursor), item, '"products"', key, '[',
+            item.join(fragments[r.id] for r in rows),
+            ']}\n',
+        ))
+        return body.encode('utf-8')
+
+
+def load_snapshot():
+    """DB 에서 카탈로그 전체를 읽어 새 스냅샷을 만든다."""
+    version = catalog_version()
+    records = []
+    with get_db() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(PRODUCT_FIELDS)} FROM products ORDER BY id"
+        ).fetchall()
+        images = conn.execute(
+            "SELECT product_id, image_url, image_type FROM product_images ORDER BY id"
+        ).fetchall()
+
+    by_id = {}
+    for row in rows:
+        record = ProductRecord()
+        for field in PRODUCT_FIELDS:
+            setattr(record, field, row[field])
+        record.detail_images = []
+        record.wearing_shots = []
+        records.append(record)
+        by_id[record.id] = record
+    for product_id, image_url, image_type in images:
+        record = by_id.get(product_id)
+        if record is None:
+            continue
+        if image_type == 'detail':
+            record.detail_images.append(image_url)
+        elif image_type == 'wear':
+            record.wearing_shots.append(image_url)
+    return CatalogSnapshot(records, version)
+
+
+_snapshot = None
+_build_lock = threading.Lock()
+
+
+def refresh_snapshot():
+    """새 스냅샷을 만들어 교체한다. 이미 다른 스레드가 만드는 중이면 기다리지 않고 None."""
+    global _snapshot
+    if not _build_lock.acquire(blocking=False):
+        return None
+    try:
+        snapshot = load_snapshot()
+        _snapshot = snapshot
+        return snapshot
+    finally:
+        _build_lock.release()
+
+
+def warm_snapshot():
+    """시작할 때 호출. 테이블이 아직 없으면 첫 요청 때 만든다."""
+    if not SNAPSHOT_ENABLED:
+        return
+    try:
+        refresh_snapshot()
+    except sqlite3.Error:
+        pass
+
+
+def _refresh_in_background():
+    if _build_lock.locked():
+        return
+    threading.Thread(target=refresh_snapshot, name='catalog-snapshot', daemon=True).start()
+
+
+def current_snapshot(build=True):
+    """
+    현재 카탈로그 버전의 스냅샷. 없거나 만드는 중이면 None.
+    build=False 면 이 자리에서 만들지 않고 백그라운드에 맡긴다 (이벤트 루프에서 호출할 때).
+    """
+    if not SNAPSHOT_ENABLED:
+        return None
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != catalog_version():
+        # 바뀐 카탈로그를 오래된 스냅샷으로 응답하지 않도록 만드는 동안은 DB 로 처리
+        if not build:
+            _refresh_in_background()
+            return None
+        return refresh_snapshot()
+    if time.monotonic() - snapshot.built_at > SNAPSHOT_MAX_AGE:
+        snapshot.built_at = time.monotonic()  # 백그라운드 재생성을 한 번만 시작
+        _refresh_in_background()
+    return snapshot
@@ -0,0 +1,80 @@
+"""
+JSON API 응답 압축 (Accept-Encoding 협상)
+
+  - COMPRESS_MIN_SIZE 바이트 이상인 본문만 압축한다. 그보다 작으면 줄어드는 양보다 헤더와 CPU 비용이 크다
+  - brotli 모듈이 있으면 br 을 먼저 고르고, 없으면 gzip 만 쓴다
+  - catalog_cache 항목의 압축본은 처음 요청될 때 한 번 만들어 항목에 붙여 둔다. 캐시 적중 때는 압축하지 않는다
+  - 같은 URL 의 다른 표현이므로 ETag 는 인코딩마다 다르게 붙이고 Vary: Accept-Encoding 을 보낸다
+
+  MUSEME_COMPRESS=0         : 압축 끄기
+  MUSEME_COMPRESS_MIN_SIZE  : 압축할 최소 본문 크기 (바이트, 기본 1024)
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_ENABLED = os.environ.get('MUSEME_COMPRESS', '1') != '0'
+COMPRESS_MIN_SIZE = int(os.environ.get('MUSEME_COMPRESS_MIN_SIZE', 1024))
+GZIP_LEVEL = 6       # 9 는 거의 줄지 않고 두세 배 느리다
+BROTLI_QUALITY = 5   # 요청 중에 압축하는 경우가 있어 11 대신 속도 쪽
+
+# 서버가 선호하는 순서
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encodings(header):
+    """Accept-Encoding 헤더에서 q=0 이 아닌 인코딩 이름 집합"""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.partition(';')
+        key, _, value = params.partition('=')
+        try:
+            if key.strip() == 'q' and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def varies(size):
+    """이 크기의 본문은 Accept-Encoding 에 따라 달라지는가"""
+    return COMPRESS_ENABLED and size >= COMPRESS_MIN_SIZE
+
+
+def negotiate(header, size):
+    """보낼 인코딩 이름, 압축하지 않으면 None"""
+    if not header or not varies(size):
+        return None
+    accepted = accepted_encodings(header)
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encoded_body(body, encoding, variants=None):
+    """variants(dict) 가 있으면 거기 만들어 둔 압축본을 쓰고, 없으면 만들어 넣는다."""
+    if encoding is None:
+        return body
+    if variants is None:
+        return compress(body, encoding)
+    encoded = variants.get(encoding)
+    if encoded is None:
+        # 두 스레드가 동시에 만들어도 결과가 같으므로 잠그지 않는다
+        encoded = variants[encoding] = compress(body, encoding)
+    return encoded
+
+
+def variant_etag(etag, encoding):
+    return f'{etag}-{encoding}' if encoding else etag
@@ -1,22 +1,184 @@
 import sqlite3
+import json
+import threading
+import atexit
+import time
 from contextlib import contextmanager
 import os
+from metrics import db_timed
 
 DATABASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'museme.db')
 
+# 커넥션 풀 설정 (MUSEME_DB_POOL=0 이면 요청마다 새로 연결)
+POOL_ENABLED = os.environ.get('MUSEME_DB_POOL', '1') != '0'
+HEALTH_CHECK_INTERVAL = 30  # 초, 이 시간 이상 쉬었던 커넥션은 사용 전 점검
+BUSY_TIMEOUT_MS = 5000
+CACHED_STATEMENTS = 256
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -16000),       # 16MB
+    ('mmap_size', 268435456),     # 256MB
+    ('temp_store', 'MEMORY'),
+    ('foreign_keys', 'ON'),
+)
+
+
+class ConnectionPool:
+    """스레드별로 오래 유지되는 SQLite 커넥션을 관리한다."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread ident -> connection
+        self._pid = os.getpid()
+
+    def _connect(self, path):
+        conn = sqlite3.connect(path, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        for name, value in PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _register(self, conn):
+        ident = threading.get_ident()
+        with self._lock:
+            # 종료된 스레드가 남긴 커넥션 정리
+            alive = {t.ident for t in threading.enumerate()}
+            for dead in [i for i in self._connections if i not in alive]:
+                self._close_quietly(self._connections.pop(dead))
+            self._connections[ident] = conn
+
+    def _discard(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            with self._lock:
+                self._connections.pop(threading.get_ident(), None)
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        # fork 된 워커는 부모의 커넥션을 물려받지 않는다
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        now = time.monotonic()
+        if conn is not None:
+            stale = self._local.path != DATABASE
+            idle = now - self._local.last_used > HEALTH_CHECK_INTERVAL
+            if stale or (idle and not self._healthy(conn)):
+                self._discard()
+                conn = None
+
+        if conn is None:
+            conn = self._connect(DATABASE)
+            self._local.conn = conn
+            self._local.path = DATABASE
+            self._register(conn)
+
+        self._local.last_used = now
+        return conn
+
+    def release(self, conn):
+        # 커밋되지 않은 변경은 기존 close() 동작과 같이 버린다
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                self._discard()
+
+    def _reset_after_fork(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._pid = os.getpid()
+
+    def close_all(self):
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            self._close_quietly(conn)
+        self._local = threading.local()
+
+    def size(self):
+        with self._lock:
+            return len(self._connections)
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
+
+
+def close_db():
+    pool.close_all()
+
+
 @contextmanager
 def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
+    if not POOL_ENABLED:
+        conn = sqlite3.connect(DATABASE)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
+
+PRODUCT_FIELDS = (
+    'id', 'name', 'code', 'material', 'buy_price', 'rent_price', 'theme',
+    'category', 'thumbnail', 'main_image', 'description', 'created_at',
+)
+
+# sort 파라미터 -> (정렬 컬럼, 내림차순 여부). 테마/카테고리 필터 조합마다 init_db 의 인덱스로 처리된다
+PRODUCT_SORTS = {
+    'id': ('id', False),
+    'price': ('buy_price', False),
+    '-price': ('buy_price', True),
+    'created_at': ('created_at', False),
+    '-created_at': ('created_at', True),
+}
+
+def _product_columns(fields, sort_column):
+    if not fields:
+        return ['*'], ()
+    unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # 커서 계산에 필요한 id/정렬 컬럼은 항상 읽고, 요청하지 않았으면 나중에 뺀다
+    columns = list(dict.fromkeys(fields))
+    extra = tuple(dict.fromkeys(c for c in ('id', sort_column) if c not in columns))
+    return columns + list(extra), extra
 
-def get_products(theme=None, category=None):
+def _query_products(theme, category, sort, columns, limit, after):
+    sort_column, descending = PRODUCT_SORTS[sort]
     with get_db() as conn:
         cursor = conn.cursor()
-        query = "SELECT * FROM products WHERE 1=1"
+        query = f"SELECT {', '.join(columns)} FROM products WHERE 1=1"
         params = []
 
         if theme:
@@ -26,28 +188,178 @@ def get_products(theme=None, category=None):
             query += " AND category = ?"
             params.append(category)
 
+        # 키셋 페이지네이션: 이전 페이지 마지막 행 (정렬값, id) 다음부터
+        op = '<' if descending else '>'
+        if after is not None and sort_column == 'id':
+            query += f" AND id {op} ?"
+            params.append(after[1])
+        elif after is not None:
+            query += f" AND ({sort_column}, id) {op} (?, ?)"
+            params.extend(after)
+
+        direction = 'DESC' if descending else 'ASC'
+        if sort_column == 'id':
+            query += f" ORDER BY id {direction}"
+        else:
+            query += f" ORDER BY {sort_column} {direction}, id {direction}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
         cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
+# 시간은 get_products_page 에서 기록된다
+def get_products(theme=None, category=None, sort='id', fields=None, limit=None, after=None):
+    """
+    테마/카테고리로 제품 목록을 조회한다.
+    fields 로 컬럼을 고르고, after(이전 페이지 마지막 행의 (정렬값, id)) 다음부터 limit 개를 돌려준다.
+    """
+    return get_products_page(theme, category, sort, fields, limit, after)[0]
+
+@db_timed
+def get_products_page(theme=None, category=None, sort='id', fields=None, limit=None, after=None):
+    """(제품 목록, 다음 페이지 커서) 를 돌려준다. 마지막 페이지면 커서는 None."""
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f'Unknown sort: {sort}')
+    sort_column = PRODUCT_SORTS[sort][0]
+    columns, extra = _product_columns(fields, sort_column)
+
+    rows = _query_products(theme, category, sort, columns,
+                           None if limit is None else limit + 1, after)
+    next_after = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1][sort_column], rows[-1]['id'])
+
+    for row in rows:
+        for column in extra:
+            del row[column]
+    return rows, next_after
+
+# 제품 + 이미지를 한 번에 가져오는 쿼리 (문장 텍스트를 고정해 statement cache 재사용)
+# 이미지는 "타입\x1f주소" 항목을 \x1e 로 이어 붙인 문자열로 받는다
+PRODUCT_AGGREGATE_SELECT = """
+    SELECT p.*,
+           (SELECT group_concat(image_type || char(31) || image_url, char(30))
+            FROM product_images WHERE product_id = p.id) AS images
+    FROM products p
+"""
+
+PRODUCT_BY_ID_QUERY = PRODUCT_AGGREGATE_SELECT + " WHERE p.id = ?"
+
+PRODUCTS_BY_IDS_QUERY = (
+    PRODUCT_AGGREGATE_SELECT + " WHERE p.id IN (SELECT value FROM json_each(?))"
+)
+
+def _product_aggregate(row):
+    product = dict(row)
+    images = product.pop('images')
+    detail_images = []
+    wearing_shots = []
+    if images:
+        for item in images.split('\x1e'):
+            image_type, image_url = item.split('\x1f', 1)
+            if image_type == 'detail':
+                detail_images.append(image_url)
+            elif image_type == 'wear':
+                wearing_shots.append(image_url)
+    product['detail_images'] = detail_images
+    product['wearing_shots'] = wearing_shots
+    return product
+
+@db_timed
 def get_product_by_id(product_id):
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-        product = cursor.fetchone()
-
-        if product:
-            product = dict(product)
-            # 이미지 가져오기
-            cursor.execute(
-                "SELECT image_url, image_type FROM product_images WHERE product_id = ?",
-                (product_id,)
-            )
-            images = cursor.fetchall()
-            product['detail_images'] = [r['image_url'] for r in images if r['image_type'] == 'detail']
-            product['wearing_shots'] = [r['image_url'] for r in images if r['image_type'] == 'wear']
-
-        return product
+        row = conn.execute(PRODUCT_BY_ID_QUERY, (product_id,)).fetchone()
+        return _product_aggregate(row) if row else None
+
+@db_timed
+def get_products_by_ids(ids):
+    """여러 제품을 이미지까지 포함해 한 번의 쿼리로 가져온다 (요청한 순서 유지)."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return []
+    with get_db() as conn:
+        rows = conn.execute(PRODUCTS_BY_IDS_QUERY, (json.dumps(ids),)).fetchall()
+    by_id = {row['id']: _product_aggregate(row) for row in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+# 검색 결과 필드와 bm25 가중치 (name, material, description, code 순서)
+SEARCH_COLUMNS = (
+    'p.id', 'p.name', 'p.code', 'p.material', 'p.buy_price', 'p.rent_price',
+    'p.theme', 'p.category', 'p.thumbnail',
+)
+SEARCH_RANK = 'bm25(products_fts, 10.0, 3.0, 1.0, 5.0)'
+SEARCH_LIKE_COLUMNS = ('p.name', 'p.material', 'p.description', 'p.code')
+TRIGRAM = 3
+# bm25 는 일치 문서마다 계산되므로 흔한 검색어는 최신 일치 N건 안에서만 순위를 매긴다
+SEARCH_RANK_WINDOW = 1000
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
 
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+@db_timed
+def search_products(query, theme=None, category=None, min_price=None, max_price=None, limit=20):
+    """
+    상품 검색. 3글자 이상인 검색어는 FTS5 trigram 색인으로 찾아 bm25 순으로 정렬하고,
+    그보다 짧은 검색어(예: '반지')는 색인으로 찾을 수 없어 LIKE 조건으로 거른다.
+    부분 문자열 검색이라 입력 중인 접두어도 그대로 찾아진다.
+    일치 결과가 SEARCH_RANK_WINDOW 보다 많으면 최신 상품 쪽 구간에서만 순위를 매긴다.
+    """
+    terms = [t for t in query.split() if t]
+    if not terms:
+        return []
+    long_terms = [t for t in terms if len(t) >= TRIGRAM]
+    short_terms = [t for t in terms if len(t) < TRIGRAM]
+
+    params = []
+    if long_terms:
+        sql = (f"SELECT {', '.join(SEARCH_COLUMNS)} FROM products_fts "
+               "JOIN products p ON p.id = products_fts.rowid "
+               "WHERE products_fts MATCH ?")
+        params.append(' AND '.join(_fts_phrase(t) for t in long_terms))
+    else:
+        sql = f"SELECT {', '.join(SEARCH_COLUMNS)} FROM products p WHERE 1=1"
+
+    for term in short_terms:
+        sql += ' AND (' + ' OR '.join(f"{c} LIKE ? ESCAPE '\\'" for c in SEARCH_LIKE_COLUMNS) + ')'
+        params.extend([_like_pattern(term)] * len(SEARCH_LIKE_COLUMNS))
+    if theme:
+        sql += " AND p.theme = ?"
+        params.append(theme)
+    if category and category != 'all':
+        sql += " AND p.category = ?"
+        params.append(category)
+    if min_price is not None:
+        sql += " AND p.buy_price >= ?"
+        params.append(min_price)
+    if max_price is not None:
+        sql += " AND p.buy_price <= ?"
+        params.append(max_price)
+
+    with get_db() as conn:
+        if not long_terms:
+            rows = conn.execute(sql + " ORDER BY p.id DESC LIMIT ?", params + [limit])
+            return [dict(row) for row in rows.fetchall()]
+
+        boundary = conn.execute(
+            sql.replace(', '.join(SEARCH_COLUMNS), 'products_fts.rowid', 1)
+            + " ORDER BY products_fts.rowid DESC LIMIT 1 OFFSET ?",
+            params + [SEARCH_RANK_WINDOW - 1]
+        ).fetchone()
+        if boundary is not None:
+            sql += " AND products_fts.rowid >= ?"
+            params.append(boundary[0])
+
+        rows = conn.execute(sql + f" ORDER BY {SEARCH_RANK} LIMIT ?", params + [limit])
+        return [dict(row) for row in rows.fetchall()]
+
+@db_timed
 def get_user_by_email(email):
     with get_db() as conn:
         cursor = conn.cursor()
@@ -55,6 +367,7 @@ def get_user_by_email(email):
         user = cursor.fetchone()
         return dict(user) if user else None
 
+@db_timed
 def create_user(email, password_hash):
     with get_db() as conn:
         cursor = conn.cursor()
@@ -64,3 +377,127 @@ def create_user(email, password_hash):
         )
         conn.commit()
         return cursor.lastrowid
+
+@db_timed
+def update_user_password_hash(user_id, password_hash):
+    with get_db() as conn:
+        conn.execute(
+            "UPDATE users SET password_hash = ? WHERE id = ?",
+            (password_hash, user_id)
+        )
+        conn.commit()
+
+@db_timed
+def revoke_token(jti, expires_at):
+    """로그아웃한 토큰을 만료 시각(유닉스 초)까지 폐기 목록에 올리고, 만료된 항목을 지운다."""
+    with get_db() as conn:
+        conn.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (int(time.time()),))
+        conn.execute(
+            "INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+            (jti, int(expires_at))
+        )
+        conn.commit()
+
+@db_timed
+def is_token_revoked(jti):
+    with get_db() as conn:
+        row = conn.execute("SELECT 1 FROM revoked_tokens WHERE jti = ?", (jti,)).fetchone()
+        return row is not None
+
+CART_ITEM_COLUMNS = ('id', 'product_id', 'item_option', 'purchase_type', 'quantity')
+
+@db_timed
+def get_cart_items(user_id):
+    with get_db() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(CART_ITEM_COLUMNS)} FROM cart_items WHERE user_id = ? ORDER BY rowid",
+            (user_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+@db_timed
+def apply_cart_changes(upserts, deletes):
+    """
+    장바구니 변경을 한 트랜잭션으로 기록한다.
+    upserts: (id, user_id, product_id, item_option, purchase_type, quantity) 목록, deletes: id 목록
+    """
+    with get_db() as conn:
+        conn.executemany(
+            """
+            INSERT INTO cart_items (id, user_id, product_id, item_option, purchase_type, quantity, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(id) DO UPDATE SET
+                quantity = excluded.quantity,
+                updated_at = excluded.updated_at
+            """,
+            upserts
+        )
+        conn.executemany("DELETE FROM cart_items WHERE id = ?", [(i,) for i in deletes])
+        conn.commit()
+
+RENTAL_COLUMNS = ('id', 'product_id', 'user_id', 'start_date', 'end_date', 'status', 'created_at')
+
+# SQLite julianday -> Python date.toordinal
+_JULIAN_ORDINAL_OFFSET = 1721424.5
+
+@db_timed
+def get_upcoming_rentals(since):
+    """
+    end_date 가 since 이후인 유효한 예약 (product_id, 시작일, 종료일, id) 튜플 목록 (rentals.py 색인 적재용)
+    날짜는 date.toordinal() 값, product_id 와 시작일 순으로 정렬
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None  # 예약이 많으므로 Row 대신 튜플
+        cursor.execute(
+            f"SELECT product_id,"
+            f" CAST(julianday(start_date) - {_JULIAN_ORDINAL_OFFSET} AS INTEGER),"
+            f" CAST(julianday(end_date) - {_JULIAN_ORDINAL_OFFSET} AS INTEGER), id"
+            f" FROM rentals WHERE end_date >= ? AND status = 'reserved'"
+            f" ORDER BY product_id, start_date",
+            (since,)
+        )
+        return cursor.fetchall()
+
+@db_timed
+def create_rental(product_id, user_id, start_date, end_date):
+    """
+    겹치는 예약이 없으면 예약을 만들고 id 를 돌려준다. 겹치면 None.
+    검사와 삽입을 한 쓰기 트랜잭션에서 하므로 여러 프로세스가 동시에 예약해도 겹치지 않는다.
+    """
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conflict = conn.execute(
+            "SELECT 1 FROM rentals WHERE product_id = ? AND end_date >= ? AND start_date <= ?"
+            " AND status = 'reserved' LIMIT 1",
+            (product_id, start_date, end_date)
+        ).fetchone()
+        if conflict:
+            return None  # 커밋하지 않은 트랜잭션은 반환할 때 롤백된다
+        cursor = conn.execute(
+            "INSERT INTO rentals (product_id, user_id, start_date, end_date) VALUES (?, ?, ?, ?)",
+            (product_id, user_id, start_date, end_date)
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+@db_timed
+def cancel_rental(rental_id, user_id):
+    """본인의 유효한 예약을 취소하고 취소한 예약을 돌려준다. 없으면 None."""
+    with get_db() as conn:
+        rows = conn.execute(
+            f"UPDATE rentals SET status = 'cancelled' WHERE id = ? AND user_id = ? AND status = 'reserved'"
+            f" RETURNING {', '.join(RENTAL_COLUMNS)}",
+            (rental_id, user_id)
+        ).fetchall()
+        conn.commit()
+        return dict(rows[0]) if rows else None
+
+@db_timed
+def get_user_rentals(user_id):
+    with get_db() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(RENTAL_COLUMNS)} FROM rentals WHERE user_id = ? ORDER BY start_date DESC",
+            (user_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,40 @@
+"""
+카탈로그 API 용 JSON 인코딩
+
+orjson 이 설치돼 있으면 그것으로, 없으면 표준 json 으로 인코딩한다 (MUSEME_ORJSON=0 이면 항상 표준 json).
+  - 표준 json : Flask 기본 JSON provider(jsonify) 와 같은 출력 (키 정렬, 비ASCII 는 \\u 이스케이프)
+  - orjson    : 키 정렬, 공백 없이, 한글을 UTF-8 그대로 내보내므로 인코딩이 빠르고 본문도 작다
+어느 쪽이든 올바른 JSON 이고 클라이언트가 읽는 값은 같다.
+조각을 이어 붙여 JSON 을 만드는 곳(catalog_snapshot.listing_json)은 ITEM_SEPARATOR/KEY_SEPARATOR 를 써서
+encode() 와 같은 바이트(같은 ETag)가 나오게 한다.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.environ.get('MUSEME_ORJSON') == '0':
+    orjson = None
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SORT_KEYS
+    ITEM_SEPARATOR, KEY_SEPARATOR = ',', ':'
+
+    def dumps(value):
+        return orjson.dumps(value, option=_OPTIONS).decode('utf-8')
+
+    def encode(value):
+        """응답 본문 바이트 (끝에 줄바꿈)"""
+        return orjson.dumps(value, option=_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+else:
+    ITEM_SEPARATOR, KEY_SEPARATOR = ', ', ': '
+
+    def dumps(value):
+        return json.dumps(value, ensure_ascii=True, sort_keys=True)
+
+    def encode(value):
+        """응답 본문 바이트 (끝에 줄바꿈)"""
+        return (dumps(value) + '\n').encode('utf-8')
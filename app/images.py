@@ -0,0 +1,227 @@
+import hashlib
+import os
+import threading
+import time
+
+from flask import Blueprint, abort, request, send_file, url_for
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow 가 없으면 원본을 그대로 내려준다
+    Image = None
+    features = None
+
+images_bp = Blueprint('images', __name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# _source_path 가 realpath 와 비교하므로 static 이 심볼릭 링크를 거쳐도 맞도록 미리 풀어 둔다
+IMAGES_DIR = os.path.realpath(os.path.join(BASE_DIR, 'static', 'images'))
+CACHE_DIR = os.environ.get('MUSEME_IMAGE_CACHE_DIR') or os.path.join(BASE_DIR, '.cache', 'images')
+CACHE_MAX_BYTES = int(os.environ.get('MUSEME_IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# 허용하는 너비만 만들어 캐시가 임의의 크기로 불어나지 않게 한다
+ALLOWED_WIDTHS = (160, 320, 400, 640, 800, 1200, 1600)
+DEFAULT_SRCSET_WIDTHS = (400, 800, 1200)
+QUALITY = {'webp': 80, 'avif': 60, 'jpeg': 82, 'png': None}
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.psd')
+
+IMMUTABLE_MAX_AGE = 31536000
+UNVERSIONED_MAX_AGE = 86400
+
+
+def _supported_formats():
+    # 시작할 때 한 번만 확인한다. features.check('avif') 는 AVIF 를 모르는 Pillow (10.x) 에서
+    # 부를 때마다 "Unknown feature" 경고를 내므로 get_supported() 목록에 있을 때만 쓴다
+    if features is None:
+        return frozenset()
+    available = set(features.get_supported())
+    return frozenset(fmt for fmt in FORMATS if fmt not in ('avif', 'webp') or fmt in available)
+
+
+SUPPORTED_FORMATS = _supported_formats()
+
+
+def _supported(fmt):
+    return fmt in SUPPORTED_FORMATS
+
+
+def _source_path(filename):
+    # static/images 밖으로 나가는 경로는 거부
+    path = os.path.realpath(os.path.join(IMAGES_DIR, filename))
+    if not path.startswith(IMAGES_DIR + os.sep) or not path.lower().endswith(SOURCE_EXTENSIONS):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def _relative(path):
+    # '/static/images/a.png' 와 'a.png' 를 모두 받는다
+    prefix = '/static/images/'
+    return path[len(prefix):] if path.startswith(prefix) else path.lstrip('/')
+
+
+def source_version(filename):
+    """원본이 바뀌면 달라지는 짧은 버전 문자열 (URL 의 v 파라미터)"""
+    path = _source_path(_relative(filename))
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return hashlib.blake2b(f'{stat.st_mtime_ns}:{stat.st_size}'.encode(), digest_size=4).hexdigest()
+
+
+class DerivativeCache:
+    """파생 이미지를 디스크에 보관하고 전체 크기가 상한을 넘으면 오래 쓰지 않은 것부터 지운다."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def path_for(self, source, stat, width, fmt):
+        key = f'{source}:{stat.st_mtime_ns}:{stat.st_size}:{width}:{fmt}:{QUALITY[fmt]}'
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f'{digest[2:]}.{fmt}')
+
+    def _files(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                yield os.path.join(root, name)
+
+    def _current_size(self):
+        if self._size is None:
+            self._size = sum(os.path.getsize(p) for p in self._files())
+        return self._size
+
+    def touch(self, path):
+        # LRU 판단용. 한 시간 안에 이미 갱신했으면 건너뛴다
+        try:
+            if os.path.getmtime(path) < time.time() - 3600:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def added(self, path, nbytes):
+        """path(nbytes) 를 새로 기록한 뒤 호출한다."""
+        with self._lock:
+            if self._size is None:
+                # 처음 크기를 잴 때는 방금 기록한 파일도 디렉터리에 있으므로 다시 더하지 않는다
+                self._current_size()
+            else:
+                self._size += nbytes
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+
+    def _evict(self, keep):
+        target = self.max_bytes * 0.9
+        entries = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        for _, nbytes, path in entries:
+            if path == keep:
+                continue
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+                size -= nbytes
+            except OSError:
+                pass
+        self._size = size
+
+
+derivative_cache = DerivativeCache()
+
+
+def _render(source, target, width, fmt):
+    pil_format = FORMATS[fmt][0]
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.width > width:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+        if fmt == 'jpeg' and img.mode != 'RGB':
+            img = img.convert('RGB')
+        elif img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            img = img.convert('RGBA')
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        options = {'optimize': True} if fmt in ('jpeg', 'png') else {}
+        if QUALITY[fmt] is not None:
+            options['quality'] = QUALITY[fmt]
+        try:
+            img.save(tmp, pil_format, **options)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+    # 같은 파생 이미지를 동시에 만들어도 rename 은 원자적이라 안전
+    os.replace(tmp, target)
+    return os.path.getsize(target)
+
+
+@images_bp.route('/img/<path:filename>')
+def derivative(filename):
+    source = _source_path(filename)
+    if source is None:
+        abort(404)
+
+    width = request.args.get('w', type=int)
+    fmt = request.args.get('fmt', 'webp').lower()
+    if width not in ALLOWED_WIDTHS or fmt not in FORMATS:
+        abort(400)
+
+    versioned = request.args.get('v') is not None
+    max_age = IMMUTABLE_MAX_AGE if versioned else UNVERSIONED_MAX_AGE
+
+    if Image is None:
+        return send_file(source, max_age=max_age)
+    if not _supported(fmt):
+        fmt = 'webp' if _supported('webp') else 'jpeg'
+
+    stat = os.stat(source)
+    target = derivative_cache.path_for(source, stat, width, fmt)
+    if os.path.exists(target):
+        derivative_cache.touch(target)
+    else:
+        try:
+            nbytes = _render(source, target, width, fmt)
+        except OSError:
+            # 읽을 수 없는 원본 (깨진 파일, UnidentifiedImageError 포함) 은 500 대신 원본을 그대로 내려준다
+            return send_file(source, max_age=UNVERSIONED_MAX_AGE)
+        derivative_cache.added(target, nbytes)
+
+    response = send_file(target, mimetype=FORMATS[fmt][1], max_age=max_age, conditional=True)
+    if versioned:
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+@images_bp.app_template_global()
+def image_url(path, width, fmt='webp'):
+    """리사이즈된 이미지 URL. 원본 버전이 들어가므로 오래 캐시해도 된다."""
+    filename = _relative(path)
+    version = source_version(filename)
+    if version is None:
+        return url_for('static', filename=f'images/{filename}')
+    return url_for('images.derivative', filename=filename, w=width, fmt=fmt, v=version)
+
+
+@images_bp.app_template_global()
+def srcset(path, widths=DEFAULT_SRCSET_WIDTHS, fmt='webp'):
+    """<img srcset> 값: '/img/a.png?w=400... 400w, /img/a.png?w=800... 800w'"""
+    return ', '.join(f'{image_url(path, w, fmt)} {w}w' for w in widths)
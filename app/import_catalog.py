@@ -0,0 +1,357 @@
+"""
+공급사 카탈로그 파일(CSV / JSONL) 일괄 가져오기
+
+  python app/import_catalog.py products.csv [--format csv|jsonl] [--batch-size 10000]
+                                            [--keep-indexes] [--max-errors 100]
+
+  - 파일을 한 줄씩 읽어(제너레이터) 검증하고, batch-size 행씩 한 트랜잭션에서 executemany 로
+    code 기준 UPSERT 한다. 메모리는 파일 크기와 관계없이 한 배치만큼만 쓴다 (.gz 도 그대로 읽는다)
+  - 기본으로 products 의 보조 인덱스와 검색 색인 트리거를 지우고 적재한 뒤 인덱스를 다시 만들고 검색 색인을
+    한 번에 다시 채운다. 행마다 인덱스 여러 개와 FTS 를 고치는 것보다 훨씬 빠르지만 적재하는 동안 목록 쿼리는
+    인덱스 없이 돌고, 검색은 적재 전의 색인으로 동작한다 (새 제품은 검색되지 않고 바뀐 제품은 이전 내용으로
+    찾아진다). 도중에 중단되면 python app/init_db.py 가 인덱스와 트리거를 만들고 검색 색인을 다시 채운다.
+    운영 중인 DB 에 몇 건만 고칠 때는 --keep-indexes 를 쓴다
+  - detail_image / wear_image 가 있으면 그 종류의 기존 이미지를 바꾸고, 없으면 기존 이미지를 그대로 둔다.
+    여러 장은 CSV 에서는 '|' 로 구분하고 JSONL 에서는 목록으로 준다
+
+열: name, code, material, buy_price, rent_price, theme, category, thumbnail, main_image, description,
+    detail_image, wear_image (name, code, buy_price, theme, category 는 필수)
+
+실행 중인 서버는 다른 프로세스의 변경을 카탈로그 스냅샷 TTL 이 지나야 반영한다.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+import time
+
+import init_db
+from catalog_cache import bump_catalog_version
+from routes import THEME_NAMES, CATEGORY_NAMES
+
+DEFAULT_BATCH_SIZE = 10000
+PROGRESS_INTERVAL = 2.0  # 초
+MAX_REPORTED_ERRORS = 20
+BULK_CACHE_SIZE = -65536  # 64MB, 인덱스를 다시 만들 때 정렬에 쓴다
+
+PRODUCT_COLUMNS = ('name', 'code', 'material', 'buy_price', 'rent_price', 'theme', 'category',
+                   'thumbnail', 'main_image', 'description')
+REQUIRED_COLUMNS = ('name', 'code', 'buy_price', 'theme', 'category')
+IMAGE_COLUMNS = (('detail_image', 'detail'), ('wear_image', 'wear'))
+
+UPSERT_SQL = (
+    f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(PRODUCT_COLUMNS))}) "
+    "ON CONFLICT(code) DO UPDATE SET "
+    + ', '.join(f'{c} = excluded.{c}' for c in PRODUCT_COLUMNS if c != 'code')
+    # 바뀐 것이 없는 행은 건드리지 않는다 (FTS 트리거와 인덱스 갱신을 건너뛴다)
+    + f" WHERE ({', '.join(PRODUCT_COLUMNS)}) IS NOT ({', '.join('excluded.' + c for c in PRODUCT_COLUMNS)})"
+)
+IDS_BY_CODE_SQL = 'SELECT code, id FROM products WHERE code IN (SELECT value FROM json_each(?))'
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f'{line}행: {message}')
+        self.line = line
+
+
+# ----------------------------------------------------------------------
+# 읽기와 검증
+# ----------------------------------------------------------------------
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise ValueError(f'파일 형식을 알 수 없습니다: {path} (--format 으로 지정)')
+
+
+def _open_text(path):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8-sig', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def read_records(path, fmt):
+    """(줄 번호, dict) 를 하나씩 내준다. 형식이 깨진 줄은 dict 대신 ImportRowError 를 내준다."""
+    with _open_text(path) as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_num, ImportRowError(line_num, f'JSON 오류 ({e})')
+                    continue
+                if not isinstance(record, dict):
+                    record = ImportRowError(line_num, 'JSON 객체가 아닙니다')
+                yield line_num, record
+
+
+def _text(value):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = str(value)
+    return value.strip() or None
+
+
+def _price(line, value, column):
+    if value is None:
+        return None
+    try:
+        price = int(value.replace(',', ''))
+    except ValueError:
+        raise ImportRowError(line, f'{column} 은(는) 정수여야 합니다: {value!r}')
+    if price < 0:
+        raise ImportRowError(line, f'{column} 은(는) 0 이상이어야 합니다')
+    return price
+
+
+def _images(line, value, column):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        urls = [u for u in map(_text, value) if u]
+        return urls or None
+    if not isinstance(value, str):
+        raise ImportRowError(line, f'{column} 은(는) 문자열이나 목록이어야 합니다: {value!r}')
+    value = value.strip()
+    if '|' not in value:
+        return [value] if value else None
+    urls = [u for u in (u.strip() for u in value.split('|')) if u]
+    return urls or None
+
+
+_REQUIRED = [(PRODUCT_COLUMNS.index(c), c) for c in REQUIRED_COLUMNS]
+_THEME = PRODUCT_COLUMNS.index('theme')
+_CATEGORY = PRODUCT_COLUMNS.index('category')
+_BUY_PRICE = PRODUCT_COLUMNS.index('buy_price')
+_RENT_PRICE = PRODUCT_COLUMNS.index('rent_price')
+
+
+def validate_record(line, record):
+    """dict 한 행 -> (products 행 튜플, {image_type: [url]})"""
+    get = record.get
+    values = [_text(get(column)) for column in PRODUCT_COLUMNS]
+    for i, column in _REQUIRED:
+        if values[i] is None:
+            raise ImportRowError(line, f'{column} 이(가) 없습니다')
+    if values[_THEME] not in THEME_NAMES:
+        raise ImportRowError(line, f'알 수 없는 theme: {values[_THEME]}')
+    if values[_CATEGORY] not in CATEGORY_NAMES or values[_CATEGORY] == 'all':
+        raise ImportRowError(line, f'알 수 없는 category: {values[_CATEGORY]}')
+    values[_BUY_PRICE] = _price(line, values[_BUY_PRICE], 'buy_price')
+    values[_RENT_PRICE] = _price(line, values[_RENT_PRICE], 'rent_price')
+
+    images = {}
+    for column, image_type in IMAGE_COLUMNS:
+        urls = _images(line, get(column), column)
+        if urls is not None:
+            images[image_type] = urls
+    return tuple(values), images
+
+
+# ----------------------------------------------------------------------
+# 적재
+# ----------------------------------------------------------------------
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0        # 읽은 행
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0   # 이미 같은 값이라 쓰지 않은 행
+        self.skipped = 0
+        self.errors = []     # 처음 MAX_REPORTED_ERRORS 개
+        self.load_seconds = 0.0
+        self.index_seconds = 0.0
+
+    @property
+    def upserted(self):
+        return self.inserted + self.updated + self.unchanged
+
+    def rows_per_second(self):
+        total = self.load_seconds + self.index_seconds
+        return self.upserted / total if total else 0.0
+
+
+def _connect():
+    conn = sqlite3.connect(init_db.DATABASE, isolation_level=None)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = {BULK_CACHE_SIZE}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+def _product_indexes():
+    return [name for name, target in init_db.INDEXES if target.startswith('products(')]
+
+
+def _drop_indexes(conn):
+    # code 의 UNIQUE 인덱스(UPSERT)와 product_images 인덱스(이미지 교체)는 적재 중에도 쓰므로 남긴다.
+    # products_fts 는 남겨 두어 적재 중에도 검색이 (적재 전 내용으로) 동작하게 하고 트리거만 지운다
+    conn.execute('BEGIN IMMEDIATE')
+    for name in _product_indexes():
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    for trigger in ('products_fts_insert', 'products_fts_delete', 'products_fts_update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    conn.execute('COMMIT')
+
+
+def _rebuild_indexes(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    cursor = conn.cursor()
+    init_db.create_indexes(cursor)
+    init_db.create_search_index(cursor)  # 트리거가 없었으므로 색인 전체를 다시 채운다
+    conn.execute('COMMIT')
+    conn.execute('ANALYZE')
+
+
+def _ids_by_code(conn, codes):
+    return dict(conn.execute(IDS_BY_CODE_SQL, (json.dumps(codes),)).fetchall())
+
+
+def _write_batch(conn, rows, images_by_code, stats):
+    codes = list(rows)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        existing = _ids_by_code(conn, codes)
+        changes = conn.total_changes
+        conn.executemany(UPSERT_SQL, rows.values())
+        changes = conn.total_changes - changes
+        ids = _ids_by_code(conn, [c for c in images_by_code if c not in existing]) if images_by_code else {}
+        ids.update(existing)
+
+        # 이미 있던 제품은 새로 받은 종류의 이미지만 바꾼다
+        conn.executemany(
+            'DELETE FROM product_images WHERE product_id = ? AND image_type = ?',
+            [(existing[code], image_type)
+             for code, images in images_by_code.items() if code in existing
+             for image_type in images])
+        conn.executemany(
+            'INSERT INTO product_images (product_id, image_url, image_type) VALUES (?, ?, ?)',
+            [(ids[code], url, image_type)
+             for code, images in images_by_code.items()
+             for image_type, urls in images.items() for url in urls])
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    inserted = len(codes) - len(existing)
+    updated = min(len(existing), max(0, changes - inserted))
+    stats.inserted += inserted
+    stats.updated += updated
+    stats.unchanged += len(existing) - updated
+
+
+def import_products(records, batch_size=DEFAULT_BATCH_SIZE, defer_indexes=True, max_errors=100,
+                    progress=None):
+    """
+    read_records() 가 내주는 (줄 번호, dict) 를 적재하고 ImportStats 를 돌려준다.
+    잘못된 행은 건너뛰고, max_errors 개를 넘으면 ImportRowError 를 낸다 (이미 커밋한 배치는 남는다).
+    progress(stats) 는 PROGRESS_INTERVAL 마다 호출된다.
+    """
+    stats = ImportStats()
+    conn = _connect()
+    start = time.perf_counter()
+    next_progress = start + PROGRESS_INTERVAL
+    try:
+        if defer_indexes:
+            _drop_indexes(conn)
+        try:
+            rows = {}            # code -> 행 (같은 배치에서 code 가 반복되면 마지막 행이 남는다)
+            images_by_code = {}
+            for line, record in records:
+                stats.rows += 1
+                try:
+                    if isinstance(record, ImportRowError):
+                        raise record
+                    row, images = validate_record(line, record)
+                except ImportRowError as e:
+                    stats.skipped += 1
+                    if len(stats.errors) < MAX_REPORTED_ERRORS:
+                        stats.errors.append(str(e))
+                    if stats.skipped > max_errors:
+                        raise
+                    continue
+                rows[row[1]] = row
+                if images:
+                    images_by_code.setdefault(row[1], {}).update(images)
+                if len(rows) >= batch_size:
+                    _write_batch(conn, rows, images_by_code, stats)
+                    rows = {}
+                    images_by_code = {}
+                    if progress is not None and time.perf_counter() >= next_progress:
+                        stats.load_seconds = time.perf_counter() - start
+                        progress(stats)
+                        next_progress += PROGRESS_INTERVAL
+            if rows:
+                _write_batch(conn, rows, images_by_code, stats)
+            stats.load_seconds = time.perf_counter() - start
+        finally:
+            if defer_indexes:
+                index_start = time.perf_counter()
+                _rebuild_indexes(conn)
+                stats.index_seconds = time.perf_counter() - index_start
+            if stats.upserted:
+                bump_catalog_version()
+    finally:
+        conn.close()
+    return stats
+
+
+# ----------------------------------------------------------------------
+
+def _print_progress(stats):
+    rate = stats.upserted / stats.load_seconds if stats.load_seconds else 0.0
+    print(f'  {stats.rows:>10} rows  {rate:>10.0f} rows/s', file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CSV / JSONL 카탈로그 가져오기')
+    parser.add_argument('path', help="입력 파일 ('-' 이면 표준 입력, .gz 가능)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='인덱스/검색 색인을 지우지 않고 행마다 갱신 (작은 수정용)')
+    parser.add_argument('--max-errors', type=int, default=100,
+                        help='이 수를 넘게 잘못된 행이 나오면 중단')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    init_db.init_db()
+    try:
+        stats = import_products(read_records(args.path, fmt), batch_size=args.batch_size,
+                                defer_indexes=not args.keep_indexes, max_errors=args.max_errors,
+                                progress=_print_progress)
+    except ImportRowError as e:
+        print(f'잘못된 행이 {args.max_errors}개를 넘어 중단했습니다 (마지막: {e})', file=sys.stderr)
+        return 1
+
+    for error in stats.errors:
+        print(f'  건너뜀 {error}', file=sys.stderr)
+    print(f'{stats.rows} rows read: {stats.inserted} inserted, {stats.updated} updated, '
+          f'{stats.unchanged} unchanged, {stats.skipped} skipped')
+    print(f'load {stats.load_seconds:.2f}s + indexes {stats.index_seconds:.2f}s '
+          f'= {stats.rows_per_second():.0f} rows/s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,122 +3,88 @@ import os
 
 DATABASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'museme.db')
 
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    # 사용자 테이블
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+# 조회 경로별 보조 인덱스 (database.py 의 쿼리와 함께 관리)
+# 새 인덱스는 기존 DB 에도 만들어지도록 migrations.py 에 마이그레이션으로도 추가한다.
+# 여기 있는 인덱스가 DB 에 없으면 시작할 때 migrate() 가 다시 만든다
+INDEXES = (
+    ('idx_products_theme', 'products(theme)'),
+    ('idx_products_theme_category', 'products(theme, category)'),
+    ('idx_products_category', 'products(category)'),
+    # 가격/등록일 정렬 + 키셋 페이지네이션 (id 는 rowid 라 인덱스 끝에 붙어 (정렬값, id) 순서가 된다)
+    ('idx_products_price', 'products(buy_price)'),
+    ('idx_products_category_price', 'products(category, buy_price)'),
+    ('idx_products_created', 'products(created_at)'),
+    ('idx_products_category_created', 'products(category, created_at)'),
+    ('idx_products_theme_price', 'products(theme, buy_price)'),
+    ('idx_products_theme_category_price', 'products(theme, category, buy_price)'),
+    ('idx_products_theme_created', 'products(theme, created_at)'),
+    ('idx_products_theme_category_created', 'products(theme, category, created_at)'),
+    ('idx_product_images_product_type', 'product_images(product_id, image_type)'),
+    ('idx_cart_items_user', 'cart_items(user_id)'),
+    # 대여 예약: 제품별 겹침 검사와 다가오는 예약 적재(rentals.py), 사용자별 목록
+    ('idx_rentals_product_end', 'rentals(product_id, end_date)'),
+    ('idx_rentals_user', 'rentals(user_id)'),
+    # 만료된 폐기 토큰 정리
+    ('idx_revoked_tokens_expires', 'revoked_tokens(expires_at)'),
+)
 
-    # 제품 테이블
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            code TEXT UNIQUE NOT NULL,
-            material TEXT,
-            buy_price INTEGER NOT NULL,
-            rent_price INTEGER,
-            theme TEXT NOT NULL,
-            category TEXT NOT NULL,
-            thumbnail TEXT,
-            main_image TEXT,
-            description TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+def create_indexes(cursor):
+    for name, target in INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
 
-    # 제품 이미지 테이블
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS product_images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            image_url TEXT NOT NULL,
-            image_type TEXT NOT NULL,
-            FOREIGN KEY (product_id) REFERENCES products(id)
-        )
-    ''')
+# 상품 검색용 FTS5 인덱스 (products 를 외부 콘텐츠로 사용, 트리거로 동기화)
+# trigram 토크나이저는 띄어쓰기와 무관하게 3글자 단위로 색인하므로 한국어 부분 검색이 된다
+FTS_COLUMNS = ('name', 'material', 'description', 'code')
 
-    # 샘플 데이터 추가
-    cursor.execute("SELECT COUNT(*) FROM products")
-    if cursor.fetchone()[0] == 0:
-        # (name, code, material, buy_price, rent_price, theme, category, thumbnail, detail_image, wear_image, description)
-        sample_products = [
-            ('전통 귀걸이 세트', 'TRAD-EAR-001', '실버 925', 150000, 30000, 'traditional', 'earring',
-             '/static/images/products/traditional/earring/A1.png',
-             '/static/images/products/traditional/earring/A1-detail.png',
-             '/static/images/products/traditional/earring/A1-wear.png',
-             '전통적인 한국 문양이 새겨진 귀걸이입니다.'),
-            ('전통 뒤꽂이', 'TRAD-HAIR-001', '실버 925, 진주', 250000, 50000, 'traditional', 'hairpin',
-             '/static/images/products/traditional/hairpin/A2.png',
-             '/static/images/products/traditional/hairpin/A2-detail.png',
-             '/static/images/products/traditional/hairpin/A2-wear.png',
-             '고급스러운 전통 뒤꽂이입니다.'),
-            ('전통 떨잠', 'TRAD-HAIR-002', '실버 925, 비취', 280000, 55000, 'traditional', 'hairpin',
-             '/static/images/products/traditional/hairpin/A3.png',
-             '/static/images/products/traditional/hairpin/A3-detail.png',
-             '/static/images/products/traditional/hairpin/A3-wear.png',
-             '전통 떨잠 장식입니다.'),
-            ('데일리 목걸이', 'DAILY-NECK-001', '스테인리스', 45000, 9000, 'daily', 'necklace',
-             '/static/images/products/daily/necklace/B1.png',
-             '/static/images/products/daily/necklace/B1-detail.png',
-             '/static/images/products/daily/necklace/B1-wear.png',
-             '일상에서 편하게 착용할 수 있는 목걸이입니다.'),
-            ('데일리 반지', 'DAILY-RING-001', '스테인리스', 50000, 10000, 'daily', 'ring',
-             '/static/images/products/daily/ring/B2.png',
-             '/static/images/products/daily/ring/B2-detail.png',
-             '/static/images/products/daily/ring/B2-wear.png',
-             '일상에서 편하게 착용할 수 있는 반지입니다.'),
-            ('데일리 팔찌', 'DAILY-BRAC-001', '스테인리스', 40000, 8000, 'daily', 'bracelet',
-             '/static/images/products/daily/bracelet/B3.png',
-             '/static/images/products/daily/bracelet/B3-detail.png',
-             '/static/images/products/daily/bracelet/B3-wear.png',
-             '일상에서 편하게 착용할 수 있는 팔찌입니다.'),
-            ('프린세스 귀걸이', 'PRIN-EAR-001', '실버 925, 큐빅', 180000, 36000, 'princess', 'earring',
-             '/static/images/products/princess/earring/C1.png',
-             '/static/images/products/princess/earring/C1-detail.png',
-             '/static/images/products/princess/earring/C1-wear.png',
-             '화려한 프린세스 스타일 귀걸이입니다.'),
-            ('프린세스 목걸이', 'PRIN-NECK-001', '실버 925, 크리스탈', 220000, 44000, 'princess', 'necklace',
-             '/static/images/products/princess/necklace/C2.png',
-             '/static/images/products/princess/necklace/C2-detail.png',
-             '/static/images/products/princess/necklace/C2-wear.png',
-             '우아한 프린세스 스타일 목걸이입니다.'),
-            ('프린세스 목걸이2', 'PRIN-NECK-002', '실버 925, 진주', 200000, 40000, 'princess', 'necklace',
-             '/static/images/products/princess/necklace/C3.png',
-             '/static/images/products/princess/necklace/C3-detail.png',
-             '/static/images/products/princess/necklace/C3-wear.png',
-             '로맨틱한 프린세스 스타일 목걸이입니다.'),
-        ]
+def create_search_index(cursor):
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
 
-        for name, code, material, buy_price, rent_price, theme, category, thumbnail, detail_img, wear_img, description in sample_products:
-            cursor.execute('''
-                INSERT INTO products (name, code, material, buy_price, rent_price, theme, category, thumbnail, description)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name, code, material, buy_price, rent_price, theme, category, thumbnail, description))
+    cursor.execute("SELECT count(*) FROM sqlite_master WHERE name IN "
+                   "('products_fts', 'products_fts_insert', 'products_fts_delete', 'products_fts_update')")
+    complete = cursor.fetchone()[0] == 4
 
-            product_id = cursor.lastrowid
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            {columns},
+            content='products', content_rowid='id',
+            tokenize='trigram case_sensitive 0'
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products
+        WHEN ({old_values}) IS NOT ({new_values}) BEGIN
+            INSERT INTO products_fts(products_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO products_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
 
-            # 상세 이미지 추가
-            cursor.execute('''
-                INSERT INTO product_images (product_id, image_url, image_type)
-                VALUES (?, ?, ?)
-            ''', (product_id, detail_img, 'detail'))
+    # 처음 만들 때, 또는 트리거가 빠져 있던 동안(import_catalog 적재 중) 바뀐 상품이 있을 수 있으면 다시 채운다
+    if not complete:
+        cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
 
-            # 착용샷 추가
-            cursor.execute('''
-                INSERT INTO product_images (product_id, image_url, image_type)
-                VALUES (?, ?, ?)
-            ''', (product_id, wear_img, 'wear'))
+def init_db():
+    """
+    스키마를 최신 버전으로 올리고 빠진 인덱스와 검색 색인이 있으면 다시 만든다 (migrations.migrate).
+    테이블 정의는 migrations.py 에 있다. CLI 와 벤치마크용이며 서버 프로세스도 시작할 때 migrate() 를 부른다.
+    """
+    from migrations import migrate
+    migrate(DATABASE)
 
-    conn.commit()
+    conn = sqlite3.connect(DATABASE)
+    # 인덱스 통계 갱신 (변경이 없으면 거의 비용이 들지 않는다)
+    conn.execute('PRAGMA optimize')
     conn.close()
     print("Database initialized successfully!")
 
@@ -1,6 +1,17 @@
 from flask import Flask
 from routes import register_routes
 from auth_routes import auth_bp
+from cart_routes import cart_bp
+from rental_routes import rentals_bp
+from images import images_bp
+from assets import register_assets
+from static_files import register_static_files
+from catalog_snapshot import warm_snapshot
+from cart import cart_service
+from rentals import warm_index
+from related import warm_related
+from metrics import register_metrics
+from profiler import register_profiler
 import os
 
 def create_app():
@@ -13,18 +24,45 @@ def create_app():
 
     app.secret_key = 'your-secret-key-change-in-production'
 
+    # 요청/DB/인증 시간 계측과 /metrics (다른 before/after_request 보다 먼저 등록)
+    register_metrics(app)
+
+    # 샘플링 프로파일러와 느린 요청 캡처 (MUSEME_PROFILE=1 일 때만)
+    register_profiler(app)
+
     # 블루프린트 등록
     app.register_blueprint(auth_bp)
+    app.register_blueprint(cart_bp)
+    app.register_blueprint(rentals_bp)
+    app.register_blueprint(images_bp)
 
     # 라우트 등록
     register_routes(app)
 
+    # 정적 파일 stat/fd/본문 캐시 (MUSEME_STATIC_FAST=0 이면 Flask 기본 뷰)
+    register_static_files(app)
+
+    # 정적 자산 manifest (python app/assets.py 로 빌드했을 때만 적용)
+    register_assets(app)
+
+    # 카탈로그 스냅샷을 미리 만들어 첫 요청부터 SQL 없이 응답
+    warm_snapshot()
+
+    # 이전 프로세스가 기록하지 못하고 남긴 장바구니 저널을 적용
+    cart_service.recover()
+
+    # 대여 가용성 색인을 미리 만들어 첫 조회가 예약 전체를 읽느라 기다리지 않게 한다
+    warm_index()
+
+    # 비슷한 제품 색인 (python app/related.py 로 저장해 둔 파일이 있으면 읽기만 한다)
+    warm_related()
+
     return app
 
 if __name__ == '__main__':
-    # 데이터베이스 초기화
-    from init_db import init_db
-    init_db()
+    # 스키마 마이그레이션 (최신이고 인덱스가 모두 있으면 확인만 하고 넘어간다)
+    from migrations import migrate
+    migrate()
 
     app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5001)
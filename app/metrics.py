@@ -0,0 +1,282 @@
+"""
+요청/DB/인증 지연시간 계측과 /metrics (Prometheus 텍스트 형식)
+
+측정값은 스레드마다 따로 쌓는다 (threading.local 의 dict 에 list 로 누적). 기록할 때는 잠그지 않으므로
+요청 하나에 드는 비용은 perf_counter 두 번과 dict 조회 몇 번이다. /metrics 를 읽을 때만 모든 스레드의
+값을 더한다. 끝난 스레드의 값은 다음에 새 스레드가 등록될 때 한곳(_retired)으로 합친다.
+
+값은 프로세스별이다. 여러 워커 프로세스로 띄우면 Prometheus 가 프로세스마다 따로 긁거나 합쳐야 한다.
+
+  MUSEME_METRICS=0         : 계측과 /metrics 끄기
+  MUSEME_METRICS_TOKEN     : 설정하면 /metrics 에 Authorization: Bearer <token> 필요
+  MUSEME_SERVER_TIMING=1   : Server-Timing 응답 헤더 (설정하지 않으면 debug 모드에서만)
+"""
+import os
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+from flask import Response, request, abort
+
+METRICS_ENABLED = os.environ.get('MUSEME_METRICS', '1') != '0'
+METRICS_TOKEN = os.environ.get('MUSEME_METRICS_TOKEN')
+SERVER_TIMING = os.environ.get('MUSEME_SERVER_TIMING')
+
+# 히스토그램 버킷 (초)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+_stores = {}     # Thread -> {(metric, labels): [값...]}
+_retired = {}    # 끝난 스레드에서 합친 값
+_metrics = []
+_collectors = []
+_caches = []
+
+
+def _register_thread():
+    series = {}
+    thread = threading.current_thread()
+    with _registry_lock:
+        for dead in [t for t in _stores if not t.is_alive()]:
+            _merge(_retired, _stores.pop(dead))
+        _stores[thread] = series
+    _local.series = series
+    return series
+
+
+def _series():
+    try:
+        return _local.series
+    except AttributeError:
+        return _register_thread()
+
+
+def _merge(into, series):
+    for key, values in list(series.items()):
+        total = into.get(key)
+        if total is None:
+            into[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                total[i] += value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        _metrics.append(self)
+
+    def observe(self, value, labels=()):
+        # values: 버킷별 개수 (마지막은 +Inf) 뒤에 합계
+        series = _series()
+        key = (self, labels)
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def render(self, merged, lines):
+        for (metric, labels), values in merged:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                bucket_labels = _label_text(self.labels + ('le',), labels + (_number(bound),))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _label_text(self.labels, labels)
+            lines.append(f'{self.name}_sum{label_text} {_number(values[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+
+
+REQUEST_SECONDS = Histogram('museme_http_request_duration_seconds', '요청 처리 시간 (응답 시작까지)',
+                            ('endpoint', 'method', 'status'))
+DB_SECONDS = Histogram('museme_db_call_duration_seconds', 'database.py 함수 호출 시간', ('function',))
+AUTH_SECONDS = Histogram('museme_auth_duration_seconds', 'JWT/비밀번호 해시 시간', ('operation',))
+REQUEST_DB_CALLS = Histogram('museme_http_request_db_calls', '요청당 database.py 호출 수', ('endpoint',),
+                             buckets=(0, 1, 2, 3, 5, 10, 20, 50))
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and value not in (float('inf'), float('-inf')) else str(value)
+    return str(value)
+
+
+# ----------------------------------------------------------------------
+# 요청별 시간 (Server-Timing 과 요청당 DB 호출 수)
+# ----------------------------------------------------------------------
+
+class RequestTimings:
+    __slots__ = ('start', 'db_calls', 'db', 'auth', 'status')
+
+    def __init__(self, start):
+        self.start = start
+        self.status = None  # after_request 에서 채운다. 없으면 예외로 끝난 요청 (500)
+        self.db_calls = 0
+        self.db = 0.0
+        self.auth = 0.0
+
+
+def timed(histogram, name, phase=None):
+    """
+    함수 호출 시간을 histogram{name} 에 기록하는 데코레이터.
+    phase 가 'db' 또는 'auth' 면 진행 중인 요청의 Server-Timing 에도 더한다.
+    """
+    labels = (name,)
+
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                histogram.observe(elapsed, labels)
+                timings = getattr(_local, 'request', None)
+                if timings is not None:
+                    if phase == 'db':
+                        timings.db_calls += 1
+                        timings.db += elapsed
+                    elif phase == 'auth':
+                        timings.auth += elapsed
+        return wrapper
+    return decorator
+
+
+def db_timed(func):
+    return timed(DB_SECONDS, func.__name__, 'db')(func)
+
+
+# ----------------------------------------------------------------------
+# 수집 시점에 읽는 값 (캐시 적중률 등)
+# ----------------------------------------------------------------------
+
+def register_collector(func):
+    """func() 는 (이름, 종류, 설명, [(라벨 dict, 값)]) 목록을 돌려준다. /metrics 를 읽을 때마다 호출된다."""
+    _collectors.append(func)
+    return func
+
+
+def register_cache(name, stats):
+    """stats() 가 hits/misses 를 담은 dict 를 주는 캐시를 적중률 지표로 내보낸다."""
+    _caches.append((name, stats))
+
+
+@register_collector
+def _cache_metrics():
+    hits, misses, ratios, entries = [], [], [], []
+    for name, stats in _caches:
+        s = stats()
+        labels = {'cache': name}
+        lookups = s['hits'] + s['misses']
+        hits.append((labels, s['hits']))
+        misses.append((labels, s['misses']))
+        ratios.append((labels, s['hits'] / lookups if lookups else 0.0))
+        if 'entries' in s:
+            entries.append((labels, s['entries']))
+    return [
+        ('museme_cache_hits_total', 'counter', '캐시 적중 수', hits),
+        ('museme_cache_misses_total', 'counter', '캐시 미스 수', misses),
+        ('museme_cache_hit_ratio', 'gauge', '캐시 적중률 (시작 이후 누적)', ratios),
+        ('museme_cache_entries', 'gauge', '캐시 항목 수', entries),
+    ]
+
+
+def render():
+    """Prometheus 텍스트 형식 (version 0.0.4)"""
+    merged = {}
+    # 끝난 스레드의 값이 _retired 로 옮겨지는 중에 두 번 더해지지 않도록 잠근 채로 합친다
+    with _registry_lock:
+        for series in [_retired] + list(_stores.values()):
+            _merge(merged, series)
+
+    by_metric = {}
+    for key, values in merged.items():
+        by_metric.setdefault(key[0], []).append((key, values))
+
+    lines = []
+    for metric in _metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        metric.render(sorted(by_metric.get(metric, ()), key=lambda item: item[0][1]), lines)
+    for collector in _collectors:
+        for name, kind, help, samples in collector():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ----------------------------------------------------------------------
+# Flask / ASGI 연결
+# ----------------------------------------------------------------------
+
+def observe_request(endpoint, method, status, elapsed):
+    REQUEST_SECONDS.observe(elapsed, (endpoint, method, status))
+
+
+def register_metrics(app):
+    if not METRICS_ENABLED:
+        return
+    server_timing = SERVER_TIMING == '1' if SERVER_TIMING is not None else app.debug
+
+    @app.before_request
+    def start_timer():
+        _local.request = RequestTimings(perf_counter())
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = getattr(_local, 'request', None)
+        if timings is None:
+            return response
+        timings.status = response.status_code
+        if server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;dur={timings.db * 1000:.2f};desc="{timings.db_calls} calls", '
+                f'auth;dur={timings.auth * 1000:.2f}, '
+                f'app;dur={(perf_counter() - timings.start) * 1000:.2f}'
+            )
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        # 처리되지 않은 예외는 after_request 를 건너뛰므로 기록은 항상 실행되는 teardown 에서 한다
+        timings = getattr(_local, 'request', None)
+        if timings is None:
+            return
+        _local.request = None
+        elapsed = perf_counter() - timings.start
+        req = request._get_current_object()  # 프록시를 여러 번 거치지 않게 (한 번에 ~1µs)
+        # 등록되지 않은 경로(404)는 하나로 묶어 라벨 수가 늘지 않게 한다
+        endpoint = req.url_rule.rule if req.url_rule is not None else '<unmatched>'
+        status = timings.status if timings.status is not None and exc is None else 500
+        observe_request(endpoint, req.method, status, elapsed)
+        REQUEST_DB_CALLS.observe(timings.db_calls, (endpoint,))
+
+    @app.route('/metrics')
+    def metrics():
+        if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            abort(401)
+        response = Response(render(), mimetype='text/plain')
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
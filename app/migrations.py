@@ -0,0 +1,379 @@
+"""
+스키마 마이그레이션 (PRAGMA user_version 으로 버전 관리)
+
+서버 프로세스(wsgi.py, asgi.py, main.py)는 시작할 때 migrate() 를 부른다.
+  - 스키마가 최신이고 인덱스가 모두 있으면 PRAGMA user_version 과 sqlite_master 만 읽고 바로 돌아간다
+    (CREATE ... IF NOT EXISTS 를 모두 다시 실행하거나 잠금을 잡지 않으므로 워커가 한꺼번에 떠도 서로 기다리지 않는다)
+  - 최신이 아니면 DB 옆 잠금 파일(<DB>.migrate.lock)을 flock 으로 잡은 프로세스 하나가 남은
+    마이그레이션을 순서대로 적용한다. 기다리던 프로세스는 버전을 다시 읽고 할 일이 없으면 돌아간다
+  - 마이그레이션마다 한 트랜잭션에서 적용하고 같은 트랜잭션에서 user_version 을 올린다.
+    중간에 실패하면 그 마이그레이션만 되돌려지고 다음 시작 때 거기서부터 다시 한다
+
+새 마이그레이션은 MIGRATIONS 끝에 다음 번호로 추가한다. 이미 배포된 항목은 고치지 않고,
+init_db 의 현재 정의를 부르지 않고 DDL 을 그대로 적는다 (나중에 init_db 가 바뀌어도 결과가 같도록).
+DB 가 코드보다 새 버전이면(배포 중 이전 워커) 아무것도 하지 않는다.
+
+시작할 때마다 init_db.INDEXES 와 검색 색인이 모두 있는지도 확인한다 (sqlite_master 한 번 읽기).
+import_catalog 가 인덱스를 지운 채 SIGKILL 등으로 끝나면 finally 가 돌지 않으므로, 빠진 것이 있으면
+잠금을 잡고 다시 만든다.
+"""
+import fcntl
+import sqlite3
+import time
+
+import init_db
+from catalog_cache import bump_catalog_version
+
+LOCK_SUFFIX = '.migrate.lock'
+BUSY_TIMEOUT_MS = 30000  # 마이그레이션 중에는 서버의 쓰기가 끝나기를 넉넉히 기다린다
+
+
+# ----------------------------------------------------------------------
+# 1: 초기 스키마. 배포된 뒤에는 바뀌면 안 되므로 init_db 의 현재 정의를 부르지 않고 그대로 옮겨 둔다
+# ----------------------------------------------------------------------
+
+def _create_tables_v1(cursor):
+    # 사용자 테이블
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 제품 테이블
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            code TEXT UNIQUE NOT NULL,
+            material TEXT,
+            buy_price INTEGER NOT NULL,
+            rent_price INTEGER,
+            theme TEXT NOT NULL,
+            category TEXT NOT NULL,
+            thumbnail TEXT,
+            main_image TEXT,
+            description TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 제품 이미지 테이블
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS product_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            image_url TEXT NOT NULL,
+            image_type TEXT NOT NULL,
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+
+    # 장바구니 테이블 (cart.py 가 메모리에서 관리하고 모아서 기록한다, id 는 서버가 만든 문자열)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cart_items (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            item_option TEXT,
+            purchase_type TEXT NOT NULL DEFAULT 'buy',
+            quantity INTEGER NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    ''')
+
+    # 대여 예약 테이블 (start_date/end_date 는 'YYYY-MM-DD', 양 끝 포함)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rentals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'reserved',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+
+_INDEXES_V1 = (
+    ('idx_products_theme', 'products(theme)'),
+    ('idx_products_theme_category', 'products(theme, category)'),
+    ('idx_products_category', 'products(category)'),
+    ('idx_products_theme_price', 'products(theme, buy_price)'),
+    ('idx_products_theme_category_price', 'products(theme, category, buy_price)'),
+    ('idx_products_theme_created', 'products(theme, created_at)'),
+    ('idx_products_theme_category_created', 'products(theme, category, created_at)'),
+    ('idx_product_images_product_type', 'product_images(product_id, image_type)'),
+    ('idx_cart_items_user', 'cart_items(user_id)'),
+    ('idx_rentals_product_end', 'rentals(product_id, end_date)'),
+    ('idx_rentals_user', 'rentals(user_id)'),
+)
+
+
+def _create_search_index_v1(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")
+    exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, material, description, code,
+            content='products', content_rowid='id',
+            tokenize='trigram case_sensitive 0'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, material, description, code)
+                VALUES (new.id, new.name, new.material, new.description, new.code);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, material, description, code)
+                VALUES ('delete', old.id, old.name, old.material, old.description, old.code);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products
+        WHEN (old.name, old.material, old.description, old.code)
+             IS NOT (new.name, new.material, new.description, new.code) BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, material, description, code)
+                VALUES ('delete', old.id, old.name, old.material, old.description, old.code);
+            INSERT INTO products_fts(rowid, name, material, description, code)
+                VALUES (new.id, new.name, new.material, new.description, new.code);
+        END
+    ''')
+    if not exists:
+        cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def _insert_sample_products_v1(cursor):
+    """products 가 비어 있으면 샘플 제품을 넣는다. 넣었으면 True"""
+    cursor.execute("SELECT COUNT(*) FROM products")
+    if cursor.fetchone()[0] == 0:
+        # (name, code, material, buy_price, rent_price, theme, category, thumbnail, detail_image, wear_image, description)
+        sample_products = [
+            ('전통 귀걸이 세트', 'TRAD-EAR-001', '실버 925', 150000, 30000, 'traditional', 'earring',
+             '/static/images/products/traditional/earring/A1.png',
+             '/static/images/products/traditional/earring/A1-detail.png',
+             '/static/images/products/traditional/earring/A1-wear.png',
+             '전통적인 한국 문양이 새겨진 귀걸이입니다.'),
+            ('전통 뒤꽂이', 'TRAD-HAIR-001', '실버 925, 진주', 250000, 50000, 'traditional', 'hairpin',
+             '/static/images/products/traditional/hairpin/A2.png',
+             '/static/images/products/traditional/hairpin/A2-detail.png',
+             '/static/images/products/traditional/hairpin/A2-wear.png',
+             '고급스러운 전통 뒤꽂이입니다.'),
+            ('전통 떨잠', 'TRAD-HAIR-002', '실버 925, 비취', 280000, 55000, 'traditional', 'hairpin',
+             '/static/images/products/traditional/hairpin/A3.png',
+             '/static/images/products/traditional/hairpin/A3-detail.png',
+             '/static/images/products/traditional/hairpin/A3-wear.png',
+             '전통 떨잠 장식입니다.'),
+            ('데일리 목걸이', 'DAILY-NECK-001', '스테인리스', 45000, 9000, 'daily', 'necklace',
+             '/static/images/products/daily/necklace/B1.png',
+             '/static/images/products/daily/necklace/B1-detail.png',
+             '/static/images/products/daily/necklace/B1-wear.png',
+             '일상에서 편하게 착용할 수 있는 목걸이입니다.'),
+            ('데일리 반지', 'DAILY-RING-001', '스테인리스', 50000, 10000, 'daily', 'ring',
+             '/static/images/products/daily/ring/B2.png',
+             '/static/images/products/daily/ring/B2-detail.png',
+             '/static/images/products/daily/ring/B2-wear.png',
+             '일상에서 편하게 착용할 수 있는 반지입니다.'),
+            ('데일리 팔찌', 'DAILY-BRAC-001', '스테인리스', 40000, 8000, 'daily', 'bracelet',
+             '/static/images/products/daily/bracelet/B3.png',
+             '/static/images/products/daily/bracelet/B3-detail.png',
+             '/static/images/products/daily/bracelet/B3-wear.png',
+             '일상에서 편하게 착용할 수 있는 팔찌입니다.'),
+            ('프린세스 귀걸이', 'PRIN-EAR-001', '실버 925, 큐빅', 180000, 36000, 'princess', 'earring',
+             '/static/images/products/princess/earring/C1.png',
+             '/static/images/products/princess/earring/C1-detail.png',
+             '/static/images/products/princess/earring/C1-wear.png',
+             '화려한 프린세스 스타일 귀걸이입니다.'),
+            ('프린세스 목걸이', 'PRIN-NECK-001', '실버 925, 크리스탈', 220000, 44000, 'princess', 'necklace',
+             '/static/images/products/princess/necklace/C2.png',
+             '/static/images/products/princess/necklace/C2-detail.png',
+             '/static/images/products/princess/necklace/C2-wear.png',
+             '우아한 프린세스 스타일 목걸이입니다.'),
+            ('프린세스 목걸이2', 'PRIN-NECK-002', '실버 925, 진주', 200000, 40000, 'princess', 'necklace',
+             '/static/images/products/princess/necklace/C3.png',
+             '/static/images/products/princess/necklace/C3-detail.png',
+             '/static/images/products/princess/necklace/C3-wear.png',
+             '로맨틱한 프린세스 스타일 목걸이입니다.'),
+        ]
+
+        for name, code, material, buy_price, rent_price, theme, category, thumbnail, detail_img, wear_img, description in sample_products:
+            cursor.execute('''
+                INSERT INTO products (name, code, material, buy_price, rent_price, theme, category, thumbnail, description)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, code, material, buy_price, rent_price, theme, category, thumbnail, description))
+
+            product_id = cursor.lastrowid
+
+            # 상세 이미지 추가
+            cursor.execute('''
+                INSERT INTO product_images (product_id, image_url, image_type)
+                VALUES (?, ?, ?)
+            ''', (product_id, detail_img, 'detail'))
+
+            # 착용샷 추가
+            cursor.execute('''
+                INSERT INTO product_images (product_id, image_url, image_type)
+                VALUES (?, ?, ?)
+            ''', (product_id, wear_img, 'wear'))
+
+        return True
+    return False
+
+
+def _initial_schema(cursor):
+    # user_version 이 없던 기존 DB 에서도 그대로 돌 수 있게 모두 IF NOT EXISTS
+    _create_tables_v1(cursor)
+    for name, target in _INDEXES_V1:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+    _create_search_index_v1(cursor)
+    return _insert_sample_products_v1(cursor)
+
+
+def _fts_update_only_on_text_change(cursor):
+    # 가격만 바뀌는 갱신이 검색 색인을 다시 쓰지 않게 한다
+    cursor.execute('DROP TRIGGER IF EXISTS products_fts_update')
+    cursor.execute('''
+        CREATE TRIGGER products_fts_update AFTER UPDATE ON products
+        WHEN (old.name, old.material, old.description, old.code)
+             IS NOT (new.name, new.material, new.description, new.code) BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, material, description, code)
+                VALUES ('delete', old.id, old.name, old.material, old.description, old.code);
+            INSERT INTO products_fts(rowid, name, material, description, code)
+                VALUES (new.id, new.name, new.material, new.description, new.code);
+        END
+    ''')
+
+
+def _sort_indexes_without_theme(cursor):
+    # 테마 없이(또는 카테고리만으로) 가격/등록일 정렬할 때 전체 정렬을 하지 않게 한다
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_price ON products(buy_price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_price ON products(category, buy_price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_created ON products(category, created_at)')
+
+
+def _revoked_tokens(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti TEXT PRIMARY KEY,
+            expires_at INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens(expires_at)')
+
+
+# (버전, 설명, 적용 함수). 적용 함수가 True 를 돌려주면 카탈로그가 바뀐 것으로 본다
+MIGRATIONS = (
+    (1, '초기 스키마 (테이블, 인덱스, 검색 색인, 샘플 제품)', _initial_schema),
+    (2, '검색 색인 갱신 트리거를 색인 열이 바뀔 때만 실행', _fts_update_only_on_text_change),
+    (3, '테마 없는 가격/등록일 정렬 인덱스', _sort_indexes_without_theme),
+    (4, '로그아웃한 토큰 폐기 목록 (워커 공유)', _revoked_tokens),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+class _MigrationLock:
+    def __init__(self, path):
+        self.path = path + LOCK_SUFFIX
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+SEARCH_INDEX_OBJECTS = ('products_fts', 'products_fts_insert', 'products_fts_delete', 'products_fts_update')
+
+
+def missing_indexes(conn):
+    """init_db.INDEXES 와 검색 색인(테이블, 트리거) 중 DB 에 없는 이름"""
+    names = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('index', 'table', 'trigger')")}
+    expected = [name for name, _ in init_db.INDEXES] + list(SEARCH_INDEX_OBJECTS)
+    return [name for name in expected if name not in names]
+
+
+def migrate(path=None):
+    """스키마를 LATEST_VERSION 으로 올리고 빠진 인덱스를 다시 만든다. 적용한 마이그레이션 수를 돌려준다."""
+    path = path or init_db.DATABASE
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        version = schema_version(conn)
+        if version > LATEST_VERSION or (version == LATEST_VERSION and not missing_indexes(conn)):
+            return 0
+        with _MigrationLock(path):
+            conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+            applied = _apply_pending(conn)
+            _restore_indexes(conn)
+            return applied
+    finally:
+        conn.close()
+
+
+def _restore_indexes(conn):
+    # 잠금을 기다리는 동안 다른 프로세스가 이미 만들었을 수 있다
+    missing = missing_indexes(conn)
+    if not missing:
+        return
+    start = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        cursor = conn.cursor()
+        init_db.create_indexes(cursor)
+        init_db.create_search_index(cursor)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('PRAGMA optimize')
+    print(f'restored missing indexes: {", ".join(missing)} ({(time.perf_counter() - start) * 1000:.0f}ms)')
+
+
+def _apply_pending(conn):
+    # 잠금을 기다리는 동안 다른 프로세스가 이미 적용했을 수 있다
+    current = schema_version(conn)
+    applied = 0
+    catalog_changed = False
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        start = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            catalog_changed |= bool(apply(conn.cursor()))
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        applied += 1
+        print(f'migration {version}: {description} ({(time.perf_counter() - start) * 1000:.0f}ms)')
+    if applied:
+        conn.execute('PRAGMA optimize')
+    if catalog_changed:
+        bump_catalog_version()
+    return applied
+
+
+if __name__ == '__main__':
+    count = migrate()
+    print(f'schema version {LATEST_VERSION} ({count} migrations applied)')
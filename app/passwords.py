@@ -0,0 +1,164 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from metrics import timed, AUTH_SECONDS
+
+# scrypt 비용 파라미터 (환경 변수로 조정, 바뀌면 다음 로그인 때 다시 해시된다)
+SCRYPT_N = int(os.environ.get('MUSEME_SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('MUSEME_SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('MUSEME_SCRYPT_P', 1))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# 해시 전용 워커 풀. 대기열이 가득 차면 요청 스레드를 붙잡지 않고 바로 거절한다
+HASH_WORKERS = int(os.environ.get('MUSEME_HASH_WORKERS', os.cpu_count() or 2))
+HASH_QUEUE_LIMIT = int(os.environ.get('MUSEME_HASH_QUEUE_LIMIT', HASH_WORKERS * 8))
+HASH_TIMEOUT = 10  # 초
+
+SCHEME = 'scrypt'
+
+
+class PasswordServiceBusy(Exception):
+    """해시 대기열이 가득 찼거나 시간 안에 끝나지 않았을 때"""
+
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=HASH_BYTES)
+
+
+def _encode(n, r, p, salt, digest):
+    return f'{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}'
+
+
+def _parse(stored_hash):
+    """(n, r, p, salt, digest). 형식이 맞지 않으면 ValueError (binascii.Error 포함)"""
+    scheme, n, r, p, salt, digest = stored_hash.split('$')
+    if scheme != SCHEME:
+        raise ValueError(scheme)
+    return int(n), int(r), int(p), base64.b64decode(salt, validate=True), base64.b64decode(digest, validate=True)
+
+
+def is_hashed(stored_hash):
+    return stored_hash.startswith(SCHEME + '$')
+
+
+def needs_rehash(stored_hash):
+    """평문으로 저장됐거나 현재 설정과 비용 파라미터가 다르면 True"""
+    if not is_hashed(stored_hash):
+        return True
+    try:
+        n, r, p, _, _ = _parse(stored_hash)
+    except ValueError:
+        return True
+    return (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def _hash_sync(password, n, r, p):
+    salt = os.urandom(SALT_BYTES)
+    return _encode(n, r, p, salt, _scrypt(password, salt, n, r, p))
+
+
+def _verify_sync(stored_hash, password):
+    if not is_hashed(stored_hash):
+        # 해시 도입 이전에 평문으로 저장된 계정
+        return hmac.compare_digest(stored_hash.encode('utf-8'), password.encode('utf-8'))
+    try:
+        n, r, p, salt, digest = _parse(stored_hash)
+        return hmac.compare_digest(_scrypt(password, salt, n, r, p), digest)
+    except ValueError:
+        # 깨진 해시 ('scrypt$', 잘못된 base64, 허용되지 않는 비용 값) 는 500 대신 불일치
+        return False
+
+
+_dummy_hash = None
+
+
+def _verify_dummy_sync(password):
+    # 현재 비용 설정의 해시와 같은 계산을 해서 없는 계정도 있는 계정과 같은 시간이 걸리게 한다
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = _hash_sync('', SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    _verify_sync(_dummy_hash, password)
+    return False
+
+
+class PasswordHasher:
+    """scrypt 계산을 크기가 정해진 워커 풀에서 실행한다 (hashlib.scrypt 는 GIL 을 놓는다)."""
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, timeout=HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(queue_limit)
+
+    def _get_executor(self):
+        # fork 된 워커 프로세스마다 자기 풀을 만든다
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(self.queue_limit)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PasswordServiceBusy()
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordServiceBusy()
+
+    def hash(self, password):
+        return self._run(_hash_sync, password, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+    def verify(self, stored_hash, password):
+        return self._run(_verify_sync, stored_hash, password)
+
+    def verify_dummy(self, password):
+        return self._run(_verify_dummy_sync, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+hasher = PasswordHasher()
+
+
+@timed(AUTH_SECONDS, 'password_hash', 'auth')
+def hash_password(password):
+    return hasher.hash(password)
+
+
+@timed(AUTH_SECONDS, 'password_verify', 'auth')
+def verify_password(stored_hash, password):
+    return hasher.verify(stored_hash, password)
+
+
+@timed(AUTH_SECONDS, 'password_verify', 'auth')
+def verify_missing_user(password):
+    """없는 계정으로 로그인할 때 호출한다. 항상 False 지만 verify_password 와 같은 시간이 걸린다."""
+    return hasher.verify_dummy(password)
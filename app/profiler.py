@@ -0,0 +1,323 @@
+"""
+샘플링 프로파일러와 느린 요청 캡처 (MUSEME_PROFILE=1 일 때만)
+
+  - 샘플러 스레드가 PROFILE_HZ 마다 처리 중인 요청 스레드의 스택을 sys._current_frames() 로 읽어
+    요청별, 그리고 프로세스 전체로 collapsed stack ("a;b;c 횟수") 을 센다
+  - 요청이 SLOW_MS 보다 오래 걸리면 그 요청의 샘플(과 MUSEME_PROFILE_CPROFILE=1 이면 cProfile 결과,
+    cProfile 은 한 번에 한 요청만 켤 수 있어 동시에 처리 중이던 요청에는 없다)을
+    디스크의 링 버퍼(PROFILE_DIR, 최근 PROFILE_KEEP 개)에 저장한다. 저장은 별도 스레드가 맡는다
+  - /admin/profile/... 에서 목록과 collapsed stack 을 내려받는다 (flamegraph.pl, speedscope 등에서 사용)
+    MUSEME_PROFILE_TOKEN 이 없으면 관리 엔드포인트는 열리지 않는다
+
+create_app() 에서 등록하므로 wsgi.py 에서도 같게 동작한다. asgi.py 에서는 프로파일링을 켜면
+이벤트 루프의 빠른 경로를 끄고 모든 요청을 Flask 로 넘겨 똑같이 측정한다.
+cProfile 은 요청마다 모든 함수 호출을 기록하므로 처리량이 크게 떨어진다. 재현용 환경에서만 켠다.
+"""
+import cProfile
+import hmac
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, request, jsonify, abort, send_file
+
+import database
+
+PROFILE_ENABLED = os.environ.get('MUSEME_PROFILE') == '1'
+PROFILE_HZ = float(os.environ.get('MUSEME_PROFILE_HZ', 100))
+SLOW_MS = float(os.environ.get('MUSEME_PROFILE_SLOW_MS', 500))
+CPROFILE_ENABLED = os.environ.get('MUSEME_PROFILE_CPROFILE') == '1'
+PROFILE_DIR = os.environ.get('MUSEME_PROFILE_DIR') or database.DATABASE + '-profiles'
+PROFILE_KEEP = int(os.environ.get('MUSEME_PROFILE_KEEP', 50))
+PROFILE_TOKEN = os.environ.get('MUSEME_PROFILE_TOKEN')
+
+MAX_STACK_DEPTH = 128
+MAX_AGGREGATE_STACKS = 20000  # 프로세스 전체 집계의 서로 다른 스택 수 상한
+WRITE_QUEUE_SIZE = 16
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CAPTURE_NAME = re.compile(r'^[0-9]{13}-[0-9]+-[0-9]+$')
+CAPTURE_FILES = {'collapsed': 'text/plain; charset=utf-8', 'pstats': 'application/octet-stream',
+                 'json': 'application/json'}
+
+# 인터프리터마다 켤 수 있는 cProfile 은 하나뿐이다 (3.12 부터는 두 번째 enable() 이 ValueError).
+# 다른 요청이 이미 cProfile 중이면 이 요청은 샘플만 모은다
+_cprofile_lock = threading.Lock()
+
+
+class RequestProfile:
+    __slots__ = ('endpoint', 'method', 'path', 'start', 'samples', 'status', 'cprofile')
+
+    def __init__(self, endpoint, method, path):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.samples = Counter()
+        self.status = None
+        self.cprofile = None
+
+
+class Profiler:
+    def __init__(self, hz=PROFILE_HZ, slow_ms=SLOW_MS, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.interval = 1.0 / hz
+        self.slow_ms = slow_ms
+        self.directory = directory
+        self.keep = keep
+        self._active = {}          # 스레드 ident -> RequestProfile
+        self._wake = threading.Event()
+        self._labels = {}          # code 객체 -> 스택 프레임 이름
+        self._aggregate = Counter()
+        self._writes = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._seq = 0
+        self._pid = None
+        self.samples = 0
+        self.captures = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # fork 된 워커 프로세스마다 자기 샘플러/저장 스레드를 갖는다
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._active = {}
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True).start()
+        threading.Thread(target=self._write_loop, name='profiler-writer', daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # 샘플링
+    # ------------------------------------------------------------------
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(BASE_DIR):
+                filename = os.path.relpath(filename, BASE_DIR)
+            else:
+                filename = '/'.join(filename.split(os.sep)[-2:])
+            name = getattr(code, 'co_qualname', code.co_name)  # co_qualname 은 3.11 부터
+            label = f'{name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    def _sample_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for ident, profile in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = self._collapse(frame)
+                profile.samples[stack] += 1
+                if stack in self._aggregate or len(self._aggregate) < MAX_AGGREGATE_STACKS:
+                    self._aggregate[stack] += 1
+                self.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    def aggregate(self):
+        """프로세스 시작 이후 모든 요청의 collapsed stack"""
+        return collapsed_text(self._aggregate)
+
+    # ------------------------------------------------------------------
+    # 요청 훅
+    # ------------------------------------------------------------------
+
+    def begin(self, endpoint, method, path):
+        self._ensure_started()
+        profile = RequestProfile(endpoint, method, path)
+        if CPROFILE_ENABLED and _cprofile_lock.acquire(blocking=False):
+            try:
+                profile.cprofile = cProfile.Profile()
+                profile.cprofile.enable()
+            except ValueError:
+                # 이 앱 밖에서 켠 프로파일러가 있다
+                profile.cprofile = None
+                _cprofile_lock.release()
+        self._active[threading.get_ident()] = profile
+        self._wake.set()
+        return profile
+
+    def end(self, profile):
+        self._active.pop(threading.get_ident(), None)
+        if profile.cprofile is not None:
+            profile.cprofile.disable()
+            _cprofile_lock.release()
+        elapsed_ms = (time.perf_counter() - profile.start) * 1000
+        if elapsed_ms < self.slow_ms:
+            return
+        try:
+            # 디스크 쓰기로 이미 느린 요청을 더 늦추지 않도록 저장 스레드에 넘긴다
+            self._writes.put_nowait((profile, elapsed_ms))
+        except queue.Full:
+            self.dropped += 1
+
+    # ------------------------------------------------------------------
+    # 링 버퍼
+    # ------------------------------------------------------------------
+
+    def _write_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            profile, elapsed_ms = self._writes.get()
+            try:
+                self._write_capture(profile, elapsed_ms)
+                self._trim()
+            except OSError:
+                self.dropped += 1
+
+    def _write_capture(self, profile, elapsed_ms):
+        self._seq += 1
+        name = f'{time.time_ns() // 1_000_000:013d}-{os.getpid()}-{self._seq}'
+        base = os.path.join(self.directory, name)
+        meta = {
+            'name': name,
+            'endpoint': profile.endpoint,
+            'method': profile.method,
+            'path': profile.path,
+            'status': profile.status,
+            'duration_ms': round(elapsed_ms, 2),
+            'samples': sum(profile.samples.values()),
+            'sample_hz': round(1.0 / self.interval, 2),
+            'cprofile': profile.cprofile is not None,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }
+        if profile.cprofile is not None:
+            _write_atomic(base + '.pstats', lambda path: profile.cprofile.dump_stats(path))
+        _write_atomic(base + '.collapsed', lambda path: _write_text(path, collapsed_text(profile.samples)))
+        # 메타 파일을 마지막에 써서 목록에 보이는 캡처는 항상 완전하다
+        _write_atomic(base + '.json', lambda path: _write_text(path, json.dumps(meta, ensure_ascii=False)))
+        self.captures += 1
+
+    def _trim(self):
+        names = sorted(list_capture_names(self.directory))
+        for name in names[:max(0, len(names) - self.keep)]:
+            for ext in ('json', 'collapsed', 'pstats'):
+                try:
+                    os.unlink(os.path.join(self.directory, f'{name}.{ext}'))
+                except FileNotFoundError:
+                    pass
+
+    def list_captures(self):
+        captures = []
+        for name in sorted(list_capture_names(self.directory), reverse=True):
+            try:
+                with open(os.path.join(self.directory, name + '.json'), encoding='utf-8') as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # 다른 프로세스가 방금 지웠다
+        return captures
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'sample_hz': round(1.0 / self.interval, 2),
+            'slow_ms': self.slow_ms,
+            'cprofile': CPROFILE_ENABLED,
+            'directory': self.directory,
+            'keep': self.keep,
+            'in_flight': len(self._active),
+            'samples': self.samples,
+            'captures': self.captures,
+            'dropped': self.dropped,
+        }
+
+
+def collapsed_text(samples):
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(samples.items()))
+
+
+def list_capture_names(directory):
+    try:
+        entries = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [e[:-5] for e in entries if e.endswith('.json') and CAPTURE_NAME.match(e[:-5])]
+
+
+def _write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _write_atomic(path, write):
+    tmp = f'{path}.tmp{os.getpid()}'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+profiler = Profiler() if PROFILE_ENABLED else None
+
+
+def register_profiler(app):
+    if profiler is None:
+        return
+
+    @app.before_request
+    def start_profile():
+        endpoint = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        request.environ['museme.profile'] = profiler.begin(endpoint, request.method, request.path)
+
+    @app.after_request
+    def record_status(response):
+        profile = request.environ.get('museme.profile')
+        if profile is not None:
+            profile.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profile = request.environ.pop('museme.profile', None)
+        if profile is not None:
+            profiler.end(profile)
+
+    def require_token():
+        # 토큰이 없으면 관리 엔드포인트 자체가 없는 것처럼 응답
+        if not PROFILE_TOKEN:
+            abort(404)
+        header = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(header.encode('utf-8'), f'Bearer {PROFILE_TOKEN}'.encode('utf-8')):
+            abort(401)
+
+    @app.route('/admin/profile')
+    def profile_index():
+        require_token()
+        return jsonify({'profiler': profiler.stats(), 'captures': profiler.list_captures()})
+
+    @app.route('/admin/profile/stacks')
+    def profile_stacks():
+        require_token()
+        response = Response(profiler.aggregate(), mimetype='text/plain')
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    @app.route('/admin/profile/captures/<name>.<ext>')
+    def profile_capture(name, ext):
+        require_token()
+        if not CAPTURE_NAME.match(name) or ext not in CAPTURE_FILES:
+            abort(404)
+        path = os.path.join(profiler.directory, f'{name}.{ext}')
+        if not os.path.exists(path):
+            abort(404)
+        return send_file(path, mimetype=CAPTURE_FILES[ext], as_attachment=ext == 'pstats',
+                         download_name=f'{name}.{ext}', max_age=0)
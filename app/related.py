@@ -0,0 +1,427 @@
+"""
+비슷한 제품 색인 (/api/product/<id>/related)
+
+제품마다 희소 특징 벡터를 만든다.
+  테마, 카테고리 : one-hot
+  소재          : 쉼표로 나눈 토큰 (길이 1 로 정규화, 두 제품의 값은 코사인)
+  구매가        : 로그 가격 차이가 PRICE_LOG_RANGE 안이면 가까울수록 1 에 가까운 값
+두 제품의 점수는 가중치를 곱해 더한 값이고, 제품마다 점수가 높은 RELATED_K 개를 미리 골라 둔다.
+후보는 카탈로그 전체가 아니라 같은 (테마, 카테고리) 묶음을 가격 순으로 늘어놓은 목록에서 앞뒤 WINDOW 개만 본다
+(묶음이 K 개보다 작으면 같은 카테고리, 같은 테마 목록의 창도 본다). 그래서 만드는 비용은 O(N x WINDOW) 이다.
+
+결과는 배열에 담는다.
+  ids        array('i') 제품 id (오름차순)
+  signatures array('I') 제품별 특징 서명 (crc32), 바뀐 제품을 찾는 데 쓴다
+  themes, categories, prices  이전 가격 순 목록을 다시 만드는 데 쓴다 (증분 갱신)
+  neighbors  array('i') 제품마다 K 칸, 점수 순 (모자라면 0)
+  rows       array('i') 제품 id -> 행 번호 (없으면 -1)
+조회는 rows 한 번과 neighbors 슬라이스 한 번이다.
+
+python app/related.py 로 미리 만들어 <DB>-related.idx 에 저장해 두면 서버는 시작할 때 읽기만 한다.
+카탈로그 스냅샷이 새로 만들어지면 서명이 바뀐 제품과 그 제품이 전후 가격 순 창에 들어 있는 제품만
+백그라운드에서 다시 계산해 교체하고 저장한다. 바뀐 제품이 FULL_REBUILD_RATIO 를 넘으면 전부 다시 만든다.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+import zlib
+from array import array
+
+import database
+from catalog_cache import TTL_SECONDS
+from catalog_snapshot import current_snapshot, load_snapshot
+
+RELATED_K = 12
+WINDOW = 24
+W_THEME = 2.0
+W_CATEGORY = 3.0
+W_MATERIAL = 1.5
+W_PRICE = 1.0
+PRICE_LOG_RANGE = math.log(2)   # 두 배 넘게 차이 나면 가격 점수 0
+FULL_REBUILD_RATIO = 0.2
+INDEX_MAX_AGE = TTL_SECONDS     # 스냅샷을 끈 경우 DB 에서 다시 읽는 주기
+FORMAT_VERSION = 1
+
+_generations = itertools.count()
+
+
+def index_path():
+    return os.environ.get('MUSEME_RELATED_PATH') or database.DATABASE + '-related.idx'
+
+
+def signature(record):
+    key = f'{record.theme}\x1f{record.category}\x1f{record.material}\x1f{record.buy_price}'
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def _text_key(text):
+    return zlib.crc32((text or '').encode('utf-8'))
+
+
+# ----------------------------------------------------------------------
+# 특징과 이웃 계산
+# ----------------------------------------------------------------------
+
+def _sorted_lists(keys, sort_key):
+    """키별 위치(pos) 목록을 sort_key 로 정렬한 것과 pos -> 목록 안 자리"""
+    lists = {}
+    for pos, key in enumerate(keys):
+        lists.setdefault(key, []).append(pos)
+    index = array('i', [0]) * sum(len(members) for members in lists.values())
+    for members in lists.values():
+        members.sort(key=sort_key)
+        for i, pos in enumerate(members):
+            index[pos] = i
+    return lists, index
+
+
+def _window(members, index):
+    return members[max(0, index - WINDOW):index] + members[index + 1:index + WINDOW + 1]
+
+
+class _Order:
+    """
+    (테마, 카테고리) 묶음, 카테고리, 테마별로 (구매가, id) 순 정렬한 목록.
+    테마와 카테고리는 _text_key 값이라 저장된 색인의 배열로도 같은 목록을 다시 만들 수 있다.
+    """
+
+    def __init__(self, ids, themes, categories, prices):
+        self.theme = themes
+        self.category = categories
+        sort_key = lambda pos: (max(prices[pos], 1), ids[pos])
+        self.groups, self.group_index = _sorted_lists(zip(themes, categories), sort_key)
+        self.categories, self.category_index = _sorted_lists(categories, sort_key)
+        self.themes, self.theme_index = _sorted_lists(themes, sort_key)
+
+    def group(self, pos):
+        return self.groups[(self.theme[pos], self.category[pos])]
+
+    def small_group(self, pos):
+        return len(self.group(pos)) <= RELATED_K
+
+    def _fallback_windows(self, pos):
+        return (_window(self.categories[self.category[pos]], self.category_index[pos])
+                + _window(self.themes[self.theme[pos]], self.theme_index[pos]))
+
+    def candidates(self, pos):
+        """pos 의 후보 (자신 제외). 묶음이 작으면 같은 카테고리, 같은 테마 목록의 창도 본다."""
+        candidates = _window(self.group(pos), self.group_index[pos])
+        if self.small_group(pos):
+            candidates += self._fallback_windows(pos)
+        return candidates
+
+    def dependents(self, pos):
+        """후보에 pos 가 들어가는 제품 (창은 대칭이라 pos 의 창에서 찾는다)"""
+        return (_window(self.group(pos), self.group_index[pos])
+                + [q for q in self._fallback_windows(pos) if self.small_group(q)])
+
+
+class _Features:
+    """카탈로그(id 순서 ProductRecord 목록)의 점수 계산용 값. 위치(pos)는 records 의 순서"""
+
+    def __init__(self, records):
+        self.records = records
+        self.position = {r.id: pos for pos, r in enumerate(records)}
+        self.ids = array('i', (r.id for r in records))
+        self.theme_keys = array('I', (_text_key(r.theme) for r in records))
+        self.category_keys = array('I', (_text_key(r.category) for r in records))
+        self.prices = array('q', (r.buy_price or 0 for r in records))
+        self.order = _Order(self.ids, self.theme_keys, self.category_keys, self.prices)
+
+        material_ids = {}
+        self.theme = [r.theme for r in records]
+        self.category = [r.category for r in records]
+        self.material = [material_ids.setdefault(
+            frozenset(t.strip() for t in (r.material or '').split(',') if t.strip()), len(material_ids))
+            for r in records]
+        self.log_price = [math.log(max(price, 1)) for price in self.prices]
+        self._material_sets = {i: m for m, i in material_ids.items()}
+        self._material_scores = {}
+
+    def _material_score(self, a, b):
+        if a == b:
+            return 1.0 if self._material_sets[a] else 0.0
+        key = (a, b) if a < b else (b, a)
+        score = self._material_scores.get(key)
+        if score is None:
+            sa, sb = self._material_sets[a], self._material_sets[b]
+            score = len(sa & sb) / math.sqrt(len(sa) * len(sb)) if sa and sb else 0.0
+            self._material_scores[key] = score
+        return score
+
+    def top_k(self, pos):
+        """점수 순 이웃 id K 개 (모자라면 0 으로 채운다)"""
+        theme, category, material, log_price = self.theme, self.category, self.material, self.log_price
+        ids = self.ids
+        t, c, m, p = theme[pos], category[pos], material[pos], log_price[pos]
+        scored = []
+        for q in set(self.order.candidates(pos)):
+            score = W_MATERIAL * self._material_score(m, material[q])
+            if theme[q] == t:
+                score += W_THEME
+            if category[q] == c:
+                score += W_CATEGORY
+            distance = abs(log_price[q] - p)
+            if distance < PRICE_LOG_RANGE:
+                score += W_PRICE * (1.0 - distance / PRICE_LOG_RANGE)
+            scored.append((-score, ids[q]))
+        scored.sort()
+        top = [product_id for _, product_id in scored[:RELATED_K]]
+        return top + [0] * (RELATED_K - len(top))
+
+    def index(self, neighbors, signatures=None):
+        if signatures is None:
+            signatures = array('I', (signature(r) for r in self.records))
+        return RelatedIndex(self.ids, signatures, self.theme_keys, self.category_keys, self.prices, neighbors)
+
+
+# ----------------------------------------------------------------------
+# 색인
+# ----------------------------------------------------------------------
+
+class RelatedIndex:
+    """
+    만든 뒤 바꾸지 않는다. 카탈로그가 바뀌면 새 색인으로 통째로 교체한다.
+    themes/categories/prices 는 증분 갱신 때 이전 가격 순 목록을 다시 만드는 데만 쓴다.
+    """
+    ARRAYS = (('ids', 'i', 1), ('signatures', 'I', 1), ('themes', 'I', 1), ('categories', 'I', 1),
+              ('prices', 'q', 1), ('neighbors', 'i', RELATED_K))
+
+    def __init__(self, ids, signatures, themes, categories, prices, neighbors, k=RELATED_K):
+        self.k = k
+        self.ids = ids
+        self.signatures = signatures
+        self.themes = themes
+        self.categories = categories
+        self.prices = prices
+        self.neighbors = neighbors
+        self.rows = array('i', [-1]) * ((ids[-1] + 1) if ids else 0)
+        for row, product_id in enumerate(ids):
+            self.rows[product_id] = row
+        self.built_at = time.monotonic()
+        self.generation = next(_generations)  # 응답 캐시 키용, 색인마다 다르다
+        self.source = None   # 이 색인을 만든 스냅샷 (weakref)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, product_id):
+        return self.rows[product_id] if 0 <= product_id < len(self.rows) else -1
+
+    def related(self, product_id, limit=RELATED_K):
+        """비슷한 제품 id 목록 (점수 순). 색인에 없는 제품이면 None."""
+        row = self.row(product_id)
+        if row < 0:
+            return None
+        start = row * self.k
+        return [i for i in self.neighbors[start:start + min(limit, self.k)] if i]
+
+    def order(self):
+        return _Order(self.ids, self.themes, self.categories, self.prices)
+
+    @staticmethod
+    def _header(count):
+        return {'format': FORMAT_VERSION, 'k': RELATED_K, 'count': count, 'byteorder': sys.byteorder,
+                'window': WINDOW, 'weights': [W_THEME, W_CATEGORY, W_MATERIAL, W_PRICE]}
+
+    def save(self, path):
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(self._header(len(self.ids))).encode('utf-8') + b'\n')
+            for name, _, _ in self.ARRAYS:
+                getattr(self, name).tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """저장된 색인. 없거나 형식/가중치가 다르면 None."""
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header != cls._header(header.get('count')):
+                    return None
+                arrays = []
+                for _, typecode, width in cls.ARRAYS:
+                    values = array(typecode)
+                    values.fromfile(f, header['count'] * width)
+                    arrays.append(values)
+        except (OSError, ValueError, EOFError):
+            return None
+        return cls(*arrays)
+
+
+def build_index(records):
+    """records(id 순 ProductRecord) 전체로 새 색인을 만든다."""
+    features = _Features(records)
+    neighbors = array('i')
+    for pos in range(len(records)):
+        neighbors.extend(features.top_k(pos))
+    return features.index(neighbors)
+
+
+def update_index(old, records):
+    """
+    바뀐 제품과 그 영향을 받는 제품만 다시 계산한 새 색인과 다시 계산한 제품 수.
+    바뀐 것이 없으면 old 를 그대로 돌려준다.
+
+    다시 계산하는 제품은 후보 창이 달라질 수 있는 제품이다.
+      - 서명이 바뀌었거나 새로 생긴 제품
+      - 새 가격 순 목록에서 그 제품을 후보로 보는 제품 (새로 들어온 후보)
+      - 이전 목록에서 바뀌었거나 없어진 제품을 후보로 보던 제품 (빠진 후보, 창이 밀려 새로 보이는 후보)
+      - 크기가 RELATED_K 를 넘나든 묶음의 제품 (카테고리/테마 창을 보는지가 바뀐다)
+    나머지 제품은 후보와 그 특징이 모두 그대로라 이전 결과를 복사한다.
+    """
+    signatures = array('I', (signature(r) for r in records))
+    changed = [pos for pos, r in enumerate(records)
+               if old.row(r.id) < 0 or old.signatures[old.row(r.id)] != signatures[pos]]
+    current = {r.id for r in records}
+    removed = [i for i in old.ids if i not in current]
+    if not changed and not removed:
+        return old, 0
+    if len(changed) + len(removed) > FULL_REBUILD_RATIO * max(len(records), 1):
+        return build_index(records), len(records)
+
+    features = _Features(records)
+    new_order, old_order = features.order, old.order()
+    affected = set(changed)
+    touched_groups = set()
+    for pos in changed:
+        affected.update(new_order.dependents(pos))
+        touched_groups.add((new_order.theme[pos], new_order.category[pos]))
+    old_rows = [old.row(records[pos].id) for pos in changed] + [old.row(i) for i in removed]
+    for row in old_rows:
+        if row < 0:
+            continue
+        for q in old_order.dependents(row):
+            pos = features.position.get(old.ids[q])
+            if pos is not None:
+                affected.add(pos)
+        touched_groups.add((old_order.theme[row], old_order.category[row]))
+    for key in touched_groups:
+        members = new_order.groups.get(key, [])
+        if (len(old_order.groups.get(key, ())) <= RELATED_K) != (len(members) <= RELATED_K):
+            affected.update(members)
+
+    k = old.k
+    neighbors = array('i')
+    for pos, r in enumerate(records):
+        if pos in affected:
+            neighbors.extend(features.top_k(pos))
+        else:
+            start = old.row(r.id) * k
+            neighbors.extend(old.neighbors[start:start + k])
+    return features.index(neighbors, signatures), len(affected)
+
+
+# ----------------------------------------------------------------------
+# 프로세스 전역 색인
+# ----------------------------------------------------------------------
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _catalog():
+    """(스냅샷 또는 None, id 순 제품 목록)"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        return snapshot, snapshot.all
+    return None, load_snapshot().all
+
+
+def refresh_index(blocking=True):
+    """
+    카탈로그에 맞게 색인을 갱신한다 (처음이면 저장된 색인을 읽고, 없으면 새로 만든다).
+    blocking=False 면 이미 다른 스레드가 갱신 중일 때 기다리지 않고 None.
+    """
+    global _index
+    if not _build_lock.acquire(blocking=blocking):
+        return None
+    try:
+        snapshot, records = _catalog()
+        old = _index if _index is not None else RelatedIndex.load(index_path())
+        if old is None:
+            index = build_index(records)
+        else:
+            index, _ = update_index(old, records)
+        if index is not old:
+            try:
+                index.save(index_path())
+            except OSError:
+                pass  # 저장하지 못해도 이 프로세스는 메모리의 색인을 쓴다
+        index.source = weakref.ref(snapshot) if snapshot is not None else None
+        index.built_at = time.monotonic()
+        _index = index
+        return index
+    finally:
+        _build_lock.release()
+
+
+def warm_related():
+    """시작할 때 호출. 저장된 색인이 있으면 읽기만 하고, 카탈로그와 다르면 백그라운드에서 맞춘다."""
+    global _index
+    if _index is not None:
+        return
+    saved = RelatedIndex.load(index_path())
+    if saved is not None:
+        _index = saved
+    _refresh_in_background()
+
+
+def _refresh_quietly():
+    try:
+        refresh_index(blocking=False)
+    except sqlite3.Error:
+        pass  # 테이블이 아직 없으면 다음 요청 때 다시 시도한다
+
+
+def _refresh_in_background():
+    if _build_lock.locked():
+        return
+    threading.Thread(target=_refresh_quietly, name='related-index', daemon=True).start()
+
+
+def current_index():
+    """현재 색인. 아직 없으면(처음 만드는 중) None."""
+    index = _index
+    if index is None:
+        _refresh_in_background()
+        return _index
+    if index.source is not None:
+        snapshot = current_snapshot(build=False)
+        stale = snapshot is not None and index.source() is not snapshot
+    else:
+        stale = time.monotonic() - index.built_at > INDEX_MAX_AGE
+    if stale:
+        _refresh_in_background()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='비슷한 제품 색인 만들기')
+    parser.add_argument('--full', action='store_true', help='저장된 색인을 무시하고 전부 다시 만든다')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = load_snapshot().all
+    loaded = time.perf_counter()
+    old = None if args.full else RelatedIndex.load(index_path())
+    if old is None:
+        index, recomputed = build_index(records), len(records)
+    else:
+        index, recomputed = update_index(old, records)
+    if index is not old:
+        index.save(index_path())
+    print(f'{len(records)} products ({loaded - start:.1f}s to read), recomputed {recomputed} '
+          f'in {time.perf_counter() - loaded:.1f}s -> {index_path()}')
+
+
+if __name__ == '__main__':
+    main()
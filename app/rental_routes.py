@@ -0,0 +1,154 @@
+from datetime import date
+from flask import Blueprint, request, jsonify
+from database import get_product_by_id, get_products, get_user_rentals
+from auth_tokens import current_user, login_required
+from catalog_snapshot import current_snapshot
+from rentals import current_index, book, cancel, parse_date, RENTAL_MAX_DAYS, AVAILABILITY_MAX_DAYS
+
+rentals_bp = Blueprint('rentals', __name__)
+
+# 테마 단위 가용성 조회 결과 필드와 개수
+AVAILABLE_FIELDS = ('id', 'name', 'code', 'rent_price', 'theme', 'category', 'thumbnail')
+AVAILABLE_DEFAULT_LIMIT = 60
+AVAILABLE_MAX_LIMIT = 200
+
+def _date_range(data):
+    """from/to 를 검사해 (start, end) date 를 돌려준다. 양 끝 포함."""
+    try:
+        start = parse_date(data.get('from'))
+        end = parse_date(data.get('to'))
+    except ValueError:
+        raise ValueError('from 과 to 는 YYYY-MM-DD 형식이어야 합니다.')
+    if end < start:
+        raise ValueError('to 는 from 이후여야 합니다.')
+    if start < date.today():
+        raise ValueError('지난 날짜는 조회하거나 예약할 수 없습니다.')
+    return start, end
+
+def _product(product_id):
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        record = snapshot.by_id.get(product_id)
+        return record.as_dict() if record else None
+    return get_product_by_id(product_id)
+
+def _rental_json(rental):
+    return {
+        'id': rental['id'],
+        'product_id': rental['product_id'],
+        'from': rental['start_date'],
+        'to': rental['end_date'],
+        'status': rental['status'],
+    }
+
+@rentals_bp.route('/api/product/<int:product_id>/availability')
+def product_availability(product_id):
+    try:
+        start, end = _date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if (end - start).days >= AVAILABILITY_MAX_DAYS:
+        return jsonify({'error': f'조회 기간은 최대 {AVAILABILITY_MAX_DAYS}일입니다.'}), 400
+    if _product(product_id) is None:
+        return jsonify({'error': 'Product not found'}), 404
+
+    index = current_index()
+    booked = index.booked(product_id, start, end)
+    response = jsonify({
+        'product_id': product_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'available': not booked,
+        'booked': [{'from': s.isoformat(), 'to': e.isoformat()} for s, e in booked],
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@rentals_bp.route('/api/rentals/availability')
+def theme_availability():
+    # 예: ?theme=traditional&category=hairpin&from=2026-10-24&to=2026-10-25
+    try:
+        start, end = _date_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if (end - start).days >= AVAILABILITY_MAX_DAYS:
+        return jsonify({'error': f'조회 기간은 최대 {AVAILABILITY_MAX_DAYS}일입니다.'}), 400
+    theme = request.args.get('theme')
+    category = request.args.get('category')
+    if category == 'all':
+        category = None
+    sort = request.args.get('sort', 'id')
+    limit = request.args.get('limit', AVAILABLE_DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= AVAILABLE_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {AVAILABLE_MAX_LIMIT}'}), 400
+
+    # 후보 제품 목록은 스냅샷(없으면 DB)에서, 예약 여부는 색인에서 제품당 O(log n) 으로 확인
+    try:
+        snapshot = current_snapshot()
+        result = snapshot.products_page(theme, category, sort) if snapshot is not None else None
+        if result is not None:
+            records = {r.id: r for r in result[0]}
+            to_json = lambda i: records[i].as_dict(AVAILABLE_FIELDS)
+        else:
+            records = {p['id']: p for p in get_products(theme=theme, category=category, sort=sort,
+                                                          fields=AVAILABLE_FIELDS)}
+            to_json = records.__getitem__
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    available = current_index().available(records, start, end)
+    response = jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'total': len(available),
+        'products': [to_json(i) for i in available[:limit]],
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@rentals_bp.route('/api/rentals')
+@login_required
+def my_rentals():
+    rentals = get_user_rentals(current_user()['user_id'])
+    return jsonify({'rentals': [_rental_json(r) for r in rentals]})
+
+@rentals_bp.route('/api/rentals', methods=['POST'])
+@login_required
+def create_rental():
+    data = request.get_json(silent=True) or {}
+    try:
+        product_id = int(data.get('product_id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'product_id 를 확인해주세요.'}), 400
+    try:
+        start, end = _date_range(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if (end - start).days >= RENTAL_MAX_DAYS:
+        return jsonify({'error': f'대여 기간은 최대 {RENTAL_MAX_DAYS}일입니다.'}), 400
+
+    product = _product(product_id)
+    if product is None:
+        return jsonify({'error': 'Product not found'}), 404
+    if not product['rent_price']:
+        return jsonify({'error': '대여할 수 없는 제품입니다.'}), 400
+
+    user_id = current_user()['user_id']
+    rental_id = book(product_id, user_id, start, end)
+    if rental_id is None:
+        return jsonify({'error': '이미 예약된 기간입니다.'}), 409
+    return jsonify({'rental': {
+        'id': rental_id,
+        'product_id': product_id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'status': 'reserved',
+    }}), 201
+
+@rentals_bp.route('/api/rentals/<int:rental_id>', methods=['DELETE'])
+@login_required
+def cancel_rental(rental_id):
+    rental = cancel(rental_id, current_user()['user_id'])
+    if rental is None:
+        return jsonify({'error': '예약을 찾을 수 없습니다.'}), 404
+    return jsonify({'rental': _rental_json(rental)})
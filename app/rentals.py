@@ -0,0 +1,210 @@
+"""
+대여 예약 가용성 색인
+
+다가오는 예약을 제품별로 시작일 순 정렬 배열(array) 세 개에 담는다.
+  starts   : 시작일 (날짜 서수, date.toordinal)
+  ends     : 종료일 (양 끝 포함)
+  max_ends : ends 의 앞에서부터 누적 최댓값
+[from, to] 와 겹치는 예약이 있는지는 "시작일이 to 이하인 예약 중 가장 늦은 종료일이 from 이상인가" 이므로
+bisect 한 번과 배열 조회 한 번, 즉 제품당 O(log n) 으로 답한다 (예약 전체를 훑지 않는다).
+테마/카테고리 단위 조회는 카탈로그 스냅샷의 제품 목록에 이 검사를 제품마다 적용한다.
+
+읽는 쪽은 잠그지 않는다. 예약이 바뀌면 그 제품의 배열을 새로 만들어 dict 항목을 통째로 교체한다.
+실제로 겹치지 않게 보장하는 것은 DB 트랜잭션(database.create_rental)이고 색인은 조회용이다.
+다른 프로세스가 만든 예약은 INDEX_MAX_AGE 마다 백그라운드에서 다시 읽어 반영한다.
+"""
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from itertools import accumulate, groupby
+from operator import itemgetter
+
+import database
+from catalog_cache import TTL_SECONDS
+
+RENTAL_MAX_DAYS = 14          # 한 번에 빌릴 수 있는 최대 일수
+AVAILABILITY_MAX_DAYS = 180   # 가용성 조회 기간 상한
+INDEX_MAX_AGE = TTL_SECONDS
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' -> date. 형식이 틀리면 ValueError."""
+    if not isinstance(value, str) or len(value) != 10:
+        raise ValueError(f'Invalid date: {value!r}')
+    return date.fromisoformat(value)
+
+
+class ProductBookings:
+    """한 제품의 예약 (만든 뒤 바꾸지 않는다)"""
+    __slots__ = ('starts', 'ends', 'max_ends', 'ids')
+
+    def __init__(self, starts=(), ends=(), ids=()):
+        # 시작일 순으로 정렬된 같은 길이의 시작일/종료일/예약 id
+        self.starts = array('i', starts)
+        self.ends = array('i', ends)
+        self.max_ends = array('i', accumulate(self.ends, max))
+        self.ids = array('q', ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def overlaps(self, start, end):
+        i = bisect_right(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] >= start
+
+    def booked(self, start, end):
+        """[start, end] 와 겹치는 (start, end) 목록"""
+        i = bisect_right(self.starts, end)
+        # max_ends 는 단조 증가하므로 여기보다 앞의 예약은 모두 start 전에 끝난다
+        j = bisect_left(self.max_ends, start, 0, i)
+        return [(self.starts[k], self.ends[k]) for k in range(j, i) if self.ends[k] >= start]
+
+    def with_booking(self, start, end, rental_id):
+        if rental_id in self.ids:
+            return self
+        bookings = list(zip(self.starts, self.ends, self.ids))
+        bookings.insert(bisect_right(self.starts, start), (start, end, rental_id))
+        return ProductBookings(*zip(*bookings))
+
+    def without_booking(self, rental_id):
+        bookings = [b for b in zip(self.starts, self.ends, self.ids) if b[2] != rental_id]
+        return ProductBookings(*zip(*bookings)) if bookings else _EMPTY
+
+
+_EMPTY = ProductBookings()
+
+
+class RentalIndex:
+    def __init__(self, rows, since):
+        # rows: (product_id, 시작일, 종료일, id) — 날짜는 서수, product_id 와 시작일 순으로 정렬
+        # since: 이 날짜 이전에 끝난 예약은 들어 있지 않다
+        self.since = since
+        self.built_at = time.monotonic()
+        self._products = {}
+        for product_id, group in groupby(rows, itemgetter(0)):
+            _, starts, ends, ids = zip(*group)
+            self._products[product_id] = ProductBookings(starts, ends, ids)
+
+    def __len__(self):
+        return sum(len(b) for b in self._products.values())
+
+    def is_available(self, product_id, start, end):
+        """start, end 는 date (양 끝 포함)"""
+        bookings = self._products.get(product_id)
+        return bookings is None or not bookings.overlaps(start.toordinal(), end.toordinal())
+
+    def booked(self, product_id, start, end):
+        bookings = self._products.get(product_id, _EMPTY)
+        return [(date.fromordinal(s), date.fromordinal(e))
+                for s, e in bookings.booked(start.toordinal(), end.toordinal())]
+
+    def available(self, product_ids, start, end):
+        """product_ids 중 [start, end] 동안 예약이 없는 것 (순서 유지)"""
+        start, end = start.toordinal(), end.toordinal()
+        products = self._products
+        return [i for i in product_ids if i not in products or not products[i].overlaps(start, end)]
+
+    def add(self, product_id, start_date, end_date, rental_id):
+        bookings = self._products.get(product_id, _EMPTY)
+        self._products[product_id] = bookings.with_booking(
+            parse_date(start_date).toordinal(), parse_date(end_date).toordinal(), rental_id)
+
+    def remove(self, product_id, rental_id):
+        bookings = self._products.get(product_id)
+        if bookings is not None:
+            self._products[product_id] = bookings.without_booking(rental_id)
+
+
+def load_index():
+    """DB 에서 다가오는 예약을 읽어 새 색인을 만든다."""
+    # 시간대 차이로 오늘 날짜가 하루 어긋나도 빠지지 않게 하루 여유를 둔다
+    since = date.today() - timedelta(days=1)
+    return RentalIndex(database.get_upcoming_rentals(since.isoformat()), since)
+
+
+_index = None
+_build_lock = threading.Lock()
+_changes_lock = threading.Lock()
+# 마지막 색인 생성을 시작한 뒤 이 프로세스에서 바뀐 예약 (새 색인에 다시 적용한다)
+_changes = []
+
+
+def _apply(index, change):
+    op, product_id, start_date, end_date, rental_id = change
+    if op == 'add':
+        index.add(product_id, start_date, end_date, rental_id)
+    else:
+        index.remove(product_id, rental_id)
+
+
+def refresh_index(blocking=True):
+    """색인을 새로 만들어 교체한다. blocking=False 면 이미 만드는 중일 때 기다리지 않고 None."""
+    global _index
+    if not _build_lock.acquire(blocking=blocking):
+        return None
+    try:
+        with _changes_lock:
+            mark = len(_changes)
+        index = load_index()
+        with _changes_lock:
+            # DB 를 읽는 동안 커밋된 이 프로세스의 변경은 읽었을 수도, 못 읽었을 수도 있으므로 다시 적용
+            for change in _changes[mark:]:
+                _apply(index, change)
+            _changes.clear()
+            _index = index
+        return index
+    finally:
+        _build_lock.release()
+
+
+def warm_index():
+    """시작할 때 호출. 테이블이 아직 없으면 첫 조회 때 만든다."""
+    try:
+        refresh_index()
+    except sqlite3.Error:
+        pass
+
+
+def _refresh_in_background():
+    if _build_lock.locked():
+        return
+    threading.Thread(target=refresh_index, args=(False,), name='rental-index', daemon=True).start()
+
+
+def current_index():
+    index = _index
+    if index is None:
+        index = refresh_index()
+        return index if index is not None else _index
+    if time.monotonic() - index.built_at > INDEX_MAX_AGE or index.since < date.today() - timedelta(days=1):
+        index.built_at = time.monotonic()  # 백그라운드 재생성을 한 번만 시작
+        _refresh_in_background()
+    return index
+
+
+def _record(change):
+    with _changes_lock:
+        if _index is not None:
+            _apply(_index, change)
+        if _build_lock.locked():
+            _changes.append(change)
+
+
+def book(product_id, user_id, start, end):
+    """예약을 만들고 id 를 돌려준다. 겹치는 예약이 있으면 None."""
+    # 다른 프로세스의 취소가 색인에 아직 없을 수 있으므로 판단은 DB 에서 한다
+    rental_id = database.create_rental(product_id, user_id, start.isoformat(), end.isoformat())
+    if rental_id is not None:
+        _record(('add', product_id, start.isoformat(), end.isoformat(), rental_id))
+    return rental_id
+
+
+def cancel(rental_id, user_id):
+    """본인 예약을 취소하고 취소한 예약 dict 를 돌려준다. 없으면 None."""
+    rental = database.cancel_rental(rental_id, user_id)
+    if rental is not None:
+        _record(('remove', rental['product_id'], rental['start_date'], rental['end_date'], rental_id))
+    return rental
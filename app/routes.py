@@ -1,5 +1,31 @@
-from flask import render_template, jsonify, request
-from database import get_products, get_product_by_id
+import base64
+import json
+import os
+from flask import render_template, jsonify, request, current_app
+from markupsafe import Markup
+from database import get_products_page, get_product_by_id, get_products_by_ids, search_products
+from catalog_cache import catalog_cache, fragment_cache
+from catalog_snapshot import current_snapshot
+import compression
+import fast_json
+import related
+
+BATCH_MAX_IDS = 100
+DEFAULT_PAGE_SIZE = 60
+MAX_PAGE_SIZE = 200
+SEARCH_MAX_RESULTS = 50
+
+# 서버 사이드 렌더링 (MUSEME_SSR=0 이면 빈 틀만 내려주고 JS 가 API 로 채운다)
+SSR_ENABLED = os.environ.get('MUSEME_SSR', '1') != '0'
+SSR_PAGE_SIZE = 120  # 첫 화면에 그리는 제품 수, 나머지는 JS 가 커서로 이어 받는다
+LISTING_FIELDS = ('id', 'name', 'code', 'buy_price', 'category', 'thumbnail')
+RELATED_FIELDS = ('id', 'name', 'code', 'buy_price', 'rent_price', 'theme', 'category', 'thumbnail')
+DEFAULT_RELATED_LIMIT = 8
+
+# 엔드포인트별 Cache-Control 정책
+PRODUCT_LIST_CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+PRODUCT_DETAIL_CACHE_CONTROL = 'public, max-age=300, stale-while-revalidate=600'
+SEARCH_CACHE_CONTROL = 'public, max-age=30'
 
 THEME_NAMES = {
     'traditional': '전통',
@@ -10,6 +36,123 @@ THEME_NAMES = {
     'country': '국가별'
 }
 
+CATEGORY_NAMES = {
+    'all': '전체',
+    'earring': '귀걸이',
+    'necklace': '목걸이',
+    'ring': '반지',
+    'bracelet': '팔찌',
+    'hairpin': '머리장식',
+    'etc': '기타'
+}
+
+def _encode_json(data):
+    # 캐시에 바이트로 저장 (orjson 이 있으면 orjson, 없으면 jsonify 와 같은 형식)
+    return fast_json.encode(data)
+
+def _json_bytes_response(body, status=200):
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+def encode_cursor(after):
+    if after is None:
+        return None
+    raw = json.dumps(after, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, product_id = json.loads(raw)
+        if not isinstance(value, (int, float, str)):
+            raise TypeError(value)
+        return value, int(product_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def parse_listing_args(args):
+    # /api/products 쿼리 파라미터 해석, 잘못된 값은 ValueError
+    limit = args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    fields = args.get('fields')
+    fields = tuple(f.strip() for f in fields.split(',') if f.strip()) if fields else None
+    return {
+        'sort': args.get('sort', 'id'),
+        'fields': fields,
+        'limit': limit,
+        'after': decode_cursor(args.get('after')),
+    }
+
+def listing_cache_key(theme, category, listing):
+    return ('products', theme, category, listing['sort'], listing['fields'],
+            listing['limit'], listing['after'])
+
+def _conditional_response(body, cache_control, etag=None, last_modified=None, variants=None):
+    # If-None-Match / If-Modified-Since 가 맞으면 304 로 바뀐다
+    encoding = compression.negotiate(request.headers.get('Accept-Encoding'), len(body))
+    response = _json_bytes_response(compression.encoded_body(body, encoding, variants))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if compression.varies(len(body)):
+        response.vary.add('Accept-Encoding')
+    if etag:
+        response.set_etag(compression.variant_etag(etag, encoding))
+    else:
+        response.add_etag()  # 보내는 (압축된) 본문의 해시
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+def _cached_response(entry, cache_control):
+    return _conditional_response(entry.body, cache_control, entry.etag, entry.last_modified, entry.variants)
+
+def _listing_page(theme, category, fields, limit):
+    # SSR 용 목록: 스냅샷이 있으면 메모리에서, 없으면 DB 에서
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        result = snapshot.products_page(theme, category, fields=fields, limit=limit)
+        if result is not None:
+            rows, next_after, _ = result
+            return [r.as_dict(fields) for r in rows], next_after
+    return get_products_page(theme=theme, category=category, fields=fields, limit=limit)
+
+def _product_detail(product_id):
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        record = snapshot.by_id.get(product_id)
+        return record.as_dict(record.__slots__) if record else None
+    return get_product_by_id(product_id)
+
+def _related_products(ids):
+    # 색인의 id 순서 그대로, 그 사이 삭제된 제품은 뺀다
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        records = (snapshot.by_id.get(i) for i in ids)
+        return [r.as_dict(RELATED_FIELDS) for r in records if r is not None]
+    return [{f: p[f] for f in RELATED_FIELDS} for p in get_products_by_ids(ids)]
+
+def _render_fragment(key, template, loader):
+    """
+    loader() 가 준 컨텍스트로 template 을 그려 카탈로그 버전별로 캐시한다.
+    SSR 이 꺼져 있으면 빈 컨텍스트로 그려 JS 가 채우게 한다.
+    """
+    if not SSR_ENABLED:
+        return Markup(render_template(template))
+
+    def load():
+        context = loader()
+        if context is None:
+            return None
+        return render_template(template, **context).encode('utf-8')
+
+    entry = fragment_cache.get_or_set(key, load)
+    if entry is None:
+        return Markup(render_template(template))
+    return Markup(entry.body.decode('utf-8'))
+
 def register_routes(app):
 
     @app.route('/')
@@ -19,14 +162,37 @@ def register_routes(app):
     @app.route('/products/<theme>')
     def products(theme):
         theme_name = THEME_NAMES.get(theme, theme)
+        category = request.args.get('category', 'all')
+        if category not in CATEGORY_NAMES:
+            category = 'all'
+
+        def load():
+            products, next_after = _listing_page(
+                theme, None if category == 'all' else category, LISTING_FIELDS, SSR_PAGE_SIZE)
+            initial = {'category': category, 'products': products,
+                       'next_cursor': encode_cursor(next_after)}
+            return {'products': products, 'initial': initial}
+
+        gallery = _render_fragment(('products-html', theme, category),
+                                   'components/product-grid.html', load)
         return render_template('pages/products.html',
                              theme=theme,
-                             theme_name=theme_name)
+                             theme_name=theme_name,
+                             category=category,
+                             categories=CATEGORY_NAMES,
+                             gallery=gallery)
 
     @app.route('/product/<int:product_id>')
     def product_detail(product_id):
+        def load():
+            product = _product_detail(product_id)
+            return {'product': product} if product else None
+
+        content = _render_fragment(('product-html', product_id),
+                                   'components/product-detail-content.html', load)
         return render_template('pages/product-detail.html',
-                             product_id=product_id)
+                             product_id=product_id,
+                             content=content)
 
     @app.route('/about')
     def about():
@@ -45,12 +211,107 @@ def register_routes(app):
     def api_products():
         theme = request.args.get('theme')
         category = request.args.get('category')
-        products = get_products(theme=theme, category=category)
-        return jsonify({'products': products})
+        if category == 'all':
+            category = None
+        try:
+            listing = parse_listing_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        def load():
+            # 스냅샷이 있으면 미리 인코딩한 JSON 을 이어 붙이기만 한다 (SQL 없음)
+            snapshot = current_snapshot()
+            if snapshot is not None:
+                body = snapshot.listing_json(theme, category, cursor_encoder=encode_cursor, **listing)
+                if body is not None:
+                    return body
+            products, next_after = get_products_page(theme=theme, category=category, **listing)
+            return _encode_json({'products': products, 'next_cursor': encode_cursor(next_after)})
+
+        key = listing_cache_key(theme, category, listing)
+        try:
+            entry = catalog_cache.get_or_set(key, load)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return _cached_response(entry, PRODUCT_LIST_CACHE_CONTROL)
+
+    @app.route('/api/products/search')
+    def api_products_search():
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': '검색어를 입력해주세요.'}), 400
+        limit = request.args.get('limit', 20, type=int)
+        if not 1 <= limit <= SEARCH_MAX_RESULTS:
+            return jsonify({'error': f'limit must be between 1 and {SEARCH_MAX_RESULTS}'}), 400
+
+        products = search_products(
+            query,
+            theme=request.args.get('theme'),
+            category=request.args.get('category'),
+            min_price=request.args.get('min_price', type=int),
+            max_price=request.args.get('max_price', type=int),
+            limit=limit,
+        )
+        body = _encode_json({'query': query, 'products': products})
+        return _conditional_response(body, SEARCH_CACHE_CONTROL)
+
+    @app.route('/api/products/batch')
+    def api_products_batch():
+        # ?ids=1,2,3 형식, 이미지까지 포함해 한 번에 조회
+        try:
+            ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return jsonify({'error': 'Invalid ids'}), 400
+        if len(ids) > BATCH_MAX_IDS:
+            return jsonify({'error': f'Too many ids (max {BATCH_MAX_IDS})'}), 400
+        body = _encode_json({'products': get_products_by_ids(ids)})
+        return _conditional_response(body, PRODUCT_LIST_CACHE_CONTROL)
 
     @app.route('/api/product/<int:product_id>')
     def api_product(product_id):
-        product = get_product_by_id(product_id)
-        if not product:
+        def load():
+            snapshot = current_snapshot()
+            if snapshot is not None:
+                return snapshot.detail_json(product_id)
+            product = get_product_by_id(product_id)
+            return _encode_json(product) if product else None
+
+        entry = catalog_cache.get_or_set(('product', product_id), load)
+        if entry is None:
+            return jsonify({'error': 'Product not found'}), 404
+        return _cached_response(entry, PRODUCT_DETAIL_CACHE_CONTROL)
+
+    @app.route('/api/product/<int:product_id>/related')
+    def api_product_related(product_id):
+        limit = request.args.get('limit', DEFAULT_RELATED_LIMIT, type=int)
+        if not 1 <= limit <= related.RELATED_K:
+            return jsonify({'error': f'limit must be between 1 and {related.RELATED_K}'}), 400
+        index = related.current_index()
+        if index is None:
+            # 첫 색인을 만드는 중 (저장된 색인이 없을 때만)
+            response = jsonify({'error': 'Related index is being built'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+
+        def load():
+            ids = index.related(product_id, limit)
+            if ids is None:
+                # 색인 이후에 추가된 제품이면 빈 목록, 없는 제품이면 404
+                if _product_detail(product_id) is None:
+                    return None
+                ids = []
+            return _encode_json({'product_id': product_id, 'products': _related_products(ids)})
+
+        entry = catalog_cache.get_or_set(('related', index.generation, product_id, limit), load)
+        if entry is None:
             return jsonify({'error': 'Product not found'}), 404
-        return jsonify(product)
+        return _cached_response(entry, PRODUCT_LIST_CACHE_CONTROL)
+
+    @app.route('/api/cache/stats')
+    def api_cache_stats():
+        stats = catalog_cache.stats()
+        stats['fragments'] = fragment_cache.stats()
+        response = jsonify(stats)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
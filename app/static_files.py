@@ -0,0 +1,283 @@
+"""
+정적 파일 고속 서빙
+
+Flask 기본 static 뷰는 요청마다 stat 과 open 을 다시 한다. 여기서는
+  - 경로별 stat 결과(크기, mtime, ETag)를 LRU 에 두고 REVALIDATE_INTERVAL 마다만 다시 stat 한다
+  - 작은 파일은 본문까지 메모리에 둔다
+  - 큰 파일은 열린 fd 를 LRU 에 두고 Range 응답(과 wsgi.file_wrapper 가 없는 서버의 전체 응답)을 pread 로 보낸다
+  - wsgi.file_wrapper 가 있으면 전체 응답은 파일을 새로 열어 넘긴다 (gunicorn 등에서는 os.sendfile 로 복사 없이).
+    sendfile 은 파일 오프셋을 쓰므로 공유 fd 를 넘길 수 없다
+  - max_age 가 없으면 Flask 기본 static 뷰처럼 Cache-Control: no-cache 를 보낸다 (배포 뒤 매번 재검증)
+  - Range / If-Range / If-None-Match / If-Modified-Since 를 처리한다
+MUSEME_STATIC_FAST=0 이면 기존 Flask static 뷰를 그대로 쓴다.
+"""
+import mimetypes
+import os
+import stat as stat_module
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from werkzeug.exceptions import NotFound
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from metrics import register_cache
+
+STATIC_FAST_ENABLED = os.environ.get('MUSEME_STATIC_FAST', '1') != '0'
+
+MAX_ENTRIES = 512
+SMALL_FILE_MAX = 256 * 1024          # 이하이면 본문을 메모리에 둔다
+MEMORY_MAX_BYTES = 64 * 1024 * 1024  # 메모리에 둔 본문 합계 상한
+MAX_OPEN_FILES = 128                 # 열어 두는 큰 파일 fd 상한
+REVALIDATE_INTERVAL = 2.0            # 초
+CHUNK_SIZE = 256 * 1024
+
+
+class FileEntry:
+    __slots__ = ('path', 'size', 'mtime_ns', 'etag', 'last_modified', 'mimetype',
+                 'body', 'fd', 'checked_at')
+
+    def __init__(self, path, stat):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        self.last_modified = int(stat.st_mtime)
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.body = None
+        self.fd = None
+        self.checked_at = time.monotonic()
+
+    def matches(self, stat):
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class _PreadStream:
+    """공유 fd 를 dup 해 pread 로 읽는다. pread 는 파일 오프셋을 건드리지 않아 동시에 써도 안전하다."""
+
+    def __init__(self, fd, start, length):
+        self.fd = os.dup(fd)
+        self.offset = start
+        self.remaining = length
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = os.pread(self.fd, min(CHUNK_SIZE, self.remaining), self.offset)
+            if not chunk:
+                break
+            self.offset += len(chunk)
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class StaticFileCache:
+    def __init__(self, max_entries=MAX_ENTRIES, memory_max=MEMORY_MAX_BYTES,
+                 max_open_files=MAX_OPEN_FILES, revalidate_interval=REVALIDATE_INTERVAL):
+        self.max_entries = max_entries
+        self.memory_max = memory_max
+        self.max_open_files = max_open_files
+        self.revalidate_interval = revalidate_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory = 0
+        self._open_files = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, path, stat):
+        entry = FileEntry(path, stat)
+        if entry.size <= SMALL_FILE_MAX and self._memory + entry.size <= self.memory_max:
+            with open(path, 'rb') as f:
+                entry.body = f.read()
+        else:
+            entry.fd = os.open(path, os.O_RDONLY)
+        return entry
+
+    def _drop(self, path):
+        entry = self._entries.pop(path)
+        if entry.body is not None:
+            self._memory -= entry.size
+        if entry.fd is not None:
+            self._open_files -= 1
+        entry.close()
+
+    def _store(self, entry):
+        self._entries[entry.path] = entry
+        if entry.body is not None:
+            self._memory += entry.size
+        if entry.fd is not None:
+            self._open_files += 1
+        while (len(self._entries) > self.max_entries or self._open_files > self.max_open_files
+               or self._memory > self.memory_max):
+            self._drop(next(iter(self._entries)))
+
+    def get(self, path):
+        """path 의 FileEntry. 없으면 None. 반환된 entry.fd 는 lock 밖에서 바로 쓰지 말고 open_stream 을 쓴다."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry.checked_at < self.revalidate_interval:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and stat is not None and entry.matches(stat):
+                entry.checked_at = now
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._drop(path)
+            self.misses += 1
+            if stat is None or not stat_module.S_ISREG(stat.st_mode):
+                return None
+            try:
+                entry = self._load(path, stat)
+            except OSError:
+                return None
+            self._store(entry)
+            return entry
+
+    def open_stream(self, entry, start, length):
+        # 동시에 LRU 에서 밀려나 fd 가 닫히는 것을 막기 위해 lock 안에서 dup 한다
+        with self._lock:
+            if entry.fd is not None:
+                return _PreadStream(entry.fd, start, length)
+        fd = os.open(entry.path, os.O_RDONLY)
+        try:
+            return _PreadStream(fd, start, length)
+        finally:
+            os.close(fd)
+
+    def clear(self):
+        with self._lock:
+            for path in list(self._entries):
+                self._drop(path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_bytes': self._memory,
+                'open_files': self._open_files,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+static_cache = StaticFileCache()
+register_cache('static_files', static_cache.stats)
+
+
+def is_not_modified(entry, if_none_match, if_modified_since):
+    """If-None-Match / If-Modified-Since 헤더 원문으로 304 여부를 판단한다 (ASGI 경로와 공유)."""
+    if if_none_match:
+        return parse_etags(if_none_match).contains(entry.etag)
+    since = parse_date(if_modified_since) if if_modified_since else None
+    return since is not None and entry.last_modified <= since.timestamp()
+
+
+def entry_headers(entry, max_age=None):
+    headers = {
+        'ETag': quote_etag(entry.etag),
+        'Last-Modified': http_date(entry.last_modified),
+        'Accept-Ranges': 'bytes',
+    }
+    if max_age is not None:
+        headers['Cache-Control'] = f'public, max-age={max_age}'
+    else:
+        # Werkzeug send_file 과 같이, 버전 없는 파일을 브라우저가 추측으로 캐시하지 않게 한다
+        headers['Cache-Control'] = 'no-cache'
+    return headers
+
+
+def _requested_range(entry):
+    """(start, stop) 또는 None. 만족할 수 없는 범위면 False."""
+    if request.range is None or request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        # ETag 또는 날짜가 현재 파일과 다르면 전체를 보낸다
+        date = parse_date(if_range)
+        if date is not None:
+            if int(date.timestamp()) != entry.last_modified:
+                return None
+        elif if_range.strip() != quote_etag(entry.etag):
+            return None
+    byte_range = request.range.range_for_length(entry.size)
+    if byte_range is None:
+        return False
+    return byte_range
+
+
+def send_static_file(root, filename, max_age=None):
+    path = safe_join(root, filename)
+    if path is None:
+        raise NotFound()
+    entry = static_cache.get(path)
+    if entry is None:
+        raise NotFound()
+
+    headers = entry_headers(entry, max_age)
+    if is_not_modified(entry, request.headers.get('If-None-Match'),
+                       request.headers.get('If-Modified-Since')):
+        return Response(status=304, headers=headers)
+
+    byte_range = _requested_range(entry)
+    if byte_range is False:
+        headers['Content-Range'] = f'bytes */{entry.size}'
+        return Response(status=416, headers=headers)
+
+    if byte_range is not None:
+        start, stop = byte_range
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{entry.size}'
+        status = 206
+    else:
+        start, stop = 0, entry.size
+        status = 200
+    headers['Content-Length'] = str(stop - start)
+
+    if entry.body is not None:
+        body = entry.body if status == 200 else entry.body[start:stop]
+        return Response(body, status=status, headers=headers, mimetype=entry.mimetype)
+
+    if status == 200 and 'wsgi.file_wrapper' in request.environ:
+        # 공유 fd 는 오프셋 기반 sendfile 과 함께 쓸 수 없어 전체 응답은 파일을 새로 연다
+        stream = wrap_file(request.environ, open(entry.path, 'rb'), CHUNK_SIZE)
+    else:
+        stream = static_cache.open_stream(entry, start, stop - start)
+    return Response(stream, status=status, headers=headers, mimetype=entry.mimetype,
+                    direct_passthrough=True)
+
+
+def register_static_files(app):
+    """app 의 static 뷰를 캐시를 쓰는 뷰로 바꾼다 (create_app 에서 호출)."""
+    if not STATIC_FAST_ENABLED or app.static_folder is None:
+        return
+
+    def serve_static(filename):
+        max_age = current_app.get_send_file_max_age(filename)
+        return send_static_file(app.static_folder, filename, max_age=max_age)
+
+    app.view_functions['static'] = serve_static
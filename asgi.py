@@ -0,0 +1,26 @@
+"""
+ASGI 진입점 (wsgi.py 와 같은 앱을 비동기 서버에서 실행)
+
+실행 예: uvicorn asgi:application --host 0.0.0.0 --port 5001
+"""
+import sys
+import os
+
+# 프로젝트 경로 설정
+project_home = os.path.dirname(os.path.abspath(__file__))
+if project_home not in sys.path:
+    sys.path.insert(0, project_home)
+
+# app 폴더를 경로에 추가
+app_path = os.path.join(project_home, 'app')
+if app_path not in sys.path:
+    sys.path.insert(0, app_path)
+
+# 스키마 마이그레이션 (최신이고 인덱스가 모두 있으면 확인만 하고 넘어간다)
+from migrations import migrate
+migrate()
+
+# Flask 앱을 감싼 ASGI 앱
+from main import create_app
+from asgi_app import create_asgi_app
+application = create_asgi_app(create_app())
@@ -0,0 +1,121 @@
+"""벤치마크 공용 도우미: 경로 설정과 임시 데이터베이스 준비"""
+import json
+import os
+import random
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(BASE_DIR, 'app')
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import database
+import init_db
+from catalog_cache import bump_catalog_version
+
+
+def use_temp_database():
+    """임시 DB 파일을 만들어 database/init_db 모듈이 바라보게 한다."""
+    fd, path = tempfile.mkstemp(prefix='museme-bench-', suffix='.db')
+    os.close(fd)
+    os.unlink(path)
+    use_database(path)
+    return path
+
+
+def use_database(path):
+    """이미 준비된 DB 파일을 바라보게 한다 (벤치마크 서버 하위 프로세스용)."""
+    database.DATABASE = path
+    init_db.DATABASE = path
+    database.close_db()
+
+
+def remove_database(path):
+    database.close_db()
+    for suffix in ('', '-wal', '-shm', '-related.idx'):
+        try:
+            os.unlink(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+THEMES = ('traditional', 'daily', 'party', 'princess', 'idol', 'country')
+CATEGORIES = ('earring', 'necklace', 'ring', 'bracelet', 'hairpin', 'etc')
+THEME_NAMES_KR = {'traditional': '전통', 'daily': '데일리', 'party': '파티',
+                  'princess': '공주왕자', 'idol': '아이돌', 'country': '국가별'}
+CATEGORY_NAMES_KR = {'earring': '귀걸이', 'necklace': '목걸이', 'ring': '반지',
+                     'bracelet': '팔찌', 'hairpin': '머리장식', 'etc': '기타'}
+STYLE_WORDS = ('클래식', '모던', '빈티지', '러블리', '시크', '우아한', '심플', '화려한')
+MATERIALS = ('실버 925', '스테인리스', '실버 925, 진주', '실버 925, 큐빅', '골드 14K', '실버 925, 비취')
+
+
+def synthetic_products(count, seed=42):
+    """(name, code, material, buy_price, rent_price, theme, category, thumbnail, description) 튜플을 만든다."""
+    rng = random.Random(seed)
+    for i in range(count):
+        theme = rng.choice(THEMES)
+        category = rng.choice(CATEGORIES)
+        buy_price = rng.randrange(20, 500) * 1000
+        yield (
+            f'{rng.choice(STYLE_WORDS)} {THEME_NAMES_KR[theme]} {CATEGORY_NAMES_KR[category]} {i}',
+            f'SYN-{i:07d}',
+            rng.choice(MATERIALS),
+            buy_price,
+            buy_price // 5,
+            theme,
+            category,
+            f'/static/images/products/{theme}/{category}/{i}.png',
+            f'{rng.choice(STYLE_WORDS)} 느낌의 {CATEGORY_NAMES_KR[category]}입니다. 합성 데이터 {i}',
+        )
+
+
+def seed_catalog(count, batch_size=10000):
+    """products 와 product_images(상세/착용샷 각 1장)에 합성 카탈로그를 넣는다."""
+    with database.get_db() as conn:
+        rows = []
+        for row in synthetic_products(count):
+            rows.append(row)
+            if len(rows) >= batch_size:
+                _insert_batch(conn, rows)
+                rows = []
+        if rows:
+            _insert_batch(conn, rows)
+        conn.execute('ANALYZE')
+        conn.commit()
+    bump_catalog_version()
+
+
+def _insert_batch(conn, rows):
+    conn.executemany(
+        'INSERT INTO products (name, code, material, buy_price, rent_price, theme, '
+        'category, thumbnail, description) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        rows,
+    )
+    codes = [row[1] for row in rows]
+    ids = conn.execute(
+        'SELECT id, thumbnail FROM products WHERE code IN (SELECT value FROM json_each(?))',
+        (json.dumps(codes),),
+    ).fetchall()
+    images = []
+    for product_id, thumbnail in ids:
+        base = thumbnail.rsplit('.', 1)[0]
+        images.append((product_id, f'{base}-detail.png', 'detail'))
+        images.append((product_id, f'{base}-wear.png', 'wear'))
+    conn.executemany(
+        'INSERT INTO product_images (product_id, image_url, image_type) VALUES (?, ?, ?)',
+        images,
+    )
+    conn.commit()
+
+
+def seed_users(count, password, prefix='bench-user'):
+    """같은 비밀번호를 쓰는 사용자 count 명을 만들고 이메일 목록을 돌려준다 (해시는 한 번만 계산)."""
+    from passwords import hash_password
+    password_hash = hash_password(password)
+    emails = [f'{prefix}-{i}@example.com' for i in range(count)]
+    with database.get_db() as conn:
+        conn.executemany('INSERT INTO users (email, password_hash) VALUES (?, ?)',
+                         [(email, password_hash) for email in emails])
+        conn.commit()
+    return emails
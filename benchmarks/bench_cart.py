@@ -0,0 +1,105 @@
+"""
+동시 장바구니 변경 처리량: 변경마다 SQLite 트랜잭션 vs cart.py 의 write-behind
+
+여러 스레드가 여러 사용자의 장바구니에 담기/수량 변경을 동시에 보낼 때의 처리량과 지연시간을 잰다.
+  direct      : 변경마다 apply_cart_changes 로 바로 커밋 (SQLite 쓰기 잠금을 차례로 기다린다)
+  write-behind: 메모리 상태 + 저널 append, 백그라운드에서 모아서 커밋
+
+WAL + synchronous=NORMAL(기본값)에서는 커밋에 fsync 가 없어 direct 도 빠르다.
+--synchronous FULL 로 커밋마다 fsync 하는 디스크(또는 긴 쓰기 트랜잭션과 겹친 경우)를 흉내 낼 수 있다.
+
+사용법: python benchmarks/bench_cart.py [--threads 16] [--ops 2000] [--users 200] [--synchronous FULL]
+"""
+import argparse
+import glob
+import os
+import random
+import threading
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog
+import database
+from init_db import init_db
+import cart
+
+PRODUCTS = 500
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def direct_worker(rng, ops, users, latencies):
+    # 사용자마다 항목 하나를 두고 수량을 바꾼다 (write-behind 쪽과 같은 쓰기 양)
+    for _ in range(ops):
+        user_id = rng.randrange(1, users + 1)
+        start = time.perf_counter()
+        database.apply_cart_changes(
+            [(f'u{user_id}-p{rng.randrange(1, 6)}', user_id, rng.randrange(1, PRODUCTS), None, 'buy',
+              rng.randrange(1, 10))], [])
+        latencies.append(time.perf_counter() - start)
+
+
+def write_behind_worker(service, rng, ops, users, latencies):
+    for _ in range(ops):
+        user_id = rng.randrange(1, users + 1)
+        start = time.perf_counter()
+        service.add_item(user_id, rng.randrange(1, 6), 1)
+        latencies.append(time.perf_counter() - start)
+
+
+def run(label, target, threads):
+    latencies = []
+    workers = [threading.Thread(target=target, args=(random.Random(i), latencies)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    print(f'{label:>13}: {len(latencies) / elapsed:10.1f} ops/s  '
+          f'p50 {percentile(latencies, 50) * 1000:7.2f}ms  p99 {percentile(latencies, 99) * 1000:7.2f}ms')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=2000, help='스레드당 변경 수')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--synchronous', choices=('NORMAL', 'FULL'), default='NORMAL')
+    args = parser.parse_args()
+
+    database.PRAGMAS = tuple(
+        (name, args.synchronous if name == 'synchronous' else value) for name, value in database.PRAGMAS
+    )
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(PRODUCTS)
+        with database.get_db() as conn:
+            conn.executemany("INSERT INTO users (email, password_hash) VALUES (?, 'x')",
+                             [(f'bench{i}@example.com',) for i in range(args.users)])
+            conn.commit()
+
+        run('direct', lambda rng, lat: direct_worker(rng, args.ops, args.users, lat), args.threads)
+
+        service = cart.CartService()
+        run('write-behind', lambda rng, lat: write_behind_worker(service, rng, args.ops, args.users, lat),
+            args.threads)
+        start = time.perf_counter()
+        service.close()
+        stats = service.stats()
+        print(f'{"final flush":>13}: {(time.perf_counter() - start) * 1000:7.1f}ms  '
+              f'({stats["flushes"]} flushes, {stats["flushed_changes"]} rows written '
+              f'for {args.threads * args.ops} changes)')
+    finally:
+        remove_database(path)
+        for journal in glob.glob(path + '-cart-journal.*'):
+            os.unlink(journal)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+/api/products 처리량 비교: 요청마다 새 커넥션 vs 커넥션 풀
+
+사용법: python benchmarks/bench_db_pool.py [--requests 5000]
+"""
+import argparse
+import time
+
+from _common import use_temp_database, remove_database
+import database
+from init_db import init_db
+from main import create_app
+
+
+def run(client, n, theme):
+    url = f'/api/products?theme={theme}'
+    client.get(url)  # 워밍업
+    start = time.perf_counter()
+    for _ in range(n):
+        resp = client.get(url)
+        assert resp.status_code == 200
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--theme', default='traditional')
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        client = create_app().test_client()
+
+        results = {}
+        for label, pooled in (('per-call connect', False), ('pooled', True)):
+            database.POOL_ENABLED = pooled
+            database.close_db()
+            results[label] = run(client, args.requests, args.theme)
+
+        for label, rps in results.items():
+            print(f'{label:>18}: {rps:10.1f} req/s')
+        base = results['per-call connect']
+        print(f'{"speedup":>18}: {results["pooled"] / base:10.2f}x')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+카탈로그 가져오기: 행마다 INSERT (init_db 의 샘플 적재 방식) vs import_catalog.py
+
+합성 제품 N 개를 CSV 로 쓰고
+  - 행마다 products 1번 + product_images 2번 INSERT (인덱스/FTS 트리거가 켜진 채로, 앞쪽 일부만)
+  - import_catalog.import_products (executemany UPSERT, 인덱스/검색 색인 지연 생성)
+  - 이미 적재된 DB 에 일부를 다시 가져오기 (--keep-indexes, 가격 변경)
+의 처리량과 최대 RSS 를 잰다.
+
+사용법: python benchmarks/bench_import.py [--products 1000000] [--naive 20000]
+"""
+import argparse
+import csv
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+
+from _common import use_temp_database, remove_database, synthetic_products
+from init_db import init_db
+import init_db as init_db_module
+import import_catalog
+
+HEADER = ('name', 'code', 'material', 'buy_price', 'rent_price', 'theme', 'category', 'thumbnail',
+          'description', 'detail_image', 'wear_image')
+
+
+def write_csv(path, count, price_offset=0):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for row in synthetic_products(count):
+            base = row[7].rsplit('.', 1)[0]
+            row = row[:3] + (row[3] + price_offset,) + row[4:]
+            writer.writerow(row + (f'{base}-detail.png', f'{base}-wear.png'))
+
+
+def naive_import(path, limit):
+    """init_db 의 샘플 적재처럼 행마다 INSERT 세 번, 마지막에 한 번 커밋"""
+    conn = sqlite3.connect(init_db_module.DATABASE)
+    cursor = conn.cursor()
+    with open(path, encoding='utf-8', newline='') as f:
+        for i, r in enumerate(csv.DictReader(f)):
+            if i >= limit:
+                break
+            cursor.execute('''
+                INSERT INTO products (name, code, material, buy_price, rent_price, theme, category, thumbnail, description)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (r['name'], r['code'], r['material'], int(r['buy_price']), int(r['rent_price']),
+                  r['theme'], r['category'], r['thumbnail'], r['description']))
+            product_id = cursor.lastrowid
+            cursor.execute('INSERT INTO product_images (product_id, image_url, image_type) VALUES (?, ?, ?)',
+                           (product_id, r['detail_image'], 'detail'))
+            cursor.execute('INSERT INTO product_images (product_id, image_url, image_type) VALUES (?, ?, ?)',
+                           (product_id, r['wear_image'], 'wear'))
+    conn.commit()
+    conn.close()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--naive', type=int, default=20000, help='행마다 INSERT 로 넣을 제품 수')
+    parser.add_argument('--updates', type=int, default=10000, help='다시 가져올 제품 수')
+    args = parser.parse_args()
+
+    fd, csv_path = tempfile.mkstemp(prefix='museme-import-', suffix='.csv')
+    os.close(fd)
+    update_path = csv_path[:-4] + '-update.csv'
+    try:
+        start = time.perf_counter()
+        write_csv(csv_path, args.products)
+        write_csv(update_path, args.updates, price_offset=1000)
+        print(f'wrote {args.products} rows ({os.path.getsize(csv_path) / 1e6:.0f}MB) '
+              f'in {time.perf_counter() - start:.1f}s, peak RSS {peak_rss_mb():.0f}MB\n')
+
+        path = use_temp_database()
+        try:
+            init_db()
+            start = time.perf_counter()
+            naive_import(csv_path, args.naive)
+            elapsed = time.perf_counter() - start
+            print(f'{"per-row INSERT":>28}: {args.naive / elapsed:10.0f} rows/s '
+                  f'(first {args.naive} rows into an empty DB)')
+        finally:
+            remove_database(path)
+
+        path = use_temp_database()
+        try:
+            init_db()
+            stats = import_catalog.import_products(import_catalog.read_records(csv_path, 'csv'))
+            print(f'{"import_catalog (bulk)":>28}: {stats.rows_per_second():10.0f} rows/s '
+                  f'(load {stats.load_seconds:.1f}s + indexes {stats.index_seconds:.1f}s, '
+                  f'{stats.inserted} inserted, peak RSS {peak_rss_mb():.0f}MB)')
+
+            stats = import_catalog.import_products(import_catalog.read_records(update_path, 'csv'),
+                                                   defer_indexes=False)
+            print(f'{"re-import --keep-indexes":>28}: {stats.rows_per_second():10.0f} rows/s '
+                  f'({stats.updated} updated, {stats.unchanged} unchanged)')
+        finally:
+            remove_database(path)
+    finally:
+        for p in (csv_path, update_path):
+            if os.path.exists(p):
+                os.unlink(p)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+카탈로그 JSON 응답: 인코더(json vs orjson)와 압축(gzip/br)
+
+  - 제품 목록 한 페이지(limit 개)를 인코딩하는 시간과 본문 크기
+  - 그 본문을 압축하는 시간과 크기 (br 은 brotli 모듈이 있을 때만)
+  - 캐시에 든 /api/products 응답을 Accept-Encoding 없이/있게 받을 때의 요청당 시간
+    (압축본은 캐시 항목에 붙여 두므로 두 번째 요청부터는 압축 비용이 없다)
+
+사용법: python benchmarks/bench_json.py [--products 20000] [--limit 200]
+"""
+import argparse
+import json
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog
+from init_db import init_db
+import compression
+import database
+import fast_json
+
+
+def per_call_us(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+    n = args.iterations
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(args.products)
+        page, _ = database.get_products_page(theme='daily', limit=args.limit)
+        value = {'products': page, 'next_cursor': 'eyJ4IjoxfQ'}
+
+        encoders = [('json (jsonify 형식)', lambda: (json.dumps(value, ensure_ascii=True, sort_keys=True)
+                                                    + '\n').encode('utf-8'))]
+        if fast_json.orjson is not None:
+            encoders.append(('orjson', lambda: fast_json.orjson.dumps(
+                value, option=fast_json.orjson.OPT_SORT_KEYS | fast_json.orjson.OPT_APPEND_NEWLINE)))
+        print(f'{args.limit} products per page\n')
+        for label, encode in encoders:
+            body = encode()
+            print(f'{label:>22}: {per_call_us(encode, n):8.0f} us  {len(body):>8} bytes')
+            for encoding in compression.ENCODINGS:
+                compressed = compression.compress(body, encoding)
+                us = per_call_us(lambda: compression.compress(body, encoding), max(1, n // 5))
+                print(f'{"+ " + encoding:>22}: {us:8.0f} us  {len(compressed):>8} bytes '
+                      f'({len(compressed) / len(body):.0%})')
+
+        from main import create_app
+        client = create_app().test_client()
+        url = f'/api/products?theme=daily&limit={args.limit}'
+        print()
+        for label, headers in (('cached, identity', {}),
+                               ('cached, gzip', {'Accept-Encoding': 'gzip, deflate, br'})):
+            client.get(url, headers=headers)  # 캐시와 압축본 채우기
+            response = client.get(url, headers=headers)
+            us = per_call_us(lambda: client.get(url, headers=headers).get_data(), n)
+            print(f'{label:>22}: {us:8.0f} us/request  {len(response.get_data()):>8} bytes '
+                  f'(Content-Encoding: {response.headers.get("Content-Encoding", "-")})')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+scrypt 비용 설정별 /api/auth/login 처리량을 잰다.
+
+각 설정마다 사용자를 새로 해시해 두고, 여러 스레드가 동시에 로그인한다.
+사용법: python benchmarks/bench_login.py [--threads 16] [--seconds 3]
+"""
+import argparse
+import threading
+import time
+
+from _common import use_temp_database, remove_database
+import database
+import passwords
+from init_db import init_db
+from main import create_app
+
+COSTS = [(2 ** 12, 8, 1), (2 ** 14, 8, 1), (2 ** 15, 8, 1), (2 ** 16, 8, 1)]
+
+
+def drive(app, email, threads, seconds):
+    counts = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = app.test_client()
+        ok = busy = 0
+        while time.perf_counter() < deadline:
+            resp = client.post('/api/auth/login', json={'email': email, 'password': 'bench-pass'})
+            if resp.status_code == 200:
+                ok += 1
+            elif resp.status_code == 503:
+                busy += 1
+                time.sleep(0.01)  # 실제 클라이언트처럼 잠깐 쉬었다 재시도
+            else:
+                raise RuntimeError(resp.status_code)
+        with lock:
+            counts['ok'] += ok
+            counts['busy'] += busy
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return counts, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        app = create_app()
+        print(f'hash workers={passwords.hasher.workers} queue limit={passwords.hasher.queue_limit} '
+              f'request threads={args.threads}\n')
+        print(f'{"n, r, p":<18}{"hash (ms)":>10}{"logins/s":>10}{"503/s":>8}')
+        for i, (n, r, p) in enumerate(COSTS):
+            passwords.SCRYPT_N, passwords.SCRYPT_R, passwords.SCRYPT_P = n, r, p
+            email = f'bench{i}@example.com'
+            start = time.perf_counter()
+            database.create_user(email, passwords.hash_password('bench-pass'))
+            hash_ms = (time.perf_counter() - start) * 1000
+
+            counts, elapsed = drive(app, email, args.threads, args.seconds)
+            print(f'{f"{n}, {r}, {p}":<18}{hash_ms:>10.1f}{counts["ok"] / elapsed:>10.1f}'
+                  f'{counts["busy"] / elapsed:>8.1f}')
+    finally:
+        passwords.hasher.shutdown()
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+계측 비용: metrics.py 켜기/끄기
+
+  - Histogram.observe 한 번, timed 데코레이터 한 겹의 비용 (ns)
+  - 요청마다 붙는 before/after_request/teardown_request 훅의 비용 (ns)
+요청 전체 시간을 켜고 끄고 비교하면 차이보다 측정 잡음이 커서 부분별로 잰다.
+
+사용법: python benchmarks/bench_metrics.py [--iterations 200000]
+"""
+import argparse
+import time
+
+
+def micro(n):
+    import _common  # noqa: F401  (app/ 를 import 경로에 추가)
+    import metrics
+
+    hist = metrics.Histogram('bench_seconds', 'bench', ('name',))
+    labels = ('x',)
+    start = time.perf_counter()
+    for i in range(n):
+        hist.observe(0.003, labels)
+    observe_ns = (time.perf_counter() - start) / n * 1e9
+
+    def noop():
+        return None
+    wrapped = metrics.timed(hist, 'noop', 'db')(noop)
+    start = time.perf_counter()
+    for _ in range(n):
+        noop()
+    raw = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        wrapped()
+    timed_ns = (time.perf_counter() - start - raw) / n * 1e9
+    print(f'{"observe":>22}: {observe_ns:8.0f} ns')
+    print(f'{"timed wrapper":>22}: {timed_ns:8.0f} ns')
+
+
+def request_hooks(n):
+    """register_metrics 의 before/after_request/teardown_request 훅 비용 (요청당 고정 비용)"""
+    from _common import use_temp_database, remove_database
+    from init_db import init_db
+    from main import create_app
+    import metrics
+
+    path = use_temp_database()
+    try:
+        init_db()
+        app = create_app()
+        before = [f for f in app.before_request_funcs[None] if f.__module__ == metrics.__name__]
+        after = [f for f in app.after_request_funcs[None] if f.__module__ == metrics.__name__]
+        teardown = [f for f in app.teardown_request_funcs[None] if f.__module__ == metrics.__name__]
+        response = app.response_class(b'{}')
+        with app.test_request_context('/api/product/1'):
+            start = time.perf_counter()
+            for _ in range(n):
+                for func in before:
+                    func()
+                for func in after:
+                    func(response)
+                for func in teardown:
+                    func(None)
+            hooks_ns = (time.perf_counter() - start) / n * 1e9
+        print(f'{"request hooks":>22}: {hooks_ns:8.0f} ns')
+    finally:
+        remove_database(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    micro(args.iterations)
+    request_hooks(args.iterations)
+    print('요청당 비용 = request hooks + (database.py 호출 수 + 인증 호출 수) x timed wrapper')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+/api/product/<id> 지연시간 비교: 2회 쿼리(기존) vs JOIN 집계 1회
+
+사용법: python benchmarks/bench_product_detail.py [--requests 5000]
+"""
+import argparse
+import time
+
+from _common import use_temp_database, remove_database
+import database
+from init_db import init_db
+from main import create_app
+
+
+def legacy_get_product_by_id(product_id):
+    with database.get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        product = cursor.fetchone()
+        if product:
+            product = dict(product)
+            cursor.execute(
+                "SELECT image_url, image_type FROM product_images WHERE product_id = ?",
+                (product_id,)
+            )
+            images = cursor.fetchall()
+            product['detail_images'] = [r['image_url'] for r in images if r['image_type'] == 'detail']
+            product['wearing_shots'] = [r['image_url'] for r in images if r['image_type'] == 'wear']
+        return product
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def measure(client, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        resp = client.get(f'/api/product/{i % 9 + 1}')
+        samples.append((time.perf_counter() - start) * 1e6)
+        assert resp.status_code == 200
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        import routes
+        current = routes.get_product_by_id
+
+        for label, func in (('two queries', legacy_get_product_by_id), ('single query', current)):
+            routes.get_product_by_id = func
+            client = create_app().test_client()
+            measure(client, 100)
+            samples = measure(client, args.requests)
+            print(f'{label:>13}: p50 {percentile(samples, 50):7.1f}us  '
+                  f'p99 {percentile(samples, 99):7.1f}us')
+        routes.get_product_by_id = current
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
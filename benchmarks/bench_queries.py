@@ -0,0 +1,82 @@
+"""
+합성 카탈로그(기본 10만 개)에서 database.py 조회 지연시간을 인덱스 유무로 비교한다.
+
+사용법: python benchmarks/bench_queries.py [--products 100000] [--repeat 200]
+"""
+import argparse
+import random
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog, THEMES, CATEGORIES
+import database
+from init_db import init_db, INDEXES, create_indexes
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def timed(func, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(**args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_all(products, repeat):
+    rng = random.Random(7)
+    cases = {
+        'get_products(theme)': (database.get_products,
+                                [{'theme': rng.choice(THEMES)} for _ in range(repeat // 10 or 1)]),
+        'get_products(theme, category)': (database.get_products,
+                                          [{'theme': rng.choice(THEMES), 'category': rng.choice(CATEGORIES)}
+                                           for _ in range(repeat)]),
+        'get_product_by_id': (database.get_product_by_id,
+                              [{'product_id': rng.randint(1, products)} for _ in range(repeat)]),
+    }
+    results = {}
+    for label, (func, args_list) in cases.items():
+        samples = timed(func, args_list)
+        results[label] = (percentile(samples, 50), percentile(samples, 99))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        start = time.perf_counter()
+        seed_catalog(args.products)
+        print(f'{args.products}개 상품 생성: {time.perf_counter() - start:.1f}s\n')
+
+        with database.get_db() as conn:
+            for name, _ in INDEXES:
+                conn.execute(f'DROP INDEX {name}')
+            conn.commit()
+        before = run_all(args.products, args.repeat)
+
+        with database.get_db() as conn:
+            create_indexes(conn.cursor())
+            conn.execute('ANALYZE')
+            conn.commit()
+        after = run_all(args.products, args.repeat)
+
+        print(f'{"query":<32}{"no index p50/p99 (ms)":>24}{"indexed p50/p99 (ms)":>24}')
+        for label in before:
+            b50, b99 = before[label]
+            a50, a99 = after[label]
+            print(f'{label:<32}{b50:>11.2f} /{b99:>9.2f}{a50:>13.2f} /{a99:>9.2f}')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+비슷한 제품 색인 (app/related.py)
+
+제품 N 개 카탈로그에서
+  - 전체 색인을 만드는 시간과 배열 크기
+  - 제품 일부의 가격/소재를 바꾼 뒤 증분 갱신 시간 (다시 계산한 제품 수)과 결과가 전체 재계산과 같은지
+  - 저장한 색인을 읽는 시간 (서버 시작 때 하는 일)
+  - 조회 한 번의 시간 (rows 조회 + neighbors 슬라이스)
+  - /api/product/<id>/related 요청당 시간 (캐시 적중)
+을 잰다.
+
+사용법: python benchmarks/bench_related.py [--products 100000] [--changes 100]
+"""
+import argparse
+import random
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog
+from init_db import init_db
+from catalog_snapshot import load_snapshot
+import database
+import related
+
+
+def per_call_us(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--changes', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(args.products)
+        records = load_snapshot().all
+
+        start = time.perf_counter()
+        index = related.build_index(records)
+        built = time.perf_counter() - start
+        size = sum(a.itemsize * len(a) for a in
+                   [getattr(index, name) for name, _, _ in index.ARRAYS] + [index.rows])
+        print(f'{len(records)} products, k={related.RELATED_K}, window={related.WINDOW}')
+        print(f'{"full build":>18}: {built:8.2f} s   ({size / 1e6:.1f} MB of arrays)')
+
+        rng = random.Random(1)
+        changed = rng.sample([r.id for r in records], args.changes)
+        with database.get_db() as conn:
+            conn.executemany("UPDATE products SET buy_price = buy_price * 2, material = '은' WHERE id = ?",
+                             [(i,) for i in changed])
+            conn.commit()
+        records = load_snapshot().all
+        start = time.perf_counter()
+        updated, recomputed = related.update_index(index, records)
+        elapsed = time.perf_counter() - start
+        same = list(updated.neighbors) == list(related.build_index(records).neighbors)
+        print(f'{"incremental":>18}: {elapsed:8.2f} s   ({args.changes} changed, {recomputed} recomputed, '
+              f'{"same as" if same else "DIFFERS from"} full build)')
+
+        updated.save(related.index_path())
+        start = time.perf_counter()
+        related.RelatedIndex.load(related.index_path())
+        print(f'{"load from file":>18}: {(time.perf_counter() - start) * 1000:8.1f} ms')
+
+        ids = [r.id for r in records]
+        lookup = lambda: updated.related(rng.choice(ids), 8)
+        print(f'{"lookup":>18}: {per_call_us(lookup, args.iterations):8.2f} us')
+
+        from main import create_app
+        client = create_app().test_client()
+        related.refresh_index()
+        url = f'/api/product/{ids[len(ids) // 2]}/related'
+        client.get(url)
+        us = per_call_us(lambda: client.get(url).get_data(), 2000)
+        print(f'{"GET related":>18}: {us:8.0f} us/request (cached)')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+대여 가용성 조회: 예약 전체 훑기 vs SQL (인덱스) vs rentals.py 정렬 배열 색인
+
+제품 N 개에 예약 약 100만 건(제품마다 겹치지 않는 예약, 앞으로 약 1년)을 넣고
+  - 제품 하나의 [from, to] 가용성
+  - 테마+카테고리 전체에서 [from, to] 에 비어 있는 제품 ("이번 주말에 빌릴 수 있는 전통 머리장식")
+을 각 방식으로 답하는 처리량과 색인 생성 시간을 잰다.
+
+사용법: python benchmarks/bench_rentals.py [--products 20000] [--bookings 1000000]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from _common import use_temp_database, remove_database, seed_catalog, THEMES, CATEGORIES
+import database
+from init_db import init_db
+import rentals
+
+
+def seed_rentals(products, bookings, seed=7):
+    """제품마다 겹치지 않는 예약을 오늘부터 이어서 만든다."""
+    rng = random.Random(seed)
+    today = date.today().toordinal()
+    per_product = bookings // products
+    rows = []
+    for product_id in range(1, products + 1):
+        day = today + rng.randrange(0, 4)
+        for _ in range(per_product):
+            day += rng.randrange(0, 7)
+            end = day + rng.randrange(0, 5)
+            rows.append((product_id, date.fromordinal(day).isoformat(), date.fromordinal(end).isoformat()))
+            day = end + 1
+    with database.get_db() as conn:
+        conn.execute("INSERT INTO users (email, password_hash) VALUES ('bench@example.com', 'x')")
+        conn.executemany(
+            "INSERT INTO rentals (product_id, user_id, start_date, end_date) VALUES (?, 1, ?, ?)", rows)
+        conn.execute('ANALYZE')
+        conn.commit()
+    return len(rows)
+
+
+def queries(n, products, seed=11):
+    rng = random.Random(seed)
+    today = date.today()
+    for _ in range(n):
+        start = today + timedelta(days=rng.randrange(0, 300))
+        yield rng.randrange(1, products + 1), start, start + timedelta(days=rng.randrange(0, 3))
+
+
+def timed(label, n, func, unit='queries'):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:>34}: {n / elapsed:12.1f} {unit}/s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(args.products)
+        start = time.perf_counter()
+        total = seed_rentals(args.products, args.bookings)
+        print(f'seeded {total} bookings in {time.perf_counter() - start:.1f}s')
+
+        start = time.perf_counter()
+        index = rentals.load_index()
+        print(f'index build: {time.perf_counter() - start:.2f}s ({len(index)} bookings)\n')
+
+        # 제품 하나
+        point = list(queries(args.queries, args.products))
+        with database.get_db() as conn:
+            all_rows = conn.execute(
+                "SELECT product_id, start_date, end_date FROM rentals WHERE status = 'reserved'").fetchall()
+            all_rows = [tuple(r) for r in all_rows]
+            scan_n = 20
+            scan = timed('product: scan all bookings', scan_n, lambda: [
+                any(p == pid and s <= e_.isoformat() and e >= s_.isoformat() for p, s, e in all_rows)
+                for pid, s_, e_ in point[:scan_n]])
+            sql = timed('product: SQL (product_id, end_date)', len(point), lambda: [
+                conn.execute(
+                    "SELECT 1 FROM rentals WHERE product_id = ? AND end_date >= ? AND start_date <= ?"
+                    " AND status = 'reserved' LIMIT 1",
+                    (pid, s.isoformat(), e.isoformat())).fetchone() is None
+                for pid, s, e in point])
+        mem = timed('product: sorted-array index', len(point), lambda: [
+            index.is_available(pid, s, e) for pid, s, e in point])
+        assert sql == mem and [not x for x in scan] == mem[:scan_n]
+
+        # 테마 + 카테고리 전체
+        rng = random.Random(3)
+        groups = [(rng.choice(THEMES), rng.choice(CATEGORIES)) for _ in range(200)]
+        weekend = [(g, s, e) for g, (_, s, e) in zip(groups, queries(len(groups), args.products))]
+        print()
+        with database.get_db() as conn:
+            sql = timed('theme: SQL NOT EXISTS', len(weekend), lambda: [
+                [r[0] for r in conn.execute(
+                    "SELECT p.id FROM products p WHERE p.theme = ? AND p.category = ? AND NOT EXISTS ("
+                    " SELECT 1 FROM rentals r WHERE r.product_id = p.id AND r.end_date >= ?"
+                    " AND r.start_date <= ? AND r.status = 'reserved') ORDER BY p.id",
+                    (theme, category, s.isoformat(), e.isoformat()))]
+                for (theme, category), s, e in weekend])
+            members = {}
+            for row in conn.execute("SELECT id, theme, category FROM products ORDER BY id"):
+                members.setdefault((row['theme'], row['category']), []).append(row['id'])
+        mem = timed('theme: sorted-array index', len(weekend), lambda: [
+            index.available(members.get(group, ()), s, e) for group, s, e in weekend])
+        assert sql == mem
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
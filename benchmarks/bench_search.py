@@ -0,0 +1,58 @@
+"""
+합성 카탈로그(기본 10만 개)에서 search_products 지연시간을 잰다.
+
+사용법: python benchmarks/bench_search.py [--products 100000] [--repeat 200]
+"""
+import argparse
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog
+import database
+from init_db import init_db
+
+# (설명, 검색어, 필터)
+QUERIES = [
+    ('3글자 이상 단어', '목걸이', {}),
+    ('두 단어', '빈티지 머리장식', {}),
+    ('입력 중 접두어', '클래', {'theme': 'daily'}),
+    ('상품 코드', 'SYN-00123', {}),
+    ('필터 + 가격', '팔찌', {'theme': 'princess', 'max_price': 100000}),
+    ('2글자 (LIKE, 테마 한정)', '반지', {'theme': 'party'}),
+    ('재질', '실버 925 진주', {'category': 'ring'}),
+]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        start = time.perf_counter()
+        seed_catalog(args.products)
+        print(f'{args.products}개 상품 생성 + 색인: {time.perf_counter() - start:.1f}s\n')
+
+        print(f'{"query":<28}{"results":>8}{"p50 (ms)":>10}{"p99 (ms)":>10}')
+        for label, query, filters in QUERIES:
+            results = database.search_products(query, **filters)
+            samples = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                database.search_products(query, **filters)
+                samples.append((time.perf_counter() - t) * 1000)
+            print(f'{label:<28}{len(results):>8}{percentile(samples, 50):>10.2f}'
+                  f'{percentile(samples, 99):>10.2f}')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
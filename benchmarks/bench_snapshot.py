@@ -0,0 +1,66 @@
+"""
+응답 캐시를 거치지 않았을 때 /api/products, /api/product/<id> 처리량: SQL vs 카탈로그 스냅샷
+
+매 요청 전에 응답 캐시를 비워 캐시 미스 경로(처음 보는 페이지/커서)만 잰다.
+
+사용법: python benchmarks/bench_snapshot.py [--products 20000] [--requests 2000]
+"""
+import argparse
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog, THEMES, CATEGORIES
+from init_db import init_db
+from main import create_app
+from catalog_cache import catalog_cache
+import catalog_snapshot
+
+
+def urls(n, products):
+    for i in range(n):
+        theme = THEMES[i % len(THEMES)]
+        if i % 3 == 0:
+            yield f'/api/product/{i % products + 1}'
+        elif i % 3 == 1:
+            yield f'/api/products?theme={theme}&category={CATEGORIES[i % len(CATEGORIES)]}&limit=60'
+        else:
+            yield f'/api/products?theme={theme}&sort=-price&fields=id,name,code,buy_price,category,thumbnail&limit=100'
+
+
+def run(client, n, products):
+    start = time.perf_counter()
+    for url in urls(n, products):
+        catalog_cache.clear()
+        resp = client.get(url)
+        assert resp.status_code == 200, url
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(args.products)
+        client = create_app().test_client()
+
+        start = time.perf_counter()
+        catalog_snapshot.refresh_snapshot()
+        print(f'snapshot build: {(time.perf_counter() - start) * 1000:.1f}ms ({args.products} products)')
+
+        results = {}
+        for label, enabled in (('sql', False), ('snapshot', True)):
+            catalog_snapshot.SNAPSHOT_ENABLED = enabled
+            run(client, 200, args.products)  # 워밍업 (스냅샷 정렬 목록/JSON 조각 생성 포함)
+            results[label] = run(client, args.requests, args.products)
+            print(f'{label:>9}: {results[label]:9.1f} req/s')
+        print(f'{"speedup":>9}: {results["snapshot"] / results["sql"]:9.2f}x')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+제품 목록/상세 페이지: 빈 틀 + API (기존) vs 서버 사이드 렌더링
+
+TTFB       : 페이지 HTML 응답 시간 (서버 처리 시간)
+콘텐츠 표시 : 제품이 화면에 그려지기까지 필요한 서버 시간 합 + 왕복 수 x --rtt
+             기존 방식은 페이지 -> (JS 로드 후) /api/products 페이지들을 차례로 받아야 하고,
+             SSR 은 첫 응답에 첫 화면이 들어 있다. JS/CSS 다운로드 시간은 양쪽 모두 빼고 계산한다.
+cold 는 매번 조각 캐시를 비운 경우, warm 은 캐시가 찬 경우.
+
+사용법: python benchmarks/bench_ssr.py [--products 5000] [--requests 200] [--rtt 50]
+"""
+import argparse
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog
+from init_db import init_db
+from main import create_app
+from catalog_cache import catalog_cache, fragment_cache
+import routes
+
+LISTING_URL = '/api/products?theme={theme}&fields=id,name,code,buy_price,category,thumbnail&limit=100'
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    resp = client.get(url)
+    assert resp.status_code == 200, (url, resp.status_code)
+    return (time.perf_counter() - start) * 1000, resp
+
+
+def shell_listing(client, theme):
+    """(TTFB, 콘텐츠 표시까지 서버 시간, 왕복 수)"""
+    ttfb, _ = timed_get(client, f'/products/{theme}')
+    # 첫 페이지가 오면 그리기 시작하므로 첫 API 응답까지가 콘텐츠 표시 시점
+    elapsed, _ = timed_get(client, LISTING_URL.format(theme=theme))
+    return ttfb, ttfb + elapsed, 2
+
+
+def ssr_listing(client, theme):
+    ttfb, _ = timed_get(client, f'/products/{theme}')
+    return ttfb, ttfb, 1
+
+
+def shell_detail(client, product_id):
+    ttfb, _ = timed_get(client, f'/product/{product_id}')
+    elapsed, _ = timed_get(client, f'/api/product/{product_id}')
+    return ttfb, ttfb + elapsed, 2
+
+
+def ssr_detail(client, product_id):
+    ttfb, _ = timed_get(client, f'/product/{product_id}')
+    return ttfb, ttfb, 1
+
+
+def measure(client, func, args_list, n, cold, rtt):
+    ttfbs, contents = [], []
+    for i in range(n):
+        if cold:
+            catalog_cache.clear()
+            fragment_cache.clear()
+        ttfb, content, round_trips = func(client, args_list[i % len(args_list)])
+        ttfbs.append(ttfb)
+        contents.append(content + round_trips * rtt)
+    return ttfbs, contents
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--rtt', type=float, default=50.0, help='가정한 네트워크 왕복 시간(ms)')
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(args.products)
+        client = create_app().test_client()
+
+        themes = ['traditional', 'daily', 'party', 'princess', 'idol', 'country']
+        product_ids = list(range(1, 201))
+        cases = (
+            ('listing', themes, shell_listing, ssr_listing),
+            ('detail', product_ids, shell_detail, ssr_detail),
+        )
+        for page, args_list, shell, ssr in cases:
+            for cold in (True, False):
+                label = f'{page} ({"cold" if cold else "warm"})'
+                for mode, func, enabled in (('shell+api', shell, False), ('ssr', ssr, True)):
+                    routes.SSR_ENABLED = enabled
+                    measure(client, func, args_list, 20, cold, args.rtt)  # 워밍업
+                    ttfbs, contents = measure(client, func, args_list, args.requests, cold, args.rtt)
+                    print(f'{label:>16} {mode:>9}: TTFB p50 {percentile(ttfbs, 50):7.2f}ms  '
+                          f'content p50 {percentile(contents, 50):7.2f}ms  '
+                          f'p95 {percentile(contents, 95):7.2f}ms')
+        routes.SSR_ENABLED = True
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
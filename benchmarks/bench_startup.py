@@ -0,0 +1,82 @@
+"""
+서버 시작 비용: 매번 init_db() 전체 실행 vs migrations.migrate() (스키마가 최신일 때)
+
+제품 N 개가 있는 DB 에서
+  - 한 프로세스 안에서 각 방식 한 번의 시간
+  - 워커 W 개가 동시에 떠서 각 방식을 실행하고 끝날 때까지의 시간
+을 잰다.
+
+사용법: python benchmarks/bench_startup.py [--products 100000] [--workers 16]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from _common import use_temp_database, remove_database, seed_catalog, APP_DIR
+import init_db
+import migrations
+
+WORKER = '''
+import sys, time
+sys.path.insert(0, {app_dir!r})
+import init_db, migrations
+init_db.DATABASE = {path!r}
+start = time.perf_counter()
+{call}
+print(time.perf_counter() - start)
+'''
+CALLS = {
+    'init_db()': 'init_db.init_db()',
+    'migrate()': 'migrations.migrate(init_db.DATABASE)',
+}
+
+
+def boot_workers(path, call, workers):
+    code = WORKER.format(app_dir=APP_DIR, path=path, call=call)
+    start = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    slowest = max(float(p.communicate()[0].strip().splitlines()[-1]) for p in procs)
+    return time.perf_counter() - start, slowest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db.init_db()
+        seed_catalog(args.products)
+
+        for label, func in (('init_db()', init_db.init_db), ('migrate()', migrations.migrate)):
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    func()
+                elapsed = (time.perf_counter() - start) / args.repeat
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            print(f'{label:>10} in-process: {elapsed * 1000:8.2f} ms')
+
+        print()
+        for label, call in CALLS.items():
+            wall, slowest = boot_workers(path, call, args.workers)
+            print(f'{label:>10} x {args.workers} workers: {wall:6.2f}s wall, '
+                  f'slowest call {slowest * 1000:8.1f} ms')
+    finally:
+        remove_database(path)
+        if os.path.exists(path + migrations.LOCK_SUFFIX):
+            os.unlink(path + migrations.LOCK_SUFFIX)
+
+
+if __name__ == '__main__':
+    main()
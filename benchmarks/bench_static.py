@@ -0,0 +1,65 @@
+"""
+정적 파일 처리량 비교: Flask 기본 static 뷰 vs static_files 캐시
+
+작은 CSS, 큰 히어로 이미지 전체, 큰 이미지 Range 요청을 각각 잰다.
+테스트 클라이언트에는 wsgi.file_wrapper 가 없어 큰 파일 전체 응답도 캐시된 fd 를 pread 로 읽는다.
+실제 서버(gunicorn 등)에서는 전체 응답은 파일을 새로 열어 sendfile 로 보내므로 fd 캐시는 Range 요청에만 쓰인다.
+stat/open/읽기 비용 차이만 보이고 sendfile 효과는 빠진다.
+
+사용법: python benchmarks/bench_static.py [--requests 2000]
+"""
+import argparse
+import time
+
+from _common import use_temp_database, remove_database
+from init_db import init_db
+from main import create_app
+import static_files
+
+CASES = (
+    ('small css', '/static/css/reset.css', {}),
+    ('hero full', '/static/images/themes/traditional/hero.png', {}),
+    ('hero range', '/static/images/themes/traditional/hero.png', {'Range': 'bytes=0-65535'}),
+)
+
+
+def run(client, url, headers, n):
+    def once():
+        resp = client.get(url, headers=headers)
+        assert resp.status_code in (200, 206), resp.status_code
+        resp.get_data()
+        resp.close()
+
+    once()  # 워밍업
+    start = time.perf_counter()
+    for _ in range(n):
+        once()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        results = {}
+        for label, enabled in (('flask static', False), ('cached', True)):
+            static_files.STATIC_FAST_ENABLED = enabled
+            static_files.static_cache.clear()
+            client = create_app().test_client()
+            for case, url, headers in CASES:
+                results[(case, label)] = run(client, url, headers, args.requests)
+
+        for case, _, _ in CASES:
+            base = results[(case, 'flask static')]
+            fast = results[(case, 'cached')]
+            print(f'{case:>11}: flask {base:9.1f} req/s  cached {fast:9.1f} req/s  ({fast / base:.2f}x)')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
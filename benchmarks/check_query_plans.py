@@ -0,0 +1,150 @@
+"""
+database.py 의 모든 쿼리가 인덱스를 타는지 EXPLAIN QUERY PLAN 으로 확인한다.
+
+실제 함수를 호출하면서 trace callback 으로 실행된 SQL 을 모으고, 계획에 다음이 하나라도 있으면 실패(종료 코드 1)한다.
+  - 테이블 전체를 훑는 SCAN
+  - LIMIT 없이 인덱스 전체를 훑는 SCAN ... USING INDEX
+  - USE TEMP B-TREE (인덱스 대신 결과를 모아 정렬/그룹)
+의도된 것은 ALLOWED_PLANS 에 이유와 함께 등록한다.
+새 조회 함수를 추가하면 아래 QUERY_CALLS 에도 등록해야 한다.
+
+사용법: python benchmarks/check_query_plans.py [--products 5000]
+"""
+import argparse
+import inspect
+import re
+import sys
+
+from _common import use_temp_database, remove_database, seed_catalog
+import database
+from init_db import init_db
+
+# 검사하지 않는 모듈 함수 (쿼리를 직접 실행하지 않음)
+SKIP_FUNCTIONS = {'get_db', 'close_db', 'contextmanager'}
+
+# (함수명, 인자) — 필터가 없는 전체 목록 조회는 의도된 전체 스캔이라 제외
+QUERY_CALLS = [
+    ('get_products', {'theme': 'traditional'}),
+    ('get_products', {'theme': 'daily', 'category': 'ring'}),
+    ('get_products', {'category': 'necklace'}),
+    ('get_products', {'theme': 'daily', 'sort': '-price', 'limit': 20, 'after': (100000, 50)}),
+    ('get_products_page', {'theme': 'party', 'category': 'ring', 'sort': 'price',
+                           'fields': ('id', 'name', 'thumbnail'), 'limit': 20, 'after': (100000, 50)}),
+    ('get_products_page', {'theme': 'idol', 'sort': '-created_at', 'limit': 20}),
+    ('get_products_page', {'theme': 'idol', 'category': 'etc', 'limit': 20, 'after': (None, 50)}),
+    # 테마 없이 / 카테고리만으로 가격, 등록일 정렬
+    ('get_products_page', {'sort': 'price', 'limit': 20}),
+    ('get_products_page', {'sort': 'price', 'limit': 20, 'after': (100000, 50)}),
+    ('get_products_page', {'sort': '-created_at', 'limit': 20, 'after': ('2026-01-01 00:00:00', 50)}),
+    ('get_products_page', {'category': 'ring', 'sort': 'price', 'limit': 20, 'after': (100000, 50)}),
+    ('get_products_page', {'category': 'ring', 'sort': '-created_at', 'limit': 20}),
+    ('get_product_by_id', {'product_id': 1}),
+    ('get_products_by_ids', {'ids': [1, 2, 3]}),
+    ('search_products', {'query': '목걸이 실버', 'theme': 'daily', 'max_price': 300000}),
+    # 3글자 미만 검색어는 색인을 못 쓰므로 테마 인덱스로 범위를 좁힌 경우만 검사
+    ('search_products', {'query': '반지', 'theme': 'daily'}),
+    ('get_user_by_email', {'email': 'nobody@example.com'}),
+    ('create_user', {'email': 'plan@example.com', 'password_hash': 'x'}),
+    ('update_user_password_hash', {'user_id': 1, 'password_hash': 'y'}),
+    ('revoke_token', {'jti': 'plan', 'expires_at': 4102444800}),
+    ('is_token_revoked', {'jti': 'plan'}),
+    ('get_cart_items', {'user_id': 1}),
+    ('apply_cart_changes', {'upserts': [('plan', 1, 1, None, 'buy', 2)], 'deletes': ['plan']}),
+    ('get_upcoming_rentals', {'since': '2026-01-01'}),
+    ('create_rental', {'product_id': 1, 'user_id': 1, 'start_date': '2026-01-02', 'end_date': '2026-01-03'}),
+    ('cancel_rental', {'rental_id': 1, 'user_id': 1}),
+    ('get_user_rentals', {'user_id': 1}),
+]
+
+# 인덱스 없이 테이블을 통째로 읽는 계획 (SCAN t / SCAN t USING ... 는 구분)
+FULL_SCAN = re.compile(r'^SCAN \w+\b(?! USING| VIRTUAL TABLE)')
+# 인덱스 순서로 훑는 계획. LIMIT 이 있어야 (키셋 첫 페이지) 읽는 양이 정해진다
+INDEX_SCAN = re.compile(r'^SCAN \w+ USING (COVERING )?INDEX\b')
+TEMP_B_TREE = re.compile(r'USE TEMP B-TREE')
+HAS_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+# (함수명, 계획 줄 앞부분) -> 허용하는 이유
+ALLOWED_PLANS = {
+    ('search_products', 'USE TEMP B-TREE FOR ORDER BY'):
+        'bm25 순위는 인덱스로 정렬할 수 없다. 정렬 대상은 SEARCH_RANK_WINDOW 건 이하',
+    ('get_user_rentals', 'USE TEMP B-TREE FOR ORDER BY'):
+        '사용자 한 명의 예약만 정렬한다',
+    ('get_upcoming_rentals', 'SCAN rentals USING INDEX'):
+        '시작할 때 한 번 유효한 예약 전체를 rentals.py 색인으로 적재한다',
+    ('get_upcoming_rentals', 'USE TEMP B-TREE FOR RIGHT PART OF ORDER BY'):
+        '같은 적재에서 제품별 시작일 순서로 맞춘다',
+}
+
+
+def plan_problems(name, sql, plan):
+    problems = []
+    for line in plan:
+        if any(line.startswith(prefix) for (allowed, prefix) in ALLOWED_PLANS if allowed == name):
+            continue
+        if (FULL_SCAN.match(line) or TEMP_B_TREE.search(line)
+                or (INDEX_SCAN.match(line) and not HAS_LIMIT.search(sql))):
+            problems.append(line)
+    return problems
+
+
+def public_query_functions():
+    return {
+        name for name, obj in inspect.getmembers(database, inspect.isfunction)
+        if obj.__module__ == database.__name__
+        and not name.startswith('_') and name not in SKIP_FUNCTIONS
+    }
+
+
+def collect_statements():
+    statements = []
+    with database.get_db() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        for name, kwargs in QUERY_CALLS:
+            before = len(statements)
+            getattr(database, name)(**kwargs)
+            for sql in statements[before:]:
+                yield name, sql
+    finally:
+        with database.get_db() as conn:
+            conn.set_trace_callback(None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=5000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(args.products)
+
+        failures = []
+        missing = public_query_functions() - {name for name, _ in QUERY_CALLS}
+        for name in sorted(missing):
+            failures.append(f'{name}: QUERY_CALLS 에 등록되지 않음')
+
+        with database.get_db() as conn:
+            checked = [(name, sql) for name, sql in collect_statements()
+                       if sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT'))]
+            for name, sql in checked:
+                plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+                problems = plan_problems(name, sql, plan)
+                status = 'FAIL' if problems else 'ok'
+                print(f'[{status}] {name}: {" | ".join(plan) or "(no table access)"}')
+                if problems:
+                    failures.append(f'{name}: {", ".join(problems)}')
+
+        if failures:
+            print('\n인덱스를 사용하지 않거나 전체를 정렬하는 쿼리:')
+            for failure in failures:
+                print(f'  - {failure}')
+            sys.exit(1)
+        print(f'\n{len(checked)}개 쿼리 모두 인덱스를 사용합니다.')
+    finally:
+        remove_database(path)
+
+
+if __name__ == '__main__':
+    main()
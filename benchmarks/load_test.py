@@ -0,0 +1,228 @@
+"""
+WSGI(스레드 풀) vs ASGI 부하 테스트
+
+느린 모바일 클라이언트 여러 개가 큰 히어로 이미지를 천천히 받는 동안, 다른 클라이언트가
+/api/products 와 제품 목록 페이지를 계속 호출할 때의 지연시간과 서버 스레드 수를 비교한다.
+루프백에서는 커널 소켓 버퍼가 커서 느린 클라이언트의 영향이 실제 회선보다 작게 나타난다.
+
+  wsgi : werkzeug 서버 + 고정 크기 스레드 풀 (gunicorn --threads N 과 같은 모델)
+  asgi : uvicorn + asgi_app (같은 Flask 앱, 같은 N 개의 WSGI 스레드)
+
+사용법: python benchmarks/load_test.py [--slow-clients 200] [--threads 16] [--duration 20]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SLOW_PATH = '/static/images/themes/daily/hero.png'
+# JSON API 는 ASGI 에서 바로 처리되고, 페이지는 WSGI 스레드 풀로 넘어간다
+PROBE_PATHS = ('/api/products?theme=traditional&limit=20', '/products/daily')
+SLOW_CHUNK = 8 * 1024
+SLOW_INTERVAL = 0.02  # 초, 대략 400KB/s 모바일 회선
+
+
+# ---------------------------------------------------------------------------
+# 서버 (하위 프로세스로 실행)
+# ---------------------------------------------------------------------------
+
+def serve(mode, port, threads):
+    os.environ['MUSEME_ASGI_WSGI_WORKERS'] = str(threads)
+    from _common import use_temp_database, remove_database, seed_catalog
+    from init_db import init_db
+    from main import create_app
+
+    path = use_temp_database()
+    try:
+        init_db()
+        seed_catalog(2000)
+        app = create_app()
+        if mode == 'wsgi':
+            serve_wsgi(app, port, threads)
+        else:
+            import uvicorn
+            from asgi_app import create_asgi_app
+            uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port,
+                        log_level='warning', backlog=4096)
+    finally:
+        remove_database(path)
+
+
+def serve_wsgi(app, port, threads):
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    class PooledWSGIServer(BaseWSGIServer):
+        multithread = True
+        request_queue_size = 4096
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer('127.0.0.1', port, app, handler=QuietHandler)
+    server.serve_forever()
+
+
+# ---------------------------------------------------------------------------
+# 클라이언트
+# ---------------------------------------------------------------------------
+
+async def http_get(port, path, slow=False):
+    """응답 전체를 읽고 (상태 코드, 바이트 수) 를 돌려준다."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if slow:
+        # 수신 버퍼를 작게 잡아 커널 버퍼가 느린 클라이언트를 가려 주지 않게 한다
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_CHUNK)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        received = b''
+        total = 0
+        while True:
+            chunk = await reader.read(SLOW_CHUNK if slow else 65536)
+            if not chunk:
+                break
+            if total < 64:
+                received += chunk[:64]
+            total += len(chunk)
+            if slow:
+                await asyncio.sleep(SLOW_INTERVAL)
+        status = int(received.split(b' ', 2)[1]) if received else 0
+        return status, total
+    finally:
+        writer.close()
+
+
+async def slow_client(port, stop, counters):
+    while not stop.is_set():
+        try:
+            status, _ = await http_get(port, SLOW_PATH, slow=True)
+            counters['slow_done' if status == 200 else 'slow_failed'] += 1
+        except OSError:
+            counters['slow_failed'] += 1
+
+
+async def probe_client(port, stop, latencies, counters):
+    i = 0
+    while not stop.is_set():
+        path = PROBE_PATHS[i % len(PROBE_PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(http_get(port, path), timeout=30)
+        except (OSError, asyncio.TimeoutError):
+            counters['probe_failed'] += 1
+            continue
+        if status == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            counters['probe_failed'] += 1
+
+
+def thread_count(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return 0
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float('nan')
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def run_load(port, pid, slow_clients, probes, duration):
+    stop = asyncio.Event()
+    latencies = []
+    counters = {'slow_done': 0, 'slow_failed': 0, 'probe_failed': 0}
+    tasks = [asyncio.create_task(slow_client(port, stop, counters)) for _ in range(slow_clients)]
+    await asyncio.sleep(1.0)  # 느린 클라이언트가 먼저 자리를 잡게 한다
+    tasks += [asyncio.create_task(probe_client(port, stop, latencies, counters)) for _ in range(probes)]
+
+    max_threads = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        max_threads = max(max_threads, thread_count(pid))
+        await asyncio.sleep(0.2)
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies, counters, max_threads
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serve', choices=('wsgi', 'asgi'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=5071)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--slow-clients', type=int, default=200)
+    parser.add_argument('--probes', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--modes', default='wsgi,asgi')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.threads)
+        return
+
+    for offset, mode in enumerate(args.modes.split(',')):
+        port = args.port + offset
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', mode,
+             '--port', str(port), '--threads', str(args.threads)],
+            cwd=BENCH_DIR, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            latencies, counters, max_threads = asyncio.run(
+                run_load(port, server.pid, args.slow_clients, args.probes, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f'{mode}: probe {len(latencies) / args.duration:7.1f} req/s  '
+              f'p50 {percentile(latencies, 50):8.1f}ms  p99 {percentile(latencies, 99):8.1f}ms  '
+              f'probe failures {counters["probe_failed"]}  '
+              f'slow downloads {counters["slow_done"]} (failed {counters["slow_failed"]})  '
+              f'server threads {max_threads}')
+
+
+if __name__ == '__main__':
+    main()
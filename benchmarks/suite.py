@@ -0,0 +1,392 @@
+"""
+Museme HTTP API 벤치마크 모음
+
+합성 카탈로그(products + product_images)와 합성 사용자를 만들고, 동시 접속 부하로
+  products : GET  /api/products   (테마/카테고리/정렬/커서를 섞어서)
+  product  : GET  /api/product/<id>
+  login    : POST /api/auth/login
+  register : POST /api/auth/register
+  mixed    : 위 요청을 실제 비율에 가깝게 섞은 것
+을 호출해 처리량, p50/p95/p99 지연시간, 메모리(RSS, 최대 RSS)를 잰다.
+
+  inprocess : 같은 프로세스의 Flask test client (네트워크/서버 비용 없이 앱 코드만)
+  socket    : 하위 프로세스로 띄운 서버에 로컬 소켓으로 요청 (--server wsgi 또는 asgi)
+
+결과는 JSON 으로 저장하고(--output, 기본 benchmarks/results/<시각>-<커밋>.json),
+--compare 로 이전 결과와 비교해 커밋 사이의 성능 회귀를 찾는다.
+
+사용법:
+  python benchmarks/suite.py [--products 20000] [--users 1000] [--modes inprocess,socket]
+                             [--scenarios products,product,login,register,mixed]
+                             [--concurrency 16] [--duration 10] [--server wsgi]
+                             [--compare benchmarks/results/이전.json [--fail-on-regression]]
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from time import perf_counter
+
+from _common import (use_temp_database, use_database, remove_database, seed_catalog, seed_users,
+                     BASE_DIR, THEMES, CATEGORIES)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+PASSWORD = 'bench-password-1234'
+SCENARIOS = ('products', 'product', 'login', 'register', 'mixed')
+SORTS = ('id', 'price', '-price', '-created_at')
+# mixed 비율: 목록 조회가 대부분이고 로그인/가입은 드물다
+MIXED_WEIGHTS = (('products', 60), ('product', 32), ('login', 6), ('register', 2))
+
+
+# ---------------------------------------------------------------------------
+# 요청 만들기
+# ---------------------------------------------------------------------------
+
+class Workload:
+    def __init__(self, products, emails):
+        self.products_count = products
+        self.emails = emails
+        self._register_seq = itertools.count()
+        self._mixed = [name for name, weight in MIXED_WEIGHTS for _ in range(weight)]
+
+    def products(self, rng):
+        params = [f'theme={rng.choice(THEMES)}', f'limit={rng.choice((20, 20, 60))}']
+        if rng.random() < 0.5:
+            params.append(f'category={rng.choice(CATEGORIES)}')
+        if rng.random() < 0.3:
+            params.append(f'sort={rng.choice(SORTS)}')
+        if rng.random() < 0.3:
+            params.append('fields=id,name,code,buy_price,rent_price,thumbnail')
+        return 'GET', '/api/products?' + '&'.join(params), None
+
+    def product(self, rng):
+        return 'GET', f'/api/product/{rng.randint(1, self.products_count)}', None
+
+    def login(self, rng):
+        return 'POST', '/api/auth/login', {'email': rng.choice(self.emails), 'password': PASSWORD}
+
+    def register(self, rng):
+        email = f'bench-new-{os.getpid()}-{next(self._register_seq)}@example.com'
+        return 'POST', '/api/auth/register', {'email': email, 'password': PASSWORD}
+
+    def mixed(self, rng):
+        return getattr(self, rng.choice(self._mixed))(rng)
+
+
+# ---------------------------------------------------------------------------
+# 클라이언트
+# ---------------------------------------------------------------------------
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class SocketClient:
+    """keep-alive 연결 하나를 재사용하고, 끊기면 다시 연결한다."""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = None
+
+    def request(self, method, path, body):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        payload = None if body is None else json.dumps(body).encode('utf-8')
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            if response.will_close:
+                self.close()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return 0  # 연결 실패
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# ---------------------------------------------------------------------------
+# 부하 생성과 집계
+# ---------------------------------------------------------------------------
+
+def percentile(samples, pct):
+    if not samples:
+        return float('nan')
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run_load(make_client, next_request, concurrency, duration, warmup):
+    """concurrency 개의 스레드가 쉬지 않고 요청을 보낸다 (closed loop). warmup 동안의 요청은 세지 않는다."""
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    record_from = perf_counter() + warmup
+    stop_at = record_from + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = make_client()
+        local_latencies = []
+        local_statuses = Counter()
+        try:
+            while True:
+                start = perf_counter()
+                if start >= stop_at:
+                    break
+                method, path, body = next_request(rng)
+                status = client.request(method, path, body)
+                if start >= record_from:
+                    local_latencies.append(perf_counter() - start)
+                    local_statuses[status] += 1
+        finally:
+            client.close()
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+
+
+def memory(pid='self'):
+    """(현재 RSS, 최대 RSS) MB. /proc 가 없으면 (None, None)."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    key, value = line.split(':', 1)
+                    values[key] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        return None, None
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def reset_peak_memory(pid='self'):
+    # 시나리오별 최대 RSS 를 보려면 커널의 최대값 기록을 지운다 (Linux 4.0+, 실패하면 누적 최대값)
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# 서버 (socket 모드에서 하위 프로세스로 실행)
+# ---------------------------------------------------------------------------
+
+def serve(server, port, database_path, threads):
+    os.environ['MUSEME_ASGI_WSGI_WORKERS'] = str(threads)
+    use_database(database_path)
+    from main import create_app
+    from load_test import serve_wsgi
+
+    app = create_app()
+    if server == 'wsgi':
+        serve_wsgi(app, port, threads)
+    else:
+        import uvicorn
+        from asgi_app import create_asgi_app
+        uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+def start_server(server, port, database_path, threads):
+    from load_test import wait_for_port
+
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', server, '--port', str(port),
+         '--database', database_path, '--server-threads', str(threads)],
+        cwd=BENCH_DIR, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+# ---------------------------------------------------------------------------
+# 결과 저장과 비교
+# ---------------------------------------------------------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def result_key(result):
+    return (result['mode'], result['scenario'], result['concurrency'])
+
+
+def compare(previous, current, threshold):
+    """처리량이 threshold% 넘게 줄었거나 p99 가 threshold% 넘게 늘어난 항목 수를 돌려준다."""
+    before = {result_key(r): r for r in previous['results']}
+    regressions = 0
+    print(f'\n비교 대상: {previous["meta"]["revision"]} ({previous["meta"]["timestamp"]})')
+    print(f'{"mode":>10} {"scenario":>9} {"rps":>22} {"p99 ms":>24}')
+    for result in current['results']:
+        old = before.get(result_key(result))
+        if old is None:
+            continue
+        rps_change = (result['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0.0
+        p99_change = (result['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100 if old['p99_ms'] else 0.0
+        regressed = rps_change < -threshold or p99_change > threshold
+        regressions += regressed
+        print(f'{result["mode"]:>10} {result["scenario"]:>9} '
+              f'{old["rps"]:>9.1f} -> {result["rps"]:>9.1f} ({rps_change:+5.1f}%) '
+              f'{old["p99_ms"]:>8.2f} -> {result["p99_ms"]:>8.2f} ({p99_change:+5.1f}%)'
+              f'{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--modes', default='inprocess,socket')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='시나리오별 측정 시간 (초)')
+    parser.add_argument('--warmup', type=float, default=1.0)
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--server-threads', type=int, default=16)
+    parser.add_argument('--port', type=int, default=5081)
+    parser.add_argument('--output', help='결과 JSON 경로')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=10.0, help='회귀로 볼 변화율 (%%)')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--serve', choices=('wsgi', 'asgi'), help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.database, args.server_threads)
+        return
+
+    modes = args.modes.split(',')
+    scenarios = args.scenarios.split(',')
+    unknown = [s for s in scenarios if s not in SCENARIOS] + [m for m in modes if m not in ('inprocess', 'socket')]
+    if unknown:
+        parser.error(f'unknown mode/scenario: {", ".join(unknown)}')
+
+    path = use_temp_database()
+    try:
+        from init_db import init_db
+        init_db()
+        start = perf_counter()
+        seed_catalog(args.products)
+        emails = seed_users(args.users, PASSWORD)
+        print(f'seeded {args.products} products, {args.users} users in {perf_counter() - start:.1f}s')
+        workload = Workload(args.products, emails)
+
+        results = []
+        for mode in modes:
+            server = None
+            if mode == 'inprocess':
+                from main import create_app
+                app = create_app()
+                make_client = lambda: InProcessClient(app)
+                pid = 'self'
+            else:
+                server = start_server(args.server, args.port, path, args.server_threads)
+                make_client = lambda: SocketClient(args.port)
+                pid = server.pid
+            try:
+                for scenario in scenarios:
+                    reset_peak_memory(pid)
+                    result = run_load(make_client, getattr(workload, scenario),
+                                      args.concurrency, args.duration, args.warmup)
+                    rss, peak = memory(pid)
+                    result.update({
+                        'mode': mode if mode == 'inprocess' else f'{mode}-{args.server}',
+                        'scenario': scenario,
+                        'concurrency': args.concurrency,
+                        'rss_mb': rss,
+                        'peak_rss_mb': peak,
+                    })
+                    results.append(result)
+                    print(f'{result["mode"]:>12} {scenario:>9}: {result["rps"]:9.1f} req/s  '
+                          f'p50 {result["p50_ms"]:8.2f}ms  p95 {result["p95_ms"]:8.2f}ms  '
+                          f'p99 {result["p99_ms"]:8.2f}ms  errors {result["errors"]:>5}  '
+                          f'rss {rss}MB (peak {peak}MB)')
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait()
+    finally:
+        remove_database(path)
+
+    revision = git_revision()
+    report = {
+        'meta': {
+            'revision': revision,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': {k: v for k, v in vars(args).items()
+                     if k not in ('serve', 'database', 'output', 'compare', 'fail_on_regression')},
+        },
+        'results': results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f'{datetime.now():%Y%m%d-%H%M%S}-{revision}.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f'\nsaved {output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,20 @@
 """
 플레이스홀더 이미지 생성 스크립트
 PIL을 사용해 JPG 형식으로 더미 이미지를 생성합니다.
+
+이미지는 프로세스 풀에서 병렬로 그리고, 입력(크기, 색상, 텍스트, 폰트)의 해시를
+manifest 에 기록해 바뀌지 않은 이미지는 다시 만들지 않습니다.
+
+사용법: python generate_placeholders.py [--force] [--jobs N]
 """
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 try:
     from PIL import Image, ImageDraw, ImageFont
@@ -42,35 +54,40 @@ THEME_NAMES_KR = {
     'country': '국가별',
 }
 
-def get_font(size=30):
-    """폰트 로드 (시스템 폰트 사용)"""
-    font_paths = [
-        "C:/Windows/Fonts/malgun.ttf",      # 맑은 고딕
-        "C:/Windows/Fonts/gulim.ttc",        # 굴림
-        "C:/Windows/Fonts/arial.ttf",        # Arial
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
-    ]
-    for font_path in font_paths:
+FONT_PATHS = [
+    "C:/Windows/Fonts/malgun.ttf",      # 맑은 고딕
+    "C:/Windows/Fonts/gulim.ttc",        # 굴림
+    "C:/Windows/Fonts/arial.ttf",        # Arial
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Linux
+]
+
+@lru_cache(maxsize=1)
+def find_font_path():
+    """사용할 시스템 폰트 경로 (프로세스마다 한 번만 탐색)"""
+    for font_path in FONT_PATHS:
         if os.path.exists(font_path):
             try:
-                return ImageFont.truetype(font_path, size)
-            except:
+                ImageFont.truetype(font_path, 10)
+                return font_path
+            except OSError:
                 continue
+    return None
+
+@lru_cache(maxsize=None)
+def get_font(size=30):
+    """폰트 로드 (시스템 폰트 사용, 크기별로 워커 프로세스당 한 번만 로드)"""
+    font_path = find_font_path()
+    if font_path:
+        return ImageFont.truetype(font_path, size)
     return ImageFont.load_default()
 
 def create_gradient_image(width, height, color1, color2):
-    """그라데이션 이미지 생성"""
-    img = Image.new('RGB', (width, height))
-    draw = ImageDraw.Draw(img)
-
-    for y in range(height):
-        ratio = y / height
-        r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
-        g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
-        b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-
-    return img
+    """그라데이션 이미지 생성 (위 color1 -> 아래 color2)"""
+    # 0~255 세로 그라데이션 마스크를 늘려 두 단색 이미지를 한 번에 섞는다
+    mask = Image.linear_gradient('L').resize((width, height))
+    top = Image.new('RGB', (width, height), color1)
+    bottom = Image.new('RGB', (width, height), color2)
+    return Image.composite(bottom, top, mask)
 
 def create_category_image(width, height, bg_color, theme_name, category_name):
     """카테고리 이미지 생성"""
@@ -299,70 +316,130 @@ def create_about_image(width, height):
 
     return img
 
-def main():
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    images_path = os.path.join(base_path, 'static', 'images')
+# 입력이 같아도 그리는 코드가 바뀌면 올려서 전체를 다시 만든다
+GENERATOR_VERSION = 2
+MANIFEST_NAME = '.placeholder-manifest.json'
+
+BUILDERS = {
+    'category': create_category_image,
+    'hero': create_hero_image,
+    'banner': create_banner_image,
+    'about': create_about_image,
+    'logo': create_logo_image,
+    'product': create_product_image,
+}
 
-    print("플레이스홀더 이미지 생성 시작...")
+def asset_specs():
+    """(출력 경로, 빌더 이름, 인자, 저장 형식) 목록. 경로는 static/images 기준"""
+    specs = []
 
-    # 1. 테마별 카테고리 이미지 생성
+    # 1. 테마별 카테고리 이미지 + 히어로 이미지
     for theme, color in THEME_COLORS.items():
-        theme_path = os.path.join(images_path, 'themes', theme)
-        os.makedirs(theme_path, exist_ok=True)
-
         theme_name_kr = THEME_NAMES_KR.get(theme, theme)
-
-        # 카테고리별 이미지
         for category in CATEGORIES:
             category_name_kr = CATEGORY_NAMES_KR.get(category, category)
-            img = create_category_image(400, 400, color, theme_name_kr, category_name_kr)
+            specs.append((f'themes/{theme}/{category}.jpg', 'category',
+                          (400, 400, color, theme_name_kr, category_name_kr), 'JPEG'))
+        specs.append((f'themes/{theme}/hero.jpg', 'hero', (1200, 400, color, theme_name_kr), 'JPEG'))
 
-            file_path = os.path.join(theme_path, f'{category}.jpg')
-            img.save(file_path, 'JPEG', quality=90)
-            print(f'Created: {file_path}')
+    # 2. 배너 이미지
+    for i in range(1, 6):
+        specs.append((f'banners/banner{i}.jpg', 'banner', (1200, 500, i), 'JPEG'))
 
-        # 히어로 이미지
-        hero_img = create_hero_image(1200, 400, color, theme_name_kr)
-        hero_path = os.path.join(theme_path, 'hero.jpg')
-        hero_img.save(hero_path, 'JPEG', quality=90)
-        print(f'Created: {hero_path}')
+    # 3. About 이미지
+    specs.append(('about/intro.jpg', 'about', (1200, 600), 'JPEG'))
 
-    # 2. 배너 이미지 생성
-    banners_path = os.path.join(images_path, 'banners')
-    os.makedirs(banners_path, exist_ok=True)
-
-    for i in range(1, 6):
-        banner_img = create_banner_image(1200, 500, i)
-        banner_path = os.path.join(banners_path, f'banner{i}.jpg')
-        banner_img.save(banner_path, 'JPEG', quality=90)
-        print(f'Created: {banner_path}')
-
-    # 3. About 이미지 생성
-    about_path = os.path.join(images_path, 'about')
-    os.makedirs(about_path, exist_ok=True)
-
-    about_img = create_about_image(1200, 600)
-    intro_path = os.path.join(about_path, 'intro.jpg')
-    about_img.save(intro_path, 'JPEG', quality=90)
-    print(f'Created: {intro_path}')
-
-    # 4. 로고 이미지 생성
-    logo_img = create_logo_image(200, 60)
-    logo_path = os.path.join(images_path, 'logo.png')
-    logo_img.save(logo_path, 'PNG')
-    print(f'Created: {logo_path}')
-
-    # 5. 샘플 제품 이미지 생성
-    products_path = os.path.join(images_path, 'products')
-    os.makedirs(products_path, exist_ok=True)
+    # 4. 로고 이미지
+    specs.append(('logo.png', 'logo', (200, 60), 'PNG'))
 
+    # 5. 샘플 제품 이미지
     for i in range(1, 7):
-        product_img = create_product_image(400, 400, i)
-        product_path = os.path.join(products_path, f'product{i}.jpg')
-        product_img.save(product_path, 'JPEG', quality=90)
-        print(f'Created: {product_path}')
+        specs.append((f'products/product{i}.jpg', 'product', (400, 400, i), 'JPEG'))
+
+    return specs
+
+def font_fingerprint():
+    font_path = find_font_path()
+    if not font_path:
+        return 'default'
+    stat = os.stat(font_path)
+    return f'{font_path}:{stat.st_size}:{int(stat.st_mtime)}'
+
+def spec_hash(spec, font_id):
+    path, builder, args, fmt = spec
+    raw = json.dumps([GENERATOR_VERSION, path, builder, args, fmt, font_id], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def render_asset(images_path, spec):
+    """워커 프로세스에서 이미지 하나를 그려 저장하고 걸린 시간(초)을 돌려준다."""
+    path, builder, args, fmt = spec
+    start = time.perf_counter()
+    img = BUILDERS[builder](*args)
+    file_path = os.path.join(images_path, path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if fmt == 'JPEG':
+        img.save(file_path, 'JPEG', quality=90)
+    else:
+        img.save(file_path, fmt)
+    return path, time.perf_counter() - start
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description='플레이스홀더 이미지 생성')
+    parser.add_argument('--force', action='store_true', help='바뀌지 않은 이미지도 다시 생성')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='동시에 실행할 프로세스 수')
+    args = parser.parse_args()
 
-    print('\n모든 플레이스홀더 이미지가 생성되었습니다!')
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    images_path = os.path.join(base_path, 'static', 'images')
+    manifest_path = os.path.join(images_path, MANIFEST_NAME)
+
+    print("플레이스홀더 이미지 생성 시작...")
+    started = time.perf_counter()
+
+    manifest = {} if args.force else load_manifest(manifest_path)
+    font_id = font_fingerprint()
+    specs = asset_specs()
+    hashes = {spec[0]: spec_hash(spec, font_id) for spec in specs}
+
+    pending = [
+        spec for spec in specs
+        if manifest.get(spec[0]) != hashes[spec[0]]
+        or not os.path.exists(os.path.join(images_path, spec[0]))
+    ]
+    skipped = len(specs) - len(pending)
+
+    new_manifest = {spec[0]: hashes[spec[0]] for spec in specs if spec not in pending}
+    failed = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [(spec[0], executor.submit(render_asset, images_path, spec)) for spec in pending]
+            for path, future in futures:
+                try:
+                    _, elapsed = future.result()
+                except Exception as e:
+                    # 하나가 실패해도 나머지 결과는 manifest 에 남겨 다음 실행에서 다시 만들지 않는다
+                    failed.append((path, e))
+                    continue
+                new_manifest[path] = hashes[path]
+                print(f'Created: {os.path.join(images_path, path)} ({elapsed * 1000:.0f}ms)')
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(new_manifest.items())), f, indent=2, ensure_ascii=False)
+
+    elapsed = time.perf_counter() - started
+    print(f'\n생성 {len(pending) - len(failed)}개, 변경 없음 {skipped}개, 실패 {len(failed)}개 ({elapsed:.2f}s)')
+    if failed:
+        for path, error in failed:
+            print(f'Failed: {os.path.join(images_path, path)} ({type(error).__name__}: {error})')
+        sys.exit(1)
+    print('모든 플레이스홀더 이미지가 생성되었습니다!')
 
 if __name__ == '__main__':
     main()
@@ -22,6 +22,12 @@ async function fetchAPI(endpoint, options = {}) {
     'Content-Type': 'application/json',
   };
 
+  // 로그인 상태면 인증 토큰 첨부
+  const token = localStorage.getItem('authToken');
+  if (token) {
+    defaultHeaders['Authorization'] = `Bearer ${token}`;
+  }
+
   const config = {
     method: options.method || 'GET',
     headers: {
@@ -81,11 +87,15 @@ class APIError extends Error {
 }
 
 /**
- * 상품 목록 조회
+ * 상품 목록 조회 (한 페이지)
  * @param {string} theme - 테마 필터 (선택적)
  * @param {string} category - 카테고리 필터 (선택적)
  * @param {Object} additionalParams - 추가 쿼리 파라미터
- * @returns {Promise<Object>} 상품 목록
+ * @param {number} additionalParams.limit - 페이지 크기 (최대 200)
+ * @param {string} additionalParams.after - 이전 응답의 next_cursor
+ * @param {string} additionalParams.fields - 받을 필드 (예: 'id,name,buy_price,thumbnail')
+ * @param {string} additionalParams.sort - 정렬 (id, price, -price, created_at, -created_at)
+ * @returns {Promise<Object>} { products, next_cursor }
  */
 async function getProducts(theme = null, category = null, additionalParams = {}) {
   const params = new URLSearchParams();
@@ -111,6 +121,32 @@ async function getProducts(theme = null, category = null, additionalParams = {})
   return await fetchAPI(endpoint);
 }
 
+/**
+ * 상품 목록 전체 조회 (next_cursor 를 따라 페이지를 이어서 요청)
+ * @param {string} theme - 테마 필터 (선택적)
+ * @param {string} category - 카테고리 필터 (선택적)
+ * @param {Object} additionalParams - getProducts 와 같은 추가 파라미터
+ * @param {Function} onPage - 페이지를 받을 때마다 호출 (선택적, 누적 목록 전달)
+ * @returns {Promise<Array>} 전체 상품 목록
+ */
+async function getAllProducts(theme = null, category = null, additionalParams = {}, onPage = null) {
+  const products = [];
+  // additionalParams.after 가 있으면 그 커서부터 이어 받는다 (서버가 첫 페이지를 그린 경우)
+  let after = additionalParams.after || null;
+
+  do {
+    const page = await getProducts(theme, category, { ...additionalParams, after });
+    products.push(...(page.products || []));
+    after = page.next_cursor;
+
+    if (onPage) {
+      onPage(products);
+    }
+  } while (after);
+
+  return products;
+}
+
 /**
  * 상품 상세 조회
  * @param {string|number} id - 상품 ID
@@ -152,14 +188,17 @@ async function getCart() {
  * 장바구니에 상품 추가
  * @param {string|number} productId - 상품 ID
  * @param {number} quantity - 수량
+ * @param {Object} [item] - 옵션과 구매 방식 ({ option, purchaseType: 'buy' | 'rent' })
  * @returns {Promise<Object>} 업데이트된 장바구니
  */
-async function addToCart(productId, quantity = 1) {
+async function addToCart(productId, quantity = 1, item = {}) {
   return await fetchAPI('/cart/items', {
     method: 'POST',
     body: {
       product_id: productId,
       quantity: quantity,
+      option: item.option || null,
+      purchase_type: item.purchaseType || 'buy',
     },
   });
 }
@@ -216,6 +255,7 @@ if (typeof window !== 'undefined') {
     fetchAPI,
     APIError,
     getProducts,
+    getAllProducts,
     getProductById,
     getCategories,
     getThemes,
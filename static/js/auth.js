@@ -200,6 +200,16 @@ class AuthManager {
   }
 
   logout() {
+    // 서버에도 토큰 폐기를 알린다 (응답은 기다리지 않음)
+    const token = localStorage.getItem('authToken');
+    if (token) {
+      fetch('/api/auth/logout', {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` },
+        keepalive: true,
+      }).catch(() => {});
+    }
+
     localStorage.removeItem('authToken');
     localStorage.removeItem('userData');
     window.location.reload();
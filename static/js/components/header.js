@@ -475,6 +475,16 @@ class HeaderManager {
    * 로그아웃 처리
    */
   logout() {
+    // 서버에도 토큰 폐기를 알린다 (응답은 기다리지 않음)
+    const token = localStorage.getItem('authToken');
+    if (token) {
+      fetch('/api/auth/logout', {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` },
+        keepalive: true,
+      }).catch(() => {});
+    }
+
     localStorage.removeItem('authToken');
     localStorage.removeItem('userData');
     this.updateAuthUI();
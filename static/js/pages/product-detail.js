@@ -13,6 +13,17 @@ class ProductDetail {
   }
 
   async loadProductData() {
+    // 서버가 이미 그린 상품이면 데이터만 읽고 다시 그리지 않는다
+    const initial = document.getElementById('initial-product');
+    if (initial) {
+      try {
+        this.product = JSON.parse(initial.textContent);
+        return;
+      } catch (error) {
+        // 아래에서 API 로 다시 받는다
+      }
+    }
+
     try {
       const response = await fetch(`/api/product/${this.productId}`);
       const data = await response.json();
@@ -98,15 +109,31 @@ class ProductDetail {
     // 실제 구매 로직 구현
   }
 
-  addToCart() {
+  async addToCart() {
     const option = document.getElementById('product-options').value;
     // 반지일 경우에만 옵션 필수
     if (this.product.category === 'ring' && !option) {
       alert('옵션을 선택해주세요.');
       return;
     }
-    alert('장바구니에 추가되었습니다.');
-    // 실제 장바구니 로직 구현
+    // 장바구니는 로그인한 사용자별로 서버에 저장된다
+    if (!window.authManager || !window.authManager.isLoggedIn()) {
+      window.authManager?.openModal('login');
+      return;
+    }
+    try {
+      await window.MusemeAPI.addToCart(this.product.id, 1, {
+        option: option || null,
+        purchaseType: this.purchaseType,
+      });
+      alert('장바구니에 추가되었습니다.');
+    } catch (error) {
+      if (error.status === 401) {
+        window.authManager.openModal('login');
+        return;
+      }
+      alert('장바구니에 추가하지 못했습니다. 잠시 후 다시 시도해주세요.');
+    }
   }
 }
 
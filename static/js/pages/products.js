@@ -12,9 +12,33 @@ class ProductGallery {
 
   async init() {
     this.bindEvents();
+
+    // 서버가 그린 목록이 있으면 다시 요청하지 않고 그대로 쓴다
+    const initial = this.readInitialData();
+    if (initial) {
+      this.products = initial.products;
+      this.currentCategory = initial.category;
+      this.loadedCategory = initial.category;
+      if (initial.next_cursor) {
+        await this.loadProducts(initial.category, initial.next_cursor, initial.products);
+      }
+      return;
+    }
+
+    this.loadedCategory = 'all';
     await this.loadProducts();
   }
 
+  readInitialData() {
+    const el = document.getElementById('initial-products');
+    if (!el) return null;
+    try {
+      return JSON.parse(el.textContent);
+    } catch (error) {
+      return null;
+    }
+  }
+
   bindEvents() {
     this.filterBtns.forEach(btn => {
       btn.addEventListener('click', () => {
@@ -28,12 +52,20 @@ class ProductGallery {
     });
   }
 
-  async loadProducts() {
+  async loadProducts(category = 'all', after = null, loaded = []) {
     try {
-      const response = await fetch(`/api/products?theme=${this.theme}`);
-      const data = await response.json();
-      this.products = data.products || [];
-      this.renderProducts(this.products);
+      // 목록에 필요한 필드만 페이지 단위로 받아 도착하는 대로 그린다
+      const products = await window.MusemeAPI.getAllProducts(
+        this.theme, category === 'all' ? null : category, {
+          fields: 'id,name,code,buy_price,category,thumbnail',
+          limit: 100,
+          after,
+        }, (page) => {
+          this.products = loaded.concat(page);
+          this.applyFilter(this.currentCategory);
+        });
+      this.products = loaded.concat(products);
+      this.applyFilter(this.currentCategory);
     } catch (error) {
       console.error('제품 로드 실패:', error);
     }
@@ -42,6 +74,13 @@ class ProductGallery {
   applyFilter(category) {
     this.currentCategory = category;
 
+    // 서버가 한 카테고리만 그려 준 상태에서 다른 카테고리를 고르면 전체를 받아 온다
+    if (this.loadedCategory !== 'all' && category !== this.loadedCategory) {
+      this.loadedCategory = 'all';
+      this.loadProducts();
+      return;
+    }
+
     const filtered = category === 'all'
       ? this.products
       : this.products.filter(p => p.category === category);
@@ -54,7 +93,10 @@ class ProductGallery {
 
     this.grid.innerHTML = products.map(product => `
       <a href="/product/${product.id}" class="product-unit neu-card">
-        <img src="${product.thumbnail}" alt="${product.name}" class="product-thumbnail">
+        <img src="${this.thumbnailURL(product.thumbnail, 400)}"
+             srcset="${this.thumbnailURL(product.thumbnail, 400)} 400w, ${this.thumbnailURL(product.thumbnail, 800)} 800w"
+             sizes="(max-width: 768px) 50vw, 400px"
+             alt="${product.name}" class="product-thumbnail" loading="lazy">
         <div class="product-info">
           <h3 class="product-name">${product.name}</h3>
           <p class="product-code">${product.code}</p>
@@ -64,6 +106,12 @@ class ProductGallery {
     `).join('');
   }
 
+  // /static/images/... 원본 대신 리사이즈된 WebP 썸네일 사용
+  thumbnailURL(src, width) {
+    if (!src || !src.startsWith('/static/images/')) return src;
+    return `/img/${src.slice('/static/images/'.length)}?w=${width}&fmt=webp`;
+  }
+
   formatPrice(price) {
     return '₩' + price.toLocaleString('ko-KR');
   }
@@ -11,9 +11,9 @@ app_path = os.path.join(project_home, 'app')
 if app_path not in sys.path:
     sys.path.insert(0, app_path)
 
-# 데이터베이스 초기화
-from init_db import init_db
-init_db()
+# 스키마 마이그레이션 (최신이고 인덱스가 모두 있으면 확인만 하고 넘어간다)
+from migrations import migrate
+migrate()
 
 # Flask 앱 가져오기
 from main import create_app